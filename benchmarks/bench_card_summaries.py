@@ -0,0 +1,67 @@
+"""Сравнение однопроходной сводки по картам с прежним циклом по картам.
+
+Запуск: python -m benchmarks.bench_card_summaries [число карт] [число операций]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.dates import sort_by_date
+from src.utils import summarize_cards
+
+
+def card_summaries_loop(transactions, start_date, end_date):
+    """Прежняя реализация: фильтрация DataFrame заново для каждой карты."""
+    filtered_transactions = transactions[
+        (transactions['Дата операции'] >= start_date) &
+        (transactions['Дата операции'] <= end_date)
+    ]
+    card_summaries = []
+    for card in filtered_transactions['Номер карты'].unique():
+        card_transactions = filtered_transactions[filtered_transactions['Номер карты'] == card]
+        total_spent = abs(card_transactions[card_transactions['Сумма операции'] < 0]['Сумма операции'].sum())
+        total_cashback = card_transactions['Кешбэк'].sum()
+        card_summaries.append({
+            "last_digits": card[-4:],
+            "total_spent": round(float(total_spent), 2),
+            "cashback": round(float(total_cashback), 2)
+        })
+    return sorted(card_summaries, key=lambda x: (-x["total_spent"], x["last_digits"]))
+
+
+def make_transactions(cards, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return sort_by_date(pd.DataFrame({
+        "Дата операции": pd.Timestamp("2023-10-01") + pd.to_timedelta(rng.integers(0, 30 * 86400, rows), unit="s"),
+        "Номер карты": [f"*{n:06d}" for n in rng.integers(0, cards, rows)],
+        "Сумма операции": rng.normal(-500, 2000, rows).round(2),
+        "Кешбэк": rng.uniform(0, 20, rows).round(2),
+    }))
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    cards = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    df = make_transactions(cards, rows)
+    period = (pd.Timestamp("2023-10-01"), pd.Timestamp("2023-10-31 23:59:59"))
+
+    loop_result, loop_time = timed(card_summaries_loop, df, *period)
+    grouped_result, grouped_time = timed(summarize_cards, df, *period)
+
+    assert [c["total_spent"] for c in loop_result] == [c["total_spent"] for c in grouped_result]
+    print(f"Карт: {cards}, операций: {rows}")
+    print(f"Цикл по картам:   {loop_time * 1000:10.2f} мс")
+    print(f"Один groupby:     {grouped_time * 1000:10.2f} мс")
+    print(f"Ускорение:        {loop_time / grouped_time:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
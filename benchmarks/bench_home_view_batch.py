@@ -0,0 +1,58 @@
+"""Сравнение home_view_batch с отдельными вызовами home_view для каждого дня года.
+
+Запуск: python -m benchmarks.bench_home_view_batch [число карт] [число операций]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import src.store
+from src.dates import sort_by_date
+from src.schema import apply_schema
+from src.store import TransactionStore
+from src.views import home_view, home_view_batch
+
+
+def make_transactions(cards, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return apply_schema(sort_by_date(pd.DataFrame({
+        "Дата операции": pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 365 * 86400, rows), unit="s"),
+        "Номер карты": [f"*{n:06d}" for n in rng.integers(0, cards, rows)],
+        "Сумма операции": rng.normal(-500, 2000, rows).round(2),
+        "Кешбэк": rng.uniform(0, 20, rows).round(2),
+        "Категория": rng.choice(["Супермаркеты", "Переводы", "Кафе", "Транспорт"], rows),
+        "Описание": rng.choice(["Лента", "Магнит", "Иван С.", "Метро"], rows),
+    })))
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    cards = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    df = make_transactions(cards, rows)
+    # Хранилище с готовыми данными вместо чтения файла
+    src.store._store = TransactionStore(check_interval=float("inf"), loader=lambda _: df)
+
+    timestamps = [
+        (pd.Timestamp("2023-01-01 18:30:00") + pd.Timedelta(days=day)).strftime("%Y-%m-%d %H:%M:%S")
+        for day in range(365)
+    ]
+    single_result, single_time = timed(lambda: [home_view(timestamp) for timestamp in timestamps])
+    batch_result, batch_time = timed(home_view_batch, timestamps)
+
+    assert single_result == batch_result
+    print(f"Карт: {cards}, операций: {rows}, дашбордов: {len(timestamps)}")
+    print(f"Вызовы home_view: {single_time * 1000:10.2f} мс")
+    print(f"home_view_batch:  {batch_time * 1000:10.2f} мс")
+    print(f"Ускорение:        {single_time / batch_time:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Сравнение Инвесткопилки по месяцам (src.invest) с расчетом месяц за месяцем.
+
+Запуск: python -m benchmarks.bench_investment_bank [число операций] [путь к выгрузке .xlsx]
+
+Если указана выгрузка банка, симуляция сверяется с колонкой «Округление на инвесткопилку».
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_search import make_transactions
+from src.dates import parse_transaction_dates, sort_by_date
+from src.invest import DEFAULT_THRESHOLDS, export_matches, investment_savings
+from src.schema import apply_schema, with_rubles
+
+
+def by_month(transactions, month, threshold):
+    """Прежний способ: DataFrame из записей, strftime для каждой строки, округление в float."""
+    df = pd.DataFrame(transactions)
+    df["Дата операции"] = pd.to_datetime(df["Дата операции"])
+    mask = df["Дата операции"].dt.strftime("%Y-%m") == month
+    amounts = -df.loc[mask & (df["Сумма операции"] < 0), "Сумма операции"]
+    return round(float((np.ceil(amounts / threshold) * threshold - amounts).sum()), 2)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    df = make_transactions(rows, 1_000)
+    records = with_rubles(df).to_dict("records")
+    months = sorted(set(df["Дата операции"].dt.strftime("%Y-%m")))
+    print(f"Операций: {rows}, месяцев: {len(months)}, шагов: {len(DEFAULT_THRESHOLDS)}")
+
+    started = time.perf_counter()
+    expected = [[by_month(records, month, step) for step in DEFAULT_THRESHOLDS] for month in months]
+    print(f"месяц за месяцем:  {(time.perf_counter() - started) * 1000:10.1f} мс")
+
+    started = time.perf_counter()
+    result = investment_savings(df, DEFAULT_THRESHOLDS)
+    print(f"один проход NumPy: {(time.perf_counter() - started) * 1000:10.1f} мс")
+    assert result.index.tolist() == months
+    assert np.allclose(result.to_numpy(), expected, atol=0.05)
+
+    if len(sys.argv) > 2:
+        export = pd.read_excel(sys.argv[2])
+        parse_transaction_dates(export)
+        print("Совпадение с выгрузкой по месяцам и шагам:")
+        print(export_matches(apply_schema(sort_by_date(export))).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Сравнение поиска переводов физическим лицам: построчный перебор, векторный поиск и пул процессов.
+
+Запуск: python -m benchmarks.bench_physical_transfers [число операций] [число получателей]
+"""
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.transfers import physical_transfer_mask
+
+EXCLUDE_PATTERN = re.compile(r"карт|счет|кредитн|перевод|тп", re.IGNORECASE)
+NAME_PATTERN = re.compile(r"^[А-ЯA-Z][а-яa-z]+(?:\s+[А-ЯA-Z]\.?)?$|^[А-ЯA-Z][а-яa-z]+\s+[А-ЯA-Z][а-яa-z]+$")
+
+
+def make_records(rows, people, seed=0):
+    rng = np.random.default_rng(seed)
+    syllables = np.array(["ва", "ле", "ри", "ан", "на", "ми", "ол", "ег", "ир", "ко", "зу", "бе"])
+    # Имена и фамилии из случайных слогов: "Валери Анако", "Мирина К."
+    first = [s.capitalize() for s in map("".join, rng.choice(syllables, (people, 3)))]
+    last = [s.capitalize() for s in map("".join, rng.choice(syllables, (people, 2)))]
+    names = np.array(
+        [f"{f} {l}" if n % 2 else f"{f} {l[0]}." for n, (f, l) in enumerate(zip(first, last))]
+        + ["Перевод на карту", "Лента", "Яндекс Такси", "Тп Сервис", "Оплата счета"]
+    )
+    return pd.DataFrame({
+        "Категория": rng.choice(["Переводы", "Супермаркеты", "Кафе", "Транспорт"], rows),
+        "Описание": rng.choice(names, rows),
+    }).to_dict("records")
+
+
+def scan(transactions):
+    return [
+        t for t in transactions
+        if t["Категория"] == "Переводы"
+        and not EXCLUDE_PATTERN.search(t["Описание"].lower())
+        and NAME_PATTERN.match(t["Описание"])
+    ]
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    people = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+    records = make_records(rows, people)
+    categories = pd.Series([t["Категория"] for t in records], dtype=object)
+    descriptions = pd.Series([t["Описание"] for t in records], dtype=object)
+    print(f"Операций: {rows}, уникальных описаний: {descriptions.nunique()}, ядер: {os.cpu_count()}")
+
+    start = time.perf_counter()
+    expected = scan(records)
+    print(f"построчный перебор: {time.perf_counter() - start:7.2f} с, найдено {len(expected)}")
+
+    for workers in (1, 2, 4, 8):
+        start = time.perf_counter()
+        mask = physical_transfer_mask(categories, descriptions, workers, chunk_size=-(-people // workers))
+        print(f"векторный поиск, процессов {workers}: {time.perf_counter() - start:7.2f} с")
+        assert [records[i] for i in np.flatnonzero(mask)] == expected
+
+
+if __name__ == "__main__":
+    main()
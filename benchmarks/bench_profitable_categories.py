@@ -0,0 +1,45 @@
+"""Сравнение расходов по категориям за месяц через куб (src.rollups.MonthlyCube) с масками по месяцу.
+
+Запуск: python -m benchmarks.bench_profitable_categories [число операций]
+"""
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks.bench_search import make_transactions
+from src.rollups import MonthlyCube
+from src.schema import with_rubles
+
+
+def by_masks(df, year, month):
+    """Прежний способ: маски .dt.year/.dt.month по всем строкам и groupby на каждый запрос."""
+    dates = pd.to_datetime(df["Дата операции"])
+    filtered = df[(dates.dt.year == year) & (dates.dt.month == month) & (df["Сумма операции"] < 0)]
+    return filtered.groupby("Категория", observed=True)["Сумма операции"].sum().abs()
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    df = make_transactions(rows, 1_000)
+    rubles = with_rubles(df)
+    months = [(2023, month) for month in range(1, 13)]
+    print(f"Операций: {rows}, запросов: {len(months)}")
+
+    started = time.perf_counter()
+    expected = [by_masks(rubles, year, month) for year, month in months]
+    print(f"маски на каждый запрос: {(time.perf_counter() - started) * 1000:8.1f} мс")
+
+    started = time.perf_counter()
+    cube = MonthlyCube.from_frame(df)
+    print(f"построение куба:        {(time.perf_counter() - started) * 1000:8.1f} мс")
+
+    started = time.perf_counter()
+    found = [cube.month(year, month)["spend"] for year, month in months]
+    print(f"запросы к кубу:         {(time.perf_counter() - started) * 1000:8.1f} мс")
+    for spend, reference in zip(found, expected):
+        assert (spend[reference.index] - reference).abs().max() < 1e-6
+
+
+if __name__ == "__main__":
+    main()
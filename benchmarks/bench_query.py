@@ -0,0 +1,42 @@
+"""Сравнение запроса с планировщиком (src.query) с фильтрацией масками по всем строкам.
+
+Запуск: python -m benchmarks.bench_query [число операций] [число магазинов]
+"""
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks.bench_search import make_transactions
+from src.query import Query
+
+
+def masks(df, start, end, category, text):
+    """Все условия масками по всем строкам, в порядке записи."""
+    mask = (df["Дата операции"] >= start) & (df["Дата операции"] <= end)
+    mask &= df["Категория"] == category
+    mask &= df["Сумма операции"] < 0
+    mask &= df["Описание"].astype(str).str.lower().str.contains(text, regex=False)
+    return mask.to_numpy().nonzero()[0]
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    merchants = int(sys.argv[2]) if len(sys.argv) > 2 else 5_000
+    df = make_transactions(rows, merchants)
+    start, end = pd.Timestamp("2023-06-01"), pd.Timestamp("2023-06-30 23:59:59")
+    query = Query(df).text("магазин 12").expenses().category("Кафе").between(start, end)
+    print(f"Операций: {rows}, план: {query.plan()}")
+
+    started = time.perf_counter()
+    expected = masks(df, start, end, "Кафе", "магазин 12")
+    print(f"маски по всем строкам: {(time.perf_counter() - started) * 1000:8.1f} мс, найдено {len(expected)}")
+
+    started = time.perf_counter()
+    found = query.run().rows
+    print(f"запрос с планом:       {(time.perf_counter() - started) * 1000:8.1f} мс")
+    assert found.tolist() == expected.tolist()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Сравнение холодной и теплой загрузки транзакций через колоночный кеш.
+
+Запуск: python -m benchmarks.bench_read_transactions [путь к файлу] [число повторов]
+"""
+import sys
+import tempfile
+import time
+
+from src.cache import load_cached
+from src.utils import _parse_transactions
+
+
+def main():
+    file_path = sys.argv[1] if len(sys.argv) > 1 else "data/operations.xlsx"
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    start = time.perf_counter()
+    df = _parse_transactions(file_path)
+    no_cache = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        start = time.perf_counter()
+        load_cached(file_path, _parse_transactions, cache_dir=cache_dir)
+        cold = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            load_cached(file_path, _parse_transactions, cache_dir=cache_dir)
+        warm = (time.perf_counter() - start) / repeats
+
+    print(f"Файл: {file_path} ({len(df)} строк)")
+    print(f"Без кеша:              {no_cache * 1000:10.2f} мс")
+    print(f"Холодная загрузка:     {cold * 1000:10.2f} мс (разбор + запись кеша)")
+    print(f"Теплая загрузка:       {warm * 1000:10.2f} мс (среднее из {repeats})")
+    print(f"Ускорение:             {no_cache / warm:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Сравнение simple_search по индексу с построчным поиском подстроки.
+
+Запуск: python -m benchmarks.bench_search [число операций] [число магазинов]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.dates import sort_by_date
+from src.schema import apply_schema
+from src.search import SearchIndex
+
+QUERIES = [
+    ("лента", "substring"), ("магазин 12", "substring"), ("такси", "word"), ("перев", "prefix"), ("zz", "substring"),
+    ("озон", "fuzzy"), ("magazin 12", "fuzzy"), ("яндекс такси", "fuzzy"),
+]
+
+
+def make_transactions(rows, merchants, seed=0):
+    rng = np.random.default_rng(seed)
+    names = np.array(
+        [f"Магазин {n}" for n in range(merchants)]
+        + ["Лента", "Яндекс Такси", "Перевод Иван С.", "Ozon.ru", "OZON", "Озон"]
+    )
+    return apply_schema(sort_by_date(pd.DataFrame({
+        "Дата операции": pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 365 * 86400, rows), unit="s"),
+        "Сумма операции": rng.normal(-500, 2000, rows).round(2),
+        "Категория": rng.choice(["Супермаркеты", "Переводы", "Кафе", "Транспорт"], rows),
+        "Описание": rng.choice(names, rows),
+    })))
+
+
+def scan(query, categories, descriptions):
+    query = query.lower()
+    return [i for i in range(len(categories)) if query in categories[i].lower() or query in descriptions[i].lower()]
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    merchants = int(sys.argv[2]) if len(sys.argv) > 2 else 5_000
+    df = make_transactions(rows, merchants)
+    categories = df["Категория"].astype(str).tolist()
+    descriptions = df["Описание"].astype(str).tolist()
+
+    start = time.perf_counter()
+    index = SearchIndex.from_frame(df)
+    print(f"Операций: {rows}, текстов: {len(index.texts)}, построение индекса: {time.perf_counter() - start:.2f} с")
+    for query, mode in QUERIES:
+        start = time.perf_counter()
+        for _ in range(100):
+            found = index.search(query, mode, limit=50 if mode == "fuzzy" else None)
+        indexed = (time.perf_counter() - start) / 100
+        line = f"{query!r:14} {mode:9} найдено {len(found):7}  индекс: {indexed * 1000:8.3f} мс"
+        if mode == "substring":
+            start = time.perf_counter()
+            assert scan(query, categories, descriptions) == found.tolist()
+            line += f"  перебор: {(time.perf_counter() - start) * 1000:8.1f} мс"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Нагрузочный тест HTTP-сервера: задержки p50/p99 и число запросов в секунду.
+
+Сервер должен быть запущен заранее (python -m src.server).
+Запуск: python -m benchmarks.load_test [адрес] [число запросов] [параллельность]
+
+По умолчанию запрашиваются /home и /events за разные дни 2021 года.
+"""
+import asyncio
+import sys
+import time
+from urllib.parse import quote, urlsplit
+
+import numpy as np
+
+
+def default_paths(count=365):
+    paths = []
+    for day in range(count):
+        moment = np.datetime64("2021-01-01T14:30:00") + np.timedelta64(day, "D")
+        date = quote(str(moment).replace("T", " "))
+        paths.append(f"/home?date={date}")
+        paths.append(f"/events?date={date}&period=M")
+    return paths
+
+
+async def worker(host, port, paths, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for path in paths:
+            start = time.perf_counter()
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode("latin-1"))
+            await writer.drain()
+            head = await reader.readuntil(b"\r\n\r\n")
+            status_line, *header_lines = head.decode("latin-1").split("\r\n")
+            headers = dict(line.lower().split(": ", 1) for line in header_lines if ": " in line)
+            await reader.readexactly(int(headers["content-length"]))
+            latencies.append(time.perf_counter() - start)
+            if not status_line.startswith("HTTP/1.1 200"):
+                errors.append(status_line)
+    finally:
+        writer.close()
+
+
+async def run(url, requests, concurrency):
+    address = urlsplit(url)
+    paths = default_paths()
+    schedule = [paths[i % len(paths)] for i in range(requests)]
+    latencies, errors = [], []
+
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        worker(address.hostname, address.port, schedule[i::concurrency], latencies, errors)
+        for i in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000
+    print(f"Запросов: {len(latencies)}, параллельно: {concurrency}, ошибок: {len(errors)}")
+    print(f"p50:      {np.percentile(latencies_ms, 50):10.2f} мс")
+    print(f"p99:      {np.percentile(latencies_ms, 99):10.2f} мс")
+    print(f"RPS:      {len(latencies) / elapsed:10.1f}")
+
+
+def main():
+    url = sys.argv[1] if len(sys.argv) > 1 else "http://127.0.0.1:8080"
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 32
+    asyncio.run(run(url, requests, concurrency))
+
+
+if __name__ == "__main__":
+    main()
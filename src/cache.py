@@ -0,0 +1,216 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Версия формата кеша: при изменении схемы загрузки старые кеши перестраиваются
+CACHE_VERSION = 6
+CACHE_DIR = os.getenv("TRANSACTIONS_CACHE_DIR", "data/.cache")
+
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+def _file_hash(file_path: str) -> str:
+    """Подсчет SHA-256 содержимого файла."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_root(file_path: str, cache_dir: str) -> str:
+    """Каталог кеша для конкретного файла-источника."""
+    abs_path = os.path.abspath(file_path)
+    path_hash = hashlib.sha1(abs_path.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(cache_dir, f"{os.path.basename(file_path)}-{path_hash}")
+
+
+def _is_json_scalar(value: Any) -> bool:
+    return isinstance(value, (str, bool, int, float)) and not isinstance(value, np.generic)
+
+
+def _encode_column(series: pd.Series, data_dir: str, index: int) -> Dict[str, Any]:
+    """Сохранение одной колонки в .npy и описание её типа для meta.json."""
+    file_name = f"{index}.npy"
+    column: Dict[str, Any] = {"name": series.name, "file": file_name}
+    dtype = series.dtype
+
+    if isinstance(dtype, pd.CategoricalDtype):
+        categories = dtype.categories.tolist()
+        if not all(_is_json_scalar(c) for c in categories):
+            raise TypeError(f"Колонка {series.name!r}: неподдерживаемые значения категорий")
+        column.update(kind="category", categories=categories, ordered=bool(dtype.ordered))
+        values = series.cat.codes.to_numpy()
+    elif isinstance(dtype, pd.DatetimeTZDtype):
+        column.update(kind="datetime", tz=str(dtype.tz))
+        values = series.dt.tz_convert("UTC").dt.tz_localize(None).to_numpy("datetime64[ns]").view("int64")
+    elif pd.api.types.is_datetime64_dtype(dtype):
+        column.update(kind="datetime", tz=None)
+        values = series.to_numpy("datetime64[ns]").view("int64")
+    elif isinstance(dtype, np.dtype) and dtype.kind in "biuf":
+        column.update(kind="numeric")
+        values = series.to_numpy()
+    elif isinstance(dtype, pd.api.extensions.ExtensionDtype) and pd.api.types.is_numeric_dtype(dtype):
+        # Nullable-типы (Int16, Float64 ...) храним как значения + маску пропусков
+        mask_file = f"{index}.mask.npy"
+        column.update(kind="masked", dtype=str(dtype), mask_file=mask_file)
+        np.save(os.path.join(data_dir, mask_file), series.isna().to_numpy())
+        values = series.to_numpy(dtype=dtype.numpy_dtype, na_value=0)
+    else:
+        # Строковые колонки кодируются словарем: коды int32 + список уникальных значений
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        uniques = uniques.tolist()
+        if not all(_is_json_scalar(u) for u in uniques):
+            raise TypeError(f"Колонка {series.name!r}: неподдерживаемые значения для кеша")
+        column.update(kind="object", uniques=uniques)
+        values = codes.astype(np.int32)
+
+    np.save(os.path.join(data_dir, file_name), np.ascontiguousarray(values))
+    return column
+
+
+def _decode_column(column: Dict[str, Any], data_dir: str) -> Any:
+    """Загрузка колонки из .npy через memory-map."""
+    # Обычный ndarray поверх отображения (без копирования): подкласс memmap не попадает в колонки
+    values = np.asarray(np.load(os.path.join(data_dir, column["file"]), mmap_mode="r"))
+    kind = column["kind"]
+
+    if kind == "category":
+        dtype = pd.CategoricalDtype(column["categories"], ordered=column["ordered"])
+        return pd.Categorical.from_codes(values, dtype=dtype)
+    if kind == "datetime":
+        result = pd.DatetimeIndex(values.view("datetime64[ns]"))
+        if column["tz"]:
+            result = result.tz_localize("UTC").tz_convert(column["tz"])
+        return result
+    if kind == "masked":
+        result = pd.array(np.asarray(values), dtype=column["dtype"])
+        result[np.load(os.path.join(data_dir, column["mask_file"]))] = pd.NA
+        return result
+    if kind == "object":
+        # Код -1 означает пропуск: последним элементом словаря кладем NaN
+        lookup = np.empty(len(column["uniques"]) + 1, dtype=object)
+        lookup[:-1] = column["uniques"]
+        lookup[-1] = np.nan
+        return lookup[values]
+    return values
+
+
+def save_columnar(df: pd.DataFrame, data_dir: str) -> List[Dict[str, Any]]:
+    """Сохранение DataFrame в колоночном виде (по одному .npy на колонку)."""
+    os.makedirs(data_dir, exist_ok=True)
+    return [_encode_column(df[name], data_dir, i) for i, name in enumerate(df.columns)]
+
+
+def load_columnar(
+    columns: List[Dict[str, Any]], data_dir: str, attrs: Optional[Dict[str, Any]] = None
+) -> pd.DataFrame:
+    """Сборка DataFrame из колоночного кеша.
+
+    Колонки не копируются и не объединяются в общие блоки (copy=False): числовые
+    колонки, даты и коды категорий остаются отображенными в память (только чтение).
+    """
+    df = pd.DataFrame({column["name"]: _decode_column(column, data_dir) for column in columns}, copy=False)
+    df.attrs.update(attrs or {})
+    return df
+
+
+def _load(meta: Dict[str, Any], root: str, file_path: str) -> Optional[pd.DataFrame]:
+    """DataFrame из кеша по meta или None, если файлы кеша повреждены или удалены."""
+    try:
+        return load_columnar(meta["columns"], os.path.join(root, meta["data"]), meta["attrs"])
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.warning(f"Кеш для {file_path} не читается, перестраиваем: {e}")
+        return None
+
+
+def _read_meta(meta_path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("version") == CACHE_VERSION else None
+
+
+def write_json_atomic(path: str, data: Any) -> None:
+    """Атомарная запись JSON: читатели видят либо старый, либо новый файл целиком."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _store(df: pd.DataFrame, file_path: str, root: str, stat: os.stat_result, content_hash: str) -> None:
+    os.makedirs(root, exist_ok=True)
+    data_name = content_hash[:16]
+    data_dir = os.path.join(root, data_name)
+    shutil.rmtree(data_dir, ignore_errors=True)
+    columns = save_columnar(df, data_dir)
+    write_json_atomic(os.path.join(root, "meta.json"), {
+        "version": CACHE_VERSION,
+        "source": os.path.abspath(file_path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": content_hash,
+        "data": data_name,
+        "rows": len(df),
+        "attrs": df.attrs,
+        "columns": columns,
+    })
+    # Удаляем данные от предыдущих версий источника
+    for entry in os.listdir(root):
+        entry_path = os.path.join(root, entry)
+        if entry != data_name and os.path.isdir(entry_path):
+            shutil.rmtree(entry_path, ignore_errors=True)
+    logger.info(f"Кеш транзакций перестроен: {file_path} ({len(df)} строк)")
+
+
+def load_cached(
+    file_path: str, loader: Callable[[str], pd.DataFrame], cache_dir: Optional[str] = None
+) -> pd.DataFrame:
+    """Загрузка DataFrame через колоночный кеш.
+
+    При первом чтении источник разбирается функцией loader и сохраняется в кеш.
+    Повторные чтения отображают кеш в память и перестраивают его только если
+    изменились размер/mtime файла и при этом его содержимое (SHA-256), либо
+    если файлы кеша не читаются (удалены, повреждены).
+    """
+    root = _cache_root(file_path, cache_dir or CACHE_DIR)
+    meta_path = os.path.join(root, "meta.json")
+    stat = os.stat(file_path)
+    meta = _read_meta(meta_path)
+
+    if meta is not None and (meta["size"], meta["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+        df = _load(meta, root, file_path)
+        if df is not None:
+            return df
+        meta = None
+
+    content_hash = _file_hash(file_path)
+    if meta is not None and meta["sha256"] == content_hash:
+        df = _load(meta, root, file_path)
+        if df is not None:
+            # Файл перезаписан без изменений: обновляем только отметки
+            meta.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            write_json_atomic(meta_path, meta)
+            return df
+
+    df = loader(file_path)
+    try:
+        _store(df, file_path, root, stat, content_hash)
+    except (OSError, TypeError) as e:
+        logger.warning(f"Не удалось сохранить кеш для {file_path}: {e}")
+    return df
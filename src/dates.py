@@ -0,0 +1,179 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.store import derived_for
+
+logger = logging.getLogger(__name__)
+
+# Форматы выгрузки банка: сначала день, потом месяц (31.12.2021 16:44:00)
+DATE_FORMATS = (
+    "%d.%m.%Y %H:%M:%S",
+    "%d.%m.%Y",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d",
+    "%Y-%m-%dT%H:%M:%S",
+)
+
+# Колонки с датами и форматы, которые в них ожидаются в первую очередь
+DATE_COLUMNS = {
+    "Дата операции": DATE_FORMATS,
+    "Дата платежа": ("%d.%m.%Y",) + DATE_FORMATS,
+}
+
+_DETECT_SAMPLE_SIZE = 200
+
+# Граница периода: строка с датой, datetime или pd.Timestamp
+DateLike = Union[str, datetime]
+
+
+class DateParseResult(NamedTuple):
+    values: pd.Series
+    formats: List[str]
+    invalid: pd.Index
+
+
+def _parse_with_formats(values: pd.Series, formats: Iterable[str]) -> Tuple[pd.Series, List[str]]:
+    """Последовательный разбор строк фиксированными форматами.
+
+    Каждый формат применяется векторно только к значениям, не разобранным предыдущими.
+    Возвращает разобранные значения и список форматов, которые реально сработали.
+    """
+    parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    used = []
+    for fmt in formats:
+        pending = parsed.isna()
+        if not pending.any():
+            break
+        attempt = pd.to_datetime(values[pending], format=fmt, errors="coerce")
+        if attempt.notna().any():
+            parsed[pending] = attempt
+            used.append(fmt)
+    return parsed, used
+
+
+def detect_formats(values: Iterable[Any], formats: Sequence[str] = DATE_FORMATS) -> List[str]:
+    """Определение форматов дат по выборке уникальных строк."""
+    uniques = pd.Series(pd.unique(pd.Series(values).dropna().astype(str).str.strip()))
+    if len(uniques) > _DETECT_SAMPLE_SIZE:
+        step = len(uniques) // _DETECT_SAMPLE_SIZE
+        uniques = uniques.iloc[::step].reset_index(drop=True)
+    return _parse_with_formats(uniques, formats)[1]
+
+
+def parse_dates(values: pd.Series, formats: Sequence[str] = DATE_FORMATS) -> DateParseResult:
+    """Векторный разбор колонки с датами без угадывания формата.
+
+    Каждая уникальная строка разбирается один раз, результат раскладывается по строкам
+    через коды factorize. Неразборчивые значения становятся NaT и возвращаются в invalid
+    вместо исключения.
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return DateParseResult(values, [], values.index[:0])
+
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    uniques = pd.Series(uniques, dtype=object)
+    is_text = uniques.map(lambda v: isinstance(v, str))
+
+    detected = detect_formats(uniques[is_text], formats)
+    # Форматы, не попавшие в выборку, остаются запасными для редких строк
+    ordered = detected + [fmt for fmt in formats if fmt not in detected]
+    parsed, used = _parse_with_formats(uniques[is_text].str.strip(), ordered)
+
+    parsed_uniques = pd.Series(pd.NaT, index=uniques.index, dtype="datetime64[ns]")
+    parsed_uniques[is_text] = parsed
+    if (~is_text).any():
+        # Значения, уже прочитанные как даты (например, ячейки Excel)
+        parsed_uniques[~is_text] = pd.to_datetime(uniques[~is_text], errors="coerce")
+
+    lookup = np.append(parsed_uniques.to_numpy("datetime64[ns]"), np.datetime64("NaT", "ns"))
+    result = pd.Series(lookup[codes], index=values.index, name=values.name)
+    invalid = values.index[(codes >= 0) & result.isna().to_numpy()]
+    return DateParseResult(result, used, invalid)
+
+
+def parse_transaction_dates(df: pd.DataFrame) -> Dict[str, pd.Index]:
+    """Разбор всех колонок с датами в DataFrame транзакций.
+
+    Возвращает словарь {колонка: индексы неразобранных строк}.
+    """
+    report = {}
+    for column, formats in DATE_COLUMNS.items():
+        if column not in df.columns:
+            continue
+        result = parse_dates(df[column], formats)
+        df[column] = result.values
+        if len(result.invalid):
+            report[column] = result.invalid
+            logger.warning(
+                f"Колонка '{column}': не удалось разобрать {len(result.invalid)} дат(ы), "
+                f"строки {list(result.invalid[:10])}"
+            )
+    return report
+
+
+def is_sorted_by_date(df: pd.DataFrame, column: str = "Дата операции") -> bool:
+    """Идут ли даты колонки по возрастанию (NaT — только в конце), как после sort_by_date.
+
+    Проверяются сами значения (O(n) без копирования), а не отметка в attrs:
+    pandas сохраняет attrs при любой перестановке строк той же длины.
+    """
+    if column not in df.columns or not pd.api.types.is_datetime64_any_dtype(df[column].dtype):
+        return False
+    values = pd.DatetimeIndex(df[column]).asi8
+    missing = values == np.iinfo(np.int64).min
+    valid = len(values) - int(missing.sum())
+    return not missing[:valid].any() and bool(np.all(values[1:valid] >= values[:valid - 1]))
+
+
+def sort_by_date(df: pd.DataFrame, column: str = "Дата операции") -> pd.DataFrame:
+    """Сортировка транзакций по дате (NaT в конце) для бинарного поиска в slice_by_period."""
+    return df.sort_values(column, kind="stable", na_position="last").reset_index(drop=True)
+
+
+def slice_by_period(
+    df: pd.DataFrame,
+    start_date: DateLike,
+    end_date: DateLike,
+    column: str = "Дата операции",
+    presorted: Optional[bool] = None,
+) -> pd.DataFrame:
+    """Транзакции с датой в интервале [start_date, end_date] (обе границы включительно).
+
+    Для DataFrame, отсортированного по дате (см. is_sorted_by_date; для снимка
+    хранилища проверка — одна на версию данных, presorted — уже известный
+    результат), границы находятся бинарным поиском и возвращается срез строк
+    без копирования. Иначе используется маска.
+    """
+    if presorted is None:
+        presorted = derived_for(df, f"sorted_by_date:{column}", lambda d: is_sorted_by_date(d, column))
+    if not presorted:
+        return df[(df[column] >= start_date) & (df[column] <= end_date)]
+
+    dates = df[column]
+    start = dates.searchsorted(pd.Timestamp(start_date), side="left")
+    end = dates.searchsorted(pd.Timestamp(end_date), side="right")
+    return df.iloc[start:end]
+
+
+# Номер месяца для пропущенной даты в month_codes
+NO_MONTH = np.iinfo(np.int64).min
+
+
+def month_code(year: int, month: int) -> int:
+    """Номер месяца от 1970-01 (январь 1970 — 0)."""
+    return (year - 1970) * 12 + month - 1
+
+
+def month_codes(values: pd.Series) -> np.ndarray:
+    """Номера месяцев дат (строки или datetime) от 1970-01 без форматирования строк; пропуск — NO_MONTH."""
+    dates = pd.DatetimeIndex(parse_dates(values).values)
+    if dates.tz is not None:
+        dates = dates.tz_localize(None)
+    codes: np.ndarray = dates.to_numpy().astype("datetime64[M]").astype(np.int64)
+    codes[np.asarray(dates.isna())] = NO_MONTH
+    return codes
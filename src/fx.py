@@ -0,0 +1,208 @@
+import logging
+import os
+from typing import Dict, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+from src.schema import AMOUNT_UNIT_ATTR, ORIGINAL_AMOUNT_COLUMN
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Валюта, в которой считаются все итоги, и локальная таблица исторических курсов
+# (CSV с колонками date, currency, rate — рублей за единицу валюты)
+REPORTING_CURRENCY = os.getenv("REPORTING_CURRENCY", "RUB")
+FX_RATES_FILE = os.getenv("FX_RATES_FILE", "data/fx_rates.csv")
+
+BASE_CURRENCY = "RUB"
+
+# Отметка в DataFrame.attrs: валюта колонки "Сумма операции"
+CURRENCY_ATTR = "currency"
+
+# Исходная валюта операции сохраняется рядом с пересчитанной суммой (сумма — в ORIGINAL_AMOUNT_COLUMN)
+ORIGINAL_CURRENCY_COLUMN = "Исходная валюта операции"
+
+# Отметка в DataFrame.attrs: число операций, которые не удалось пересчитать (нет курса)
+UNCONVERTED_ATTR = "unconverted"
+
+_DAY_NS = 24 * 60 * 60 * 10**9
+
+
+def _days(dates: pd.Series) -> np.ndarray:
+    """Полночь каждой даты в наносекундах (int64)."""
+    values = np.asarray(pd.to_datetime(dates), dtype="datetime64[ns]").view(np.int64)
+    return values - values % _DAY_NS
+
+
+class FxTable:
+    """Исторические курсы валют: рублей за единицу валюты по дням.
+
+    Курс на дату — последний известный на эту дату или раньше, для дат до
+    первого известного — первый известный. Поиск векторный: один searchsorted
+    по всем строкам каждой валюты, без обращений к таблице на каждую строку.
+    """
+
+    def __init__(self, rates: Optional[pd.DataFrame] = None) -> None:
+        # Валюта -> (отсортированные дни, курсы)
+        self._series: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        if rates is not None and not rates.empty:
+            rates = rates.assign(day=_days(rates["date"])).sort_values(["currency", "day"], kind="stable")
+            rates = rates.drop_duplicates(["currency", "day"], keep="last")
+            for currency, group in rates.groupby("currency", sort=False):
+                self._series[str(currency)] = (group["day"].to_numpy(), group["rate"].to_numpy(dtype=np.float64))
+
+    @property
+    def currencies(self) -> Set[str]:
+        return {BASE_CURRENCY, *self._series}
+
+    @classmethod
+    def from_csv(cls, path: str = FX_RATES_FILE) -> "FxTable":
+        """Таблица из CSV (date, currency, rate); если файла нет — пустая."""
+        if not os.path.exists(path):
+            return cls()
+        return cls(pd.read_csv(path, parse_dates=["date"]))
+
+    @classmethod
+    def implied(cls, df: pd.DataFrame) -> "FxTable":
+        """Курсы, заданные самой выгрузкой: операции в валюте, оплаченные в рублях (и наоборот).
+
+        Курс дня — медиана отношений сумм платежа и операции за день.
+        """
+        columns = ("Валюта операции", "Валюта платежа", "Сумма операции", "Сумма платежа", "Дата операции")
+        if not all(column in df.columns for column in columns):
+            return cls()
+        operation = df["Валюта операции"].astype(object)
+        payment = df["Валюта платежа"].astype(object)
+        amount = pd.to_numeric(df["Сумма операции"], errors="coerce").abs().astype("float64")
+        paid = pd.to_numeric(df["Сумма платежа"], errors="coerce").abs().astype("float64")
+        valid = (amount > 0) & (paid > 0)
+
+        foreign_paid_in_rub = valid & (payment == BASE_CURRENCY) & (operation != BASE_CURRENCY)
+        rub_paid_in_foreign = valid & (operation == BASE_CURRENCY) & (payment != BASE_CURRENCY)
+        rates = pd.concat([
+            pd.DataFrame({
+                "date": df["Дата операции"][foreign_paid_in_rub],
+                "currency": operation[foreign_paid_in_rub],
+                "rate": (paid / amount)[foreign_paid_in_rub],
+            }),
+            pd.DataFrame({
+                "date": df["Дата операции"][rub_paid_in_foreign],
+                "currency": payment[rub_paid_in_foreign],
+                "rate": (amount / paid)[rub_paid_in_foreign],
+            }),
+        ], ignore_index=True)
+        rates = rates.dropna()
+        if rates.empty:
+            return cls()
+        rates["date"] = pd.to_datetime(_days(rates["date"]))
+        return cls(rates.groupby(["date", "currency"], as_index=False)["rate"].median())
+
+    def combine(self, other: "FxTable") -> "FxTable":
+        """Таблица, в которой курсы other дополняют курсы этой таблицы (при совпадении дня берется этот курс)."""
+        frames = [
+            pd.DataFrame({"date": pd.to_datetime(days), "currency": currency, "rate": rates})
+            for table in (other, self)
+            for currency, (days, rates) in table._series.items()
+        ]
+        return FxTable(pd.concat(frames, ignore_index=True) if frames else None)
+
+    def rates(self, currencies: np.ndarray, dates: pd.Series) -> np.ndarray:
+        """Курс (рублей за единицу) каждой валюты на каждую дату; неизвестная валюта — NaN."""
+        categorical = pd.Categorical(currencies)
+        days = _days(dates)
+        result = np.full(len(days), np.nan)
+        codes = categorical.codes
+        for code, currency in enumerate(categorical.categories):
+            mask = codes == code
+            if currency == BASE_CURRENCY:
+                result[mask] = 1.0
+            elif currency in self._series:
+                known_days, known_rates = self._series[currency]
+                position = np.searchsorted(known_days, days[mask], side="right") - 1
+                result[mask] = known_rates[np.clip(position, 0, len(known_rates) - 1)]
+        return result
+
+    def convert(self, amounts: np.ndarray, currencies: np.ndarray, dates: pd.Series, to_currency: str) -> np.ndarray:
+        """Суммы amounts в валютах currencies на даты dates в валюте to_currency (кросс-курс через рубль)."""
+        amounts = np.asarray(amounts, dtype=np.float64)
+        rates = self.rates(currencies, dates)
+        if to_currency != BASE_CURRENCY:
+            rates = rates / self.rates(np.full(len(amounts), to_currency), dates)
+        converted: np.ndarray = amounts * rates
+        return converted
+
+
+def fx_table(df: Optional[pd.DataFrame] = None, path: str = FX_RATES_FILE) -> FxTable:
+    """Таблица курсов: локальный файл FX_RATES_FILE, дополненный курсами из выгрузки df."""
+    table = FxTable.from_csv(path)
+    if df is not None:
+        table = table.combine(FxTable.implied(df))
+    return table
+
+
+def to_reporting_currency(
+    df: pd.DataFrame, currency: str = REPORTING_CURRENCY, table: Optional[FxTable] = None
+) -> pd.DataFrame:
+    """Транзакции с колонкой "Сумма операции" в валюте отчетности currency.
+
+    Операция в валюте отчетности не меняется; если она оплачена в валюте
+    отчетности, берется "Сумма платежа" (фактический курс банка); остальные
+    пересчитываются по таблице курсов на дату операции. Исходные сумма и валюта
+    сохраняются в колонках ORIGINAL_AMOUNT_COLUMN и ORIGINAL_CURRENCY_COLUMN.
+    Суммы остаются в тех же единицах (копейки или рубли), что и в df.
+
+    Операции в валюте, курса которой нет, не пересчитываются и не попадают в
+    итоги: "Сумма операции" у них — пропуск (NA), "Валюта операции" остается
+    исходной, исходная сумма — в ORIGINAL_AMOUNT_COLUMN; их число — в
+    attrs[UNCONVERTED_ATTR].
+    """
+    if "Валюта операции" not in df.columns:
+        result = df.copy(deep=False)
+        result.attrs[CURRENCY_ATTR] = currency
+        return result
+    operation = df["Валюта операции"].astype(object).fillna(currency).to_numpy()
+    same = operation == currency
+    result = df.copy(deep=False)
+    result[ORIGINAL_AMOUNT_COLUMN] = df["Сумма операции"]
+    result[ORIGINAL_CURRENCY_COLUMN] = df["Валюта операции"]
+    result.attrs[CURRENCY_ATTR] = currency
+    result.attrs[UNCONVERTED_ATTR] = 0
+    if same.all():
+        return result
+
+    amounts = pd.to_numeric(df["Сумма операции"], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    converted = amounts.copy()
+    currencies = operation.copy()
+    paid = np.zeros(len(df), dtype=bool)
+    if "Валюта платежа" in df.columns and "Сумма платежа" in df.columns:
+        payment = pd.to_numeric(df["Сумма платежа"], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        paid = ~same & (df["Валюта платежа"].astype(object).to_numpy() == currency) & ~np.isnan(payment)
+        converted[paid] = payment[paid]
+        currencies[paid] = currency
+
+    rest = ~same & ~paid
+    if rest.any():
+        table = table if table is not None else fx_table(df)
+        rest_converted = table.convert(amounts[rest], operation[rest], df["Дата операции"][rest], currency)
+        missing = np.isnan(rest_converted) & ~np.isnan(amounts[rest])
+        if missing.any():
+            unknown = ", ".join(sorted(set(operation[rest][missing])))
+            logger.warning(
+                f"Нет курса {unknown} к {currency}: {int(missing.sum())} операций не пересчитаны и не входят в итоги"
+            )
+            result.attrs[UNCONVERTED_ATTR] = int(missing.sum())
+        # Без курса суммы в валюте отчетности нет: NaN, а не сумма в исходной валюте
+        converted[rest] = rest_converted
+        currencies[rest] = np.where(missing, operation[rest], currency)
+
+    if result.attrs.get(AMOUNT_UNIT_ATTR) == "kopecks":
+        converted = pd.Series(np.round(converted), index=df.index)
+        converted = converted.astype("Int64" if converted.isna().any() else np.int64)
+    else:
+        converted = pd.Series(np.round(converted, 2), index=df.index)
+    result["Сумма операции"] = converted
+    result["Валюта операции"] = pd.Categorical(currencies)
+    return result
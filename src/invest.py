@@ -0,0 +1,121 @@
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.dates import NO_MONTH, DateLike, month_code, month_codes
+from src.models import Transaction
+from src.schema import amounts_in_kopecks
+from src.store import derived_for
+
+# Шаги округления Инвесткопилки по умолчанию, руб.
+DEFAULT_THRESHOLDS = (10, 50, 100)
+
+# Сколько банк отложил с операции (целые рубли) — колонка выгрузки
+EXPORT_ROUND_UP_COLUMN = "Округление на инвесткопилку"
+
+
+def _steps(thresholds: Sequence[float]) -> np.ndarray:
+    """Шаги округления в копейках (int64)."""
+    steps = np.round(np.asarray(thresholds, dtype=np.float64).reshape(-1) * 100).astype(np.int64)
+    if not len(steps) or (steps <= 0).any():
+        raise ValueError("Шаг округления должен быть положительным")
+    return steps
+
+
+def _month(value: DateLike) -> int:
+    """Номер месяца 'YYYY-MM' (или даты) от 1970-01."""
+    timestamp = pd.Timestamp(value)
+    return month_code(timestamp.year, timestamp.month)
+
+
+def _expenses(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """Месяцы и суммы расходов (копейки по модулю) — то, что округляет копилка.
+
+    Неуспешные операции (статус не OK) не списываются и не округляются.
+    """
+    months = month_codes(df["Дата операции"])
+    amounts = amounts_in_kopecks(df)
+    mask = (amounts < 0) & (months != NO_MONTH)
+    if "Статус" in df.columns:
+        mask &= np.asarray(df["Статус"] == "OK", dtype=bool)
+    return months[mask], -amounts[mask]
+
+
+def round_ups(amounts: np.ndarray, thresholds: Sequence[float]) -> np.ndarray:
+    """Округления сумм amounts (копейки по модулю) вверх до кратного каждому шагу, в копейках.
+
+    Матрица len(amounts) × len(thresholds); сумма, уже кратная шагу, не округляется.
+    """
+    return _round_ups(np.asarray(amounts, dtype=np.int64), _steps(thresholds))
+
+
+def _round_ups(amounts: np.ndarray, steps: np.ndarray) -> np.ndarray:
+    # Остаток от деления с отрицательным делимым в NumPy неотрицателен: -a mod s — недостача до кратного
+    result: np.ndarray = -amounts[:, None] % steps
+    return result
+
+
+def investment_savings(
+    transactions: Union[pd.DataFrame, List[Transaction]],
+    thresholds: Sequence[float] = DEFAULT_THRESHOLDS,
+    start_month: Optional[DateLike] = None,
+    end_month: Optional[DateLike] = None,
+) -> pd.DataFrame:
+    """Отложенное в Инвесткопилку по месяцам сразу для нескольких шагов округления.
+
+    Каждый расход округляется вверх до кратного шагу, разница откладывается.
+    transactions — DataFrame или список записей. Возвращает DataFrame: строки —
+    месяцы 'YYYY-MM' от start_month до end_month включительно (по умолчанию весь
+    период данных, месяцы без расходов — нули), колонки — шаги, значения — рубли.
+
+    Для снимка хранилища месяцы и суммы расходов извлекаются один раз на версию
+    данных; округления для всех шагов и итоги по месяцам считаются одним
+    проходом NumPy по расходам периода.
+    """
+    df = transactions if isinstance(transactions, pd.DataFrame) else pd.DataFrame(transactions)
+    columns = pd.Index(np.asarray(thresholds).reshape(-1), name="Шаг")
+    steps = _steps(thresholds)
+    if df.empty:
+        months, amounts = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    else:
+        months, amounts = derived_for(df, "invest_expenses", _expenses)
+    if start_month is None and end_month is None and not len(months):
+        return pd.DataFrame(np.zeros((0, len(steps))), index=pd.Index([], name="Месяц", dtype=object), columns=columns)
+
+    if start_month is not None:
+        first = _month(start_month)
+    else:
+        first = int(np.min(np.append(months, [_month(end_month)] if end_month is not None else [])))
+    last = _month(end_month) if end_month is not None else int(months.max(initial=first))
+    n_months = max(last - first + 1, 0)
+    in_range = (months >= first) & (months <= last)
+
+    # Итоги (месяц, шаг) — одна bincount по развернутой матрице округлений
+    cells = (months[in_range] - first)[:, None] * len(steps) + np.arange(len(steps))
+    totals = np.bincount(
+        cells.ravel(), weights=_round_ups(amounts[in_range], steps).ravel(), minlength=n_months * len(steps)
+    ).round().reshape(n_months, len(steps))
+    index = pd.Index(np.arange(first, first + n_months).astype("datetime64[M]").astype(str), name="Месяц")
+    return pd.DataFrame(totals / 100, index=index, columns=columns)
+
+
+def export_matches(df: pd.DataFrame, thresholds: Sequence[float] = DEFAULT_THRESHOLDS) -> pd.DataFrame:
+    """Проверка симуляции по округлениям, которые банк указал в выгрузке.
+
+    Сравниваются только операции с ненулевым EXPORT_ROUND_UP_COLUMN: копилка
+    подключается не ко всем картам и не на весь период, а шаг в ней можно менять.
+    Возвращает DataFrame месяц × шаг из bool: True — с этим шагом совпали все
+    округления месяца.
+    """
+    exported = pd.to_numeric(df[EXPORT_ROUND_UP_COLUMN], errors="coerce").fillna(0).to_numpy(dtype=np.int64) * 100
+    amounts = amounts_in_kopecks(df)
+    rows = (exported > 0) & (amounts < 0)
+    months = month_codes(df["Дата операции"])[rows]
+    mismatched = round_ups(-amounts[rows], thresholds) != exported[rows][:, None]
+
+    present, codes = np.unique(months, return_inverse=True)
+    failures = np.zeros((len(present), mismatched.shape[1]), dtype=np.int64)
+    np.add.at(failures, codes.reshape(-1), mismatched)
+    index = pd.Index(present.astype("datetime64[M]").astype(str), name="Месяц")
+    return pd.DataFrame(failures == 0, index=index, columns=pd.Index(np.asarray(thresholds).reshape(-1), name="Шаг"))
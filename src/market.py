@@ -0,0 +1,654 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Protocol, Tuple, TypeVar
+
+import pandas as pd
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from src.cache import CACHE_DIR, write_json_atomic
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+CURRENCY_API_URL = os.getenv("CURRENCY_API_URL")
+CURRENCY_API_KEY = os.getenv("CURRENCY_API_KEY")
+CURRENCY_CACHE_TTL = float(os.getenv("CURRENCY_CACHE_TTL", "3600"))
+MARKET_CACHE_DIR = os.getenv("MARKET_CACHE_DIR", os.path.join(CACHE_DIR, "market"))
+MARKET_HTTP_TIMEOUT = float(os.getenv("MARKET_HTTP_TIMEOUT", "5"))
+
+STOCK_API_URL = os.getenv("STOCK_API_URL")
+STOCK_API_KEY = os.getenv("STOCK_API_KEY")
+# alphavantage — STOCK_API_URL, yfinance — библиотека yfinance
+STOCK_PROVIDER = os.getenv("STOCK_PROVIDER", "alphavantage")
+# Пакетный запрос котировок Alpha Vantage (REALTIME_BULK_QUOTES, доступен не на всех тарифах)
+STOCK_API_BATCH = os.getenv("STOCK_API_BATCH", "").lower() in ("1", "true", "yes")
+STOCK_CACHE_TTL = float(os.getenv("STOCK_CACHE_TTL", "300"))
+STOCK_FETCH_WORKERS = int(os.getenv("STOCK_FETCH_WORKERS", "8"))
+
+# Фоновое обновление: период проверки (сек); размыкатель цепи: ошибок подряд до
+# размыкания, начальная и максимальная пауза перед повторным обращением (сек)
+MARKET_REFRESH_INTERVAL = float(os.getenv("MARKET_REFRESH_INTERVAL", "30"))
+MARKET_BREAKER_THRESHOLD = int(os.getenv("MARKET_BREAKER_THRESHOLD", "3"))
+MARKET_BREAKER_TIMEOUT = float(os.getenv("MARKET_BREAKER_TIMEOUT", "30"))
+MARKET_BREAKER_MAX_TIMEOUT = float(os.getenv("MARKET_BREAKER_MAX_TIMEOUT", "600"))
+
+USER_SETTINGS_FILE = os.getenv("USER_SETTINGS_FILE", "user_settings.json")
+
+BASE_CURRENCY = "RUB"
+DEFAULT_CURRENCIES = ["USD", "EUR"]
+DEFAULT_STOCKS = ["AAPL", "AMZN"]
+
+T = TypeVar("T")
+
+# Курсы {код валюты: рублей за единицу} и котировка бумаги (время получения, цена)
+Rates = Dict[str, float]
+Quote = Tuple[float, float]
+
+
+def load_user_settings(file_path: str = USER_SETTINGS_FILE) -> Dict[str, Any]:
+    """Чтение настроек пользователя (user_currencies, user_stocks); при ошибке — пустые настройки."""
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            settings: Dict[str, Any] = json.load(f)
+            return settings
+    except (OSError, ValueError) as e:
+        logger.warning(f"Не удалось прочитать настройки {file_path}: {e}")
+        return {}
+
+
+_user_settings: Optional[Dict[str, Any]] = None
+
+
+def user_settings() -> Dict[str, Any]:
+    """Настройки пользователя процесса: файл читается один раз, при первом обращении."""
+    global _user_settings
+    if _user_settings is None:
+        _user_settings = load_user_settings()
+    return _user_settings
+
+
+def user_currencies() -> List[str]:
+    """Валюты из настроек пользователя."""
+    currencies: List[str] = user_settings().get("user_currencies", DEFAULT_CURRENCIES)
+    return currencies
+
+
+def user_stocks() -> List[str]:
+    """Бумаги из настроек пользователя."""
+    stocks: List[str] = user_settings().get("user_stocks", DEFAULT_STOCKS)
+    return stocks
+
+
+def make_session(pool_size: int = 10) -> requests.Session:
+    """Сессия requests с пулом соединений: повторные запросы к провайдеру не открывают новое соединение."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class SingleFlight:
+    """Объединение одновременных одинаковых вызовов в один.
+
+    Первый вызов с данным ключом выполняет функцию, остальные, пришедшие до его
+    завершения, ждут и получают тот же результат (или то же исключение).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, func: Callable[[], T]) -> T:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if future is None:
+                future = self._calls[key] = Future()
+        if not leader:
+            shared: T = future.result()
+            return shared
+
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class JsonFileCache:
+    """Значение с отметкой времени в памяти и в JSON-файле на диске.
+
+    Файл общий для процессов (например, рабочих процессов сервера) и переживает
+    перезапуск; запись атомарная.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._entry: Optional[Tuple[float, Any]] = None
+        self._mtime: Optional[int] = None
+
+    def get(self) -> Optional[Tuple[float, Any]]:
+        """(время получения, значение) или None; файл перечитывается, если его изменил другой процесс."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return self._entry
+        if mtime != self._mtime:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    stored = json.load(f)
+                entry = (float(stored["fetched_at"]), stored["value"])
+            except (OSError, ValueError, KeyError, TypeError):
+                return self._entry
+            self._mtime = mtime
+            if self._entry is None or entry[0] >= self._entry[0]:
+                self._entry = entry
+        return self._entry
+
+    def get_fresh(self, ttl: float) -> Any:
+        """Значение не старше ttl секунд или None."""
+        entry = self.get()
+        if entry is not None and time.time() - entry[0] < ttl:
+            return entry[1]
+        return None
+
+    def set(self, value: Any) -> None:
+        fetched_at = time.time()
+        self._entry = (fetched_at, value)
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            write_json_atomic(self.path, {"fetched_at": fetched_at, "value": value})
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить кеш {self.path}: {e}")
+
+
+def _rub_rates(payload: Dict[str, Any]) -> Rates:
+    """Курсы в рублях за единицу валюты из ответа вида {"base": ..., "rates": {...}}."""
+    rates = payload["rates"]
+    rub = rates.get(BASE_CURRENCY, 1.0 if payload.get("base", BASE_CURRENCY) == BASE_CURRENCY else None)
+    if rub is None:
+        raise ValueError(f"В ответе провайдера нет курса {BASE_CURRENCY}")
+    return {currency: round(rub / rate, 4) for currency, rate in rates.items() if rate}
+
+
+class CurrencyRatesClient:
+    """Клиент провайдера курсов валют (CURRENCY_API_URL).
+
+    Ответ провайдера сохраняется на диск и используется ttl секунд; одновременные
+    запросы за истекшим значением превращаются в один запрос к провайдеру. Если
+    провайдер недоступен, возвращается последнее полученное значение, а при его
+    отсутствии ошибка передается вызывающему.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = CURRENCY_API_URL,
+        api_key: Optional[str] = CURRENCY_API_KEY,
+        ttl: float = CURRENCY_CACHE_TTL,
+        cache_path: Optional[str] = None,
+        session: Optional[requests.Session] = None,
+        timeout: float = MARKET_HTTP_TIMEOUT,
+    ) -> None:
+        self.url = url
+        self.api_key = api_key
+        self.ttl = ttl
+        self.timeout = timeout
+        self._session = session or make_session()
+        self._cache = JsonFileCache(cache_path or os.path.join(MARKET_CACHE_DIR, "currency_rates.json"))
+        self._flight = SingleFlight()
+
+    def rates(self) -> Rates:
+        """Курсы всех валют провайдера в рублях за единицу: {код: курс}."""
+        try:
+            return self.update()
+        except (requests.RequestException, ValueError, KeyError) as e:
+            stale = self._cache.get()
+            if stale is None:
+                raise
+            logger.warning(f"Провайдер курсов недоступен ({e}), используются курсы от {time.ctime(stale[0])}")
+            rates: Rates = stale[1]
+            return rates
+
+    def update(self, max_age: Optional[float] = None) -> Rates:
+        """Курсы не старше max_age секунд (по умолчанию ttl), при необходимости запрошенные у провайдера.
+
+        В отличие от rates ошибка провайдера передается вызывающему.
+        """
+        age = self.ttl if max_age is None else max_age
+        rates: Optional[Rates] = self._cache.get_fresh(age)
+        if rates is not None:
+            return rates
+        return self._flight.do(self.url, lambda: self._update(age))
+
+    def _update(self, max_age: float) -> Rates:
+        # Значение могло обновиться, пока ждали: другим процессом или предыдущим запросом
+        rates: Optional[Rates] = self._cache.get_fresh(max_age)
+        if rates is not None:
+            return rates
+        rates = self._fetch()
+        self._cache.set(rates)
+        return rates
+
+    def cached(self) -> Optional[Tuple[float, Rates]]:
+        """(время получения, курсы) последнего удачного запроса или None; провайдер не запрашивается."""
+        return self._cache.get()
+
+    def _fetch(self) -> Rates:
+        if not self.url:
+            raise ValueError("Не задан CURRENCY_API_URL")
+        headers = {"apikey": self.api_key} if self.api_key else {}
+        response = self._session.get(self.url, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        return _rub_rates(response.json())
+
+
+def normalize_tickers(tickers: Iterable[str]) -> List[str]:
+    """Тикеры в верхнем регистре без пробелов и повторов (порядок первого появления)."""
+    return list(dict.fromkeys(ticker.strip().upper() for ticker in tickers if ticker and ticker.strip()))
+
+
+class StockProvider(Protocol):
+    """Провайдер котировок: batch_size — бумаг за запрос, fetch — {тикер: цена} по списку тикеров."""
+
+    batch_size: int
+
+    def fetch(self, symbols: List[str]) -> Dict[str, float]:
+        ...
+
+
+class AlphaVantageProvider:
+    """Котировки Alpha Vantage (STOCK_API_URL).
+
+    Без пакетного режима — запрос GLOBAL_QUOTE на каждую бумагу, в пакетном —
+    REALTIME_BULK_QUOTES до 100 бумаг за запрос.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = STOCK_API_URL,
+        api_key: Optional[str] = STOCK_API_KEY,
+        bulk: bool = STOCK_API_BATCH,
+        session: Optional[requests.Session] = None,
+        timeout: float = MARKET_HTTP_TIMEOUT,
+    ) -> None:
+        self.url = url
+        self.api_key = api_key
+        self.batch_size = 100 if bulk else 1
+        self.timeout = timeout
+        self._session = session or make_session(STOCK_FETCH_WORKERS)
+
+    def _get(self, params: Dict[str, str]) -> Dict[str, Any]:
+        if not self.url:
+            raise ValueError("Не задан STOCK_API_URL")
+        response = self._session.get(self.url, params={**params, "apikey": self.api_key}, timeout=self.timeout)
+        response.raise_for_status()
+        data: Dict[str, Any] = response.json()
+        return data
+
+    def fetch(self, symbols: List[str]) -> Dict[str, float]:
+        """Цены закрытия/последней сделки: {тикер: цена}; бумаги без котировки пропускаются."""
+        if self.batch_size > 1:
+            data = self._get({"function": "REALTIME_BULK_QUOTES", "symbol": ",".join(symbols)})
+            return {item["symbol"].upper(): float(item["close"]) for item in data.get("data", [])}
+        quote = self._get({"function": "GLOBAL_QUOTE", "symbol": symbols[0]}).get("Global Quote")
+        return {symbols[0]: float(quote["05. price"])} if quote else {}
+
+
+class YahooFinanceProvider:
+    """Котировки Yahoo Finance через yfinance: все бумаги пакета одним запросом."""
+
+    batch_size = 200
+
+    def fetch(self, symbols: List[str]) -> Dict[str, float]:
+        # yfinance нужен только этому провайдеру
+        import yfinance as yf
+
+        data = yf.download(symbols, period="5d", interval="1d", progress=False, threads=False, auto_adjust=False)
+        close = data["Close"]
+        if isinstance(close, pd.Series):
+            close = close.to_frame(symbols[0])
+        last = close.ffill().iloc[-1]
+        return {symbol: round(float(last[symbol]), 2) for symbol in symbols if pd.notna(last.get(symbol))}
+
+
+def make_stock_provider(name: str = STOCK_PROVIDER) -> StockProvider:
+    if name == "yfinance":
+        return YahooFinanceProvider()
+    if name == "alphavantage":
+        return AlphaVantageProvider()
+    raise ValueError(f"Неизвестный провайдер котировок: {name}")
+
+
+class StockQuotesClient:
+    """Котировки акций с кешем по каждой бумаге.
+
+    Повторяющиеся тикеры запрашиваются один раз, в том числе у разных
+    пользователей и у одновременных вызовов: бумага, которую уже запрашивает
+    другой поток, не запрашивается повторно. Недостающие бумаги делятся на
+    пакеты размера provider.batch_size, пакеты запрашиваются параллельно в пуле
+    потоков. Котировки хранятся ttl секунд в памяти и на диске; если провайдер не
+    ответил, используется последняя известная цена.
+    """
+
+    def __init__(
+        self,
+        provider: Optional[StockProvider] = None,
+        ttl: float = STOCK_CACHE_TTL,
+        max_workers: int = STOCK_FETCH_WORKERS,
+        cache_path: Optional[str] = None,
+    ) -> None:
+        self.provider = provider or make_stock_provider()
+        self.ttl = ttl
+        self.cache_path = cache_path or os.path.join(MARKET_CACHE_DIR, "stock_quotes.json")
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="quotes")
+        self._lock = threading.Lock()
+        # Тикер -> (время получения, цена) и тикер -> Future запроса, который уже выполняется
+        self._quotes: Dict[str, Quote] = {}
+        self._pending: Dict[str, Future] = {}
+        self._mtime: Optional[int] = None
+        self._sync()
+
+    def _load(self) -> Dict[str, Quote]:
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                return {symbol: (float(at), float(price)) for symbol, (at, price) in json.load(f).items()}
+        except (OSError, ValueError, TypeError):
+            return {}
+
+    def _sync(self) -> None:
+        """Добавление котировок, сохраненных другими процессами (файл перечитывается, если изменился)."""
+        try:
+            mtime = os.stat(self.cache_path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        stored = self._load()
+        with self._lock:
+            self._mtime = mtime
+            for symbol, quote in stored.items():
+                current = self._quotes.get(symbol)
+                if current is None or quote[0] > current[0]:
+                    self._quotes[symbol] = quote
+
+    def _save(self) -> None:
+        with self._lock:
+            data = {symbol: list(quote) for symbol, quote in self._quotes.items()}
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            write_json_atomic(self.cache_path, data)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить кеш котировок {self.cache_path}: {e}")
+
+    def _fetch(self, symbols: List[str], futures: Dict[str, Future]) -> List[Exception]:
+        size = self.provider.batch_size
+        chunks = [symbols[i:i + size] for i in range(0, len(symbols), size)]
+        fetched: Dict[str, float] = {}
+        errors: List[Exception] = []
+        for chunk, future in zip(chunks, [self._pool.submit(self.provider.fetch, chunk) for chunk in chunks]):
+            try:
+                fetched.update(future.result())
+            except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Не удалось получить котировки {', '.join(chunk)}: {e}")
+                errors.append(e)
+
+        now = time.time()
+        with self._lock:
+            for symbol in symbols:
+                if symbol in fetched:
+                    self._quotes[symbol] = (now, fetched[symbol])
+            for symbol in symbols:
+                quote = self._quotes.get(symbol)
+                futures[symbol].set_result(quote[1] if quote else None)
+                del self._pending[symbol]
+        if fetched:
+            self._save()
+        return errors
+
+    def _collect(self, tickers: Iterable[str], max_age: float) -> Tuple[Dict[str, float], List[Exception]]:
+        """(цены, ошибки провайдера); котировки старше max_age секунд запрашиваются заново."""
+        symbols = normalize_tickers(tickers)
+        self._sync()
+        now = time.time()
+        prices: Dict[str, float] = {}
+        waiting: Dict[str, Future] = {}
+        own: Dict[str, Future] = {}
+        errors: List[Exception] = []
+        with self._lock:
+            for symbol in symbols:
+                quote = self._quotes.get(symbol)
+                if quote is not None and now - quote[0] < max_age:
+                    prices[symbol] = quote[1]
+                elif symbol in self._pending:
+                    waiting[symbol] = self._pending[symbol]
+                else:
+                    own[symbol] = self._pending[symbol] = Future()
+
+        if own:
+            try:
+                errors = self._fetch(list(own), own)
+            finally:
+                with self._lock:
+                    for symbol, future in own.items():
+                        if not future.done():
+                            future.set_result(None)
+                            self._pending.pop(symbol, None)
+
+        for symbol, future in {**waiting, **own}.items():
+            price = future.result()
+            if price is not None:
+                prices[symbol] = price
+        return {symbol: prices[symbol] for symbol in symbols if symbol in prices}, errors
+
+    def quotes(self, tickers: Iterable[str]) -> Dict[str, float]:
+        """Цены бумаг: {тикер: цена} для тех, по которым есть котировка."""
+        return self._collect(tickers, self.ttl)[0]
+
+    def update(self, tickers: Iterable[str], max_age: Optional[float] = None) -> Dict[str, float]:
+        """Как quotes, но котировки старше max_age секунд (по умолчанию ttl) запрашиваются
+        заново, а ошибка провайдера передается вызывающему."""
+        prices, errors = self._collect(tickers, self.ttl if max_age is None else max_age)
+        if errors:
+            raise errors[0]
+        return prices
+
+    def cached(self, tickers: Iterable[str]) -> Dict[str, Quote]:
+        """Последние полученные котировки {тикер: (время получения, цена)}; провайдер не запрашивается."""
+        self._sync()
+        with self._lock:
+            return {symbol: self._quotes[symbol] for symbol in normalize_tickers(tickers) if symbol in self._quotes}
+
+    def portfolio_quotes(self, portfolios: Dict[str, List[str]]) -> Dict[str, Dict[str, float]]:
+        """Котировки для нескольких портфелей {пользователь: [тикеры]}: общие бумаги запрашиваются один раз."""
+        prices = self.quotes(ticker for tickers in portfolios.values() for ticker in tickers)
+        return {
+            user: {symbol: prices[symbol] for symbol in normalize_tickers(tickers) if symbol in prices}
+            for user, tickers in portfolios.items()
+        }
+
+
+class CircuitBreaker:
+    """Размыкатель цепи для обращений к провайдеру.
+
+    После threshold ошибок подряд цепь размыкается, и обращения не выполняются
+    timeout секунд. Затем разрешается пробное обращение: если оно неудачно,
+    пауза удваивается (но не больше max_timeout), если удачно — цепь замыкается
+    и пауза сбрасывается.
+    """
+
+    def __init__(
+        self,
+        threshold: int = MARKET_BREAKER_THRESHOLD,
+        timeout: float = MARKET_BREAKER_TIMEOUT,
+        max_timeout: float = MARKET_BREAKER_MAX_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.threshold = threshold
+        self.timeout = timeout
+        self.max_timeout = max_timeout
+        self.clock = clock
+        self.failures = 0
+        self._delay = timeout
+        self._open_until: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        """closed — обращения разрешены, open — пауза, half-open — разрешено пробное обращение."""
+        if self._open_until is None:
+            return "closed"
+        return "open" if self.clock() < self._open_until else "half-open"
+
+    def allow(self) -> bool:
+        return self.state != "open"
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._delay = self.timeout
+        self._open_until = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._open_until is not None:
+            self._delay = min(self._delay * 2, self.max_timeout)
+            self._open_until = self.clock() + self._delay
+        elif self.failures >= self.threshold:
+            self._open_until = self.clock() + self._delay
+
+
+class MarketDataRefresher:
+    """Фоновое обновление курсов валют и котировок акций (stale-while-revalidate).
+
+    Поток раз в interval секунд обновляет курсы и котировки бумаг из настроек
+    пользователя, как только их возраст превышает refresh_ahead от ttl клиента,
+    то есть до истечения кеша. Страницы читают последнее удачно полученное
+    значение из кеша клиентов (см. get_market_data в src.utils) и провайдеров не
+    ждут. Для каждого провайдера свой размыкатель цепи: пока провайдер отвечает
+    ошибками, обращения к нему откладываются с растущей паузой.
+    """
+
+    refresh_ahead = 0.8
+
+    def __init__(
+        self,
+        interval: float = MARKET_REFRESH_INTERVAL,
+        stocks: Callable[[], List[str]] = user_stocks,
+        currency_client: Optional[CurrencyRatesClient] = None,
+        quotes_client: Optional[StockQuotesClient] = None,
+    ) -> None:
+        self.interval = interval
+        self.stocks = stocks
+        self._currency_client = currency_client
+        self._quotes_client = quotes_client
+        self.breakers = {"currency_rates": CircuitBreaker(), "stock_prices": CircuitBreaker()}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def currency_client(self) -> CurrencyRatesClient:
+        return self._currency_client or get_currency_client()
+
+    @property
+    def quotes_client(self) -> StockQuotesClient:
+        return self._quotes_client or get_quotes_client()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def refresh(self, stocks: Optional[List[str]] = None) -> None:
+        """Однократное обновление курсов и котировок stocks (по умолчанию — бумаг из настроек)."""
+        tickers = self.stocks() if stocks is None else stocks
+        currency_client, quotes_client = self.currency_client, self.quotes_client
+        self._update("currency_rates", lambda: currency_client.update(currency_client.ttl * self.refresh_ahead))
+        if tickers:
+            self._update("stock_prices", lambda: quotes_client.update(tickers, quotes_client.ttl * self.refresh_ahead))
+
+    def _update(self, name: str, func: Callable[[], Any]) -> None:
+        breaker = self.breakers[name]
+        if not breaker.allow():
+            return
+        try:
+            func()
+        except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+            breaker.record_failure()
+            logger.warning(f"Не удалось обновить {name} ({breaker.failures} ошибок подряд): {e}")
+        else:
+            breaker.record_success()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Ошибка фонового обновления рыночных данных")
+            if self._stop.wait(self.interval):
+                return
+
+    def start(self) -> "MarketDataRefresher":
+        if not self.running:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="market-refresher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Состояние размыкателей: {источник: {"state": ..., "failures": ...}}."""
+        return {
+            name: {"state": breaker.state, "failures": breaker.failures} for name, breaker in self.breakers.items()
+        }
+
+
+_currency_client: Optional[CurrencyRatesClient] = None
+_quotes_client: Optional[StockQuotesClient] = None
+_refresher: Optional[MarketDataRefresher] = None
+_client_lock = threading.Lock()
+
+
+def get_currency_client() -> CurrencyRatesClient:
+    """Клиент курсов валют процесса (создается при первом обращении)."""
+    global _currency_client
+    if _currency_client is None:
+        with _client_lock:
+            if _currency_client is None:
+                _currency_client = CurrencyRatesClient()
+    return _currency_client
+
+
+def get_quotes_client() -> StockQuotesClient:
+    """Клиент котировок акций процесса (создается при первом обращении)."""
+    global _quotes_client
+    if _quotes_client is None:
+        with _client_lock:
+            if _quotes_client is None:
+                _quotes_client = StockQuotesClient()
+    return _quotes_client
+
+
+def get_market_refresher() -> MarketDataRefresher:
+    """Фоновое обновление рыночных данных процесса (создается при первом обращении, запускается start)."""
+    global _refresher
+    if _refresher is None:
+        with _client_lock:
+            if _refresher is None:
+                _refresher = MarketDataRefresher()
+    return _refresher
@@ -0,0 +1,100 @@
+from typing import Any, Dict, List, Optional, TypedDict
+
+
+class DateRange(TypedDict):
+    start_date: str
+    end_date: str
+
+
+class Greeting(TypedDict):
+    greeting: str
+
+
+class CardSummary(TypedDict):
+    last_digits: str
+    total_spent: float
+    cashback: float
+
+
+class CardStats(CardSummary):
+    total_income: float
+    count: int
+
+
+class TopTransaction(TypedDict):
+    date: str
+    amount: float
+    category: str
+    description: str
+
+
+class CurrencyRate(TypedDict):
+    currency: str
+    rate: float
+
+
+class StockPrice(TypedDict):
+    stock: str
+    price: float
+
+
+class MarketDataAge(TypedDict):
+    # Секунды с получения данных у провайдера; None — данных нет
+    currency_rates: Optional[float]
+    stock_prices: Optional[float]
+
+
+class MarketData(TypedDict):
+    currency_rates: List[CurrencyRate]
+    stock_prices: List[StockPrice]
+    market_data_age: MarketDataAge
+
+
+class CategoryAmount(TypedDict):
+    category: str
+    amount: float
+
+
+class ExpensesSummary(TypedDict):
+    total_amount: float
+    main: List[CategoryAmount]
+    transfers_and_cash: List[CategoryAmount]
+
+
+class IncomeSummary(TypedDict):
+    total_amount: float
+    main: List[CategoryAmount]
+
+
+class HomePage(TypedDict):
+    greeting: str
+    date_range: DateRange
+    cards: List[CardSummary]
+    top_transactions: List[TopTransaction]
+    currency_rates: List[CurrencyRate]
+    stock_prices: List[StockPrice]
+    market_data_age: MarketDataAge
+
+
+class EventsPage(TypedDict):
+    expenses: ExpensesSummary
+    income: IncomeSummary
+    currency_rates: List[CurrencyRate]
+    stock_prices: List[StockPrice]
+    market_data_age: MarketDataAge
+
+
+class CacheStats(TypedDict):
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    maxsize: int
+
+
+# Транзакция в виде записи (ключи совпадают с колонками выгрузки)
+Transaction = Dict[str, Any]
+
+# Отчеты: {день недели: {"mean": ..., "count": ...}} и {тип дня: {"mean": ...}}
+WeekdayReport = Dict[str, Dict[str, float]]
+WorkdayReport = Dict[str, Dict[str, float]]
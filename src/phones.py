@@ -0,0 +1,135 @@
+import re
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from src.store import derived_for
+
+# Колонка с номером телефона из описания: полный номер в формате E.164 (+79211112233)
+# или неполный номер из выгрузки (см. SHORT_PHONE_PATTERN)
+PHONE_COLUMN = "Телефон"
+
+# Российские номера: +7 или 8, код из трех цифр (возможно, в скобках), затем
+# 3, 2 и 2 цифры через пробелы, дефисы или слитно. После 8 нужен хотя бы один
+# разделитель или скобка: 11 цифр подряд на 8 (номер договора, счета) — не телефон
+PHONE_PATTERN = re.compile(
+    r"(?<![\d+])(?:\+7|8(?!\d{10}))[\s\-]*\(?(\d{3})\)?[\s\-]*(\d{3})[\s\-]*(\d{2})[\s\-]*(\d{2})(?!\d)"
+)
+
+# Неполные номера из 9 цифр, которые встречаются в выгрузке банка ("Я МТС +7 921 11-22-33"):
+# только после +7 и с разделителями. Это не E.164, поэтому они хранятся в исходном
+# виде "+7 921 11-22-33" и не смешиваются с полными номерами при поиске по номеру и началу
+SHORT_PHONE_PATTERN = re.compile(
+    r"(?<![\d+])\+7[\s\-]*\(?(\d{3})\)?[\s\-]+(\d{2})[\s\-]+(\d{2})[\s\-]+(\d{2})(?!\d)"
+)
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+def _short_phone(code: str, *groups: str) -> str:
+    return f"+7 {code} " + "-".join(groups)
+
+
+def normalize_phone(text: str) -> Optional[str]:
+    """Первый номер телефона в тексте: E.164, неполный номер в виде "+7 921 11-22-33" или None."""
+    match = PHONE_PATTERN.search(text)
+    if match:
+        return "+7" + "".join(match.groups())
+    match = SHORT_PHONE_PATTERN.search(text)
+    return _short_phone(*match.groups()) if match else None
+
+
+def normalize_phone_prefix(prefix: str) -> str:
+    """Начало номера в формате E.164: "8 921" и "+7 (921" дают "+7921"."""
+    digits = re.sub(r"\D", "", prefix)
+    if digits.startswith("8") and not prefix.lstrip().startswith("+"):
+        digits = "7" + digits[1:]
+    return "+" + digits
+
+
+def extract_phones(descriptions: pd.Series) -> pd.Series:
+    """Номера телефонов из описаний операций (см. PHONE_COLUMN): категориальная колонка, без номера — NaN.
+
+    Регулярное выражение применяется один раз к каждому уникальному описанию
+    (векторно, через str.extract), результат раскладывается по строкам по кодам.
+    """
+    descriptions = pd.Series(descriptions)
+    if isinstance(descriptions.dtype, pd.CategoricalDtype):
+        codes, uniques = descriptions.cat.codes.to_numpy(), pd.Series(descriptions.cat.categories, dtype=object)
+    else:
+        codes, uniques = pd.factorize(descriptions)
+        uniques = pd.Series(uniques, dtype=object)
+    texts = uniques.astype(str)
+    parts = texts.str.extract(PHONE_PATTERN)
+    short = texts.str.extract(SHORT_PHONE_PATTERN)
+    full = "+7" + parts[0] + parts[1] + parts[2] + parts[3]
+    phones = full.where(full.notna(), "+7 " + short[0] + " " + short[1] + "-" + short[2] + "-" + short[3])
+    phones = phones.to_numpy(dtype=object)
+    values = np.append(phones, np.nan)[codes]
+    return pd.Series(pd.Categorical(values), index=descriptions.index, name=PHONE_COLUMN)
+
+
+def with_phones(df: pd.DataFrame) -> pd.DataFrame:
+    """DataFrame с колонкой PHONE_COLUMN (если ее еще нет и есть описания)."""
+    if PHONE_COLUMN in df.columns or "Описание" not in df.columns:
+        return df
+    return df.assign(**{PHONE_COLUMN: extract_phones(df["Описание"])})
+
+
+class PhoneIndex:
+    """Индекс номеров телефонов: отсортированные номера и строки с каждым номером.
+
+    Номера — категории колонки PHONE_COLUMN (отсортированы), строки каждого
+    номера хранятся подряд (CSR), поэтому поиск по точному номеру и по началу
+    номера — бинарный поиск и срез, а строки с любым номером — готовый массив.
+    """
+
+    def __init__(self, phones: pd.Series) -> None:
+        phones = pd.Series(phones)
+        if not isinstance(phones.dtype, pd.CategoricalDtype):
+            phones = phones.astype("category")
+        phones = phones.cat.reorder_categories(sorted(phones.cat.categories))
+        self.numbers = phones.cat.categories.to_numpy(dtype=object).astype(str)
+        codes = phones.cat.codes.to_numpy()
+        self.rows = np.flatnonzero(codes >= 0)
+        by_number = np.argsort(codes[self.rows], kind="stable")
+        self._rows = self.rows[by_number]
+        self._offsets = np.searchsorted(codes[self.rows][by_number], np.arange(len(self.numbers) + 1))
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "PhoneIndex":
+        phones = df[PHONE_COLUMN] if PHONE_COLUMN in df.columns else extract_phones(df["Описание"])
+        return cls(phones)
+
+    def _range(self, first: int, last: int) -> np.ndarray:
+        rows = self._rows[self._offsets[first]:self._offsets[last]]
+        return np.sort(rows) if last - first > 1 else rows
+
+    def with_number(self, number: str) -> np.ndarray:
+        """Строки с номером number (в любом формате)."""
+        number = normalize_phone(number) or normalize_phone_prefix(number)
+        position = int(np.searchsorted(self.numbers, number))
+        if position == len(self.numbers) or self.numbers[position] != number:
+            return _EMPTY
+        return self._range(position, position + 1)
+
+    def with_prefix(self, prefix: str) -> np.ndarray:
+        """Строки с номером, начинающимся с prefix ("+7921", "8 921")."""
+        prefix = normalize_phone_prefix(prefix)
+        first = int(np.searchsorted(self.numbers, prefix, side="left"))
+        last = int(np.searchsorted(self.numbers, prefix + "￿", side="left"))
+        return self._range(first, last) if last > first else _EMPTY
+
+    def search(self, number: Optional[str] = None, prefix: Optional[str] = None) -> np.ndarray:
+        """Строки с номером number, с номером на prefix или (без аргументов) с любым номером, по порядку."""
+        if number is not None:
+            return self.with_number(number)
+        if prefix is not None:
+            return self.with_prefix(prefix)
+        return self.rows
+
+
+def phone_index(df: pd.DataFrame) -> PhoneIndex:
+    """Индекс номеров телефонов (для снимка хранилища — один раз на версию данных)."""
+    return derived_for(df, "phone_index", PhoneIndex.from_frame)
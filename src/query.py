@@ -0,0 +1,550 @@
+import base64
+import binascii
+import re
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Protocol, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.dates import is_sorted_by_date, parse_dates
+from src.phones import PhoneIndex, extract_phones, phone_index
+from src.schema import AMOUNT_UNIT_ATTR, with_rubles
+from src.search import SEARCH_FIELDS, SEARCH_MODES, SearchIndex, match_text, normalize, search_index
+from src.store import DATA_ID_ATTR, derived_for, is_snapshot
+from src.transfers import physical_transfer_mask, transfer_flags
+
+# Записи результата отдаются пачками: with_rubles и to_dict — на пачку, а не на строку
+RESULT_BATCH_SIZE = 1000
+
+# Порядок выполнения условий: срез по дате, коды категориальных колонок,
+# числовые сравнения, затем дорогие текстовые условия (индексы, регулярные выражения)
+_SLICE, _CODES, _NUMERIC, _TEXT = range(4)
+
+
+def _last_digits(value: Any) -> str:
+    return re.sub(r"\D", "", str(value))[-4:]
+
+
+class _FrameSource:
+    """Транзакции в DataFrame (в т.ч. снимок хранилища с кешированными индексами)."""
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        self.frame = df
+        self.size = len(df)
+        # Проверяются сами даты (для снимка — один раз на версию данных)
+        self.sorted_by_date = derived_for(df, "sorted_by_date:Дата операции", is_sorted_by_date)
+        # Для снимка хранилища индексы строятся по всем строкам один раз на версию данных
+        self.cached = is_snapshot(df)
+
+    def column(self, name: str) -> Optional[pd.Series]:
+        return self.frame[name] if name in self.frame.columns else None
+
+    def amounts(self, rows: Optional[np.ndarray]) -> np.ndarray:
+        """Суммы операций в рублях для строк rows (None — все строки)."""
+        values = self.frame["Сумма операции"] if rows is None else self.frame["Сумма операции"].iloc[rows]
+        if self.frame.attrs.get(AMOUNT_UNIT_ATTR) == "kopecks":
+            return np.asarray(values.to_numpy(dtype=np.float64, na_value=np.nan)) / 100
+        return np.asarray(pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan))
+
+    def subset(self, rows: np.ndarray) -> pd.DataFrame:
+        return self.frame.iloc[rows]
+
+    def take(self, rows: np.ndarray) -> pd.DataFrame:
+        return with_rubles(self.frame.iloc[rows])
+
+    def records(self, rows: np.ndarray) -> Iterator[Dict[str, Any]]:
+        for start in range(0, len(rows), RESULT_BATCH_SIZE):
+            yield from with_rubles(self.frame.iloc[rows[start:start + RESULT_BATCH_SIZE]]).to_dict("records")
+
+
+class _RecordsSource:
+    """Транзакции списком записей: колонки собираются по мере надобности, результат — сами записи."""
+
+    sorted_by_date = False
+    cached = False
+
+    def __init__(self, transactions: List[Dict[str, Any]]) -> None:
+        self.transactions = transactions
+        self.size = len(transactions)
+        self._columns: Dict[str, pd.Series] = {}
+
+    def column(self, name: str) -> pd.Series:
+        if name not in self._columns:
+            self._columns[name] = pd.Series([t.get(name) for t in self.transactions], dtype=object)
+        return self._columns[name]
+
+    def amounts(self, rows: Optional[np.ndarray]) -> np.ndarray:
+        values = self.column("Сумма операции")
+        values = values if rows is None else values.iloc[rows]
+        return np.asarray(pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan))
+
+    def subset(self, rows: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame({name: self.column(name).iloc[rows].to_numpy() for name in SEARCH_FIELDS})
+
+    def take(self, rows: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame([self.transactions[i] for i in rows])
+
+    def records(self, rows: np.ndarray) -> Iterator[Dict[str, Any]]:
+        return (self.transactions[i] for i in rows)
+
+
+Source = Union[_FrameSource, _RecordsSource]
+
+
+def _values(source: Source, name: str, rows: Optional[np.ndarray]) -> Optional[pd.Series]:
+    column = source.column(name)
+    if column is None:
+        return None
+    return column if rows is None else column.iloc[rows]
+
+
+def _rows(rows: Optional[np.ndarray], mask: np.ndarray) -> np.ndarray:
+    """Строки-кандидаты, для которых mask истинна (rows=None — все строки)."""
+    return np.flatnonzero(mask) if rows is None else rows[mask]
+
+
+def _keep(rows: Optional[np.ndarray], found: np.ndarray) -> np.ndarray:
+    """Кандидаты, вошедшие в найденные строки found, в порядке кандидатов."""
+    return found if rows is None else rows[np.isin(rows, found)]
+
+
+class Predicate(Protocol):
+    """Условие запроса: rank — стоимость, estimate — оценка доли подходящих строк,
+    apply — номера подходящих строк из кандидатов rows (None — все строки)."""
+
+    rank: int
+
+    def estimate(self, source: Source) -> float:
+        ...
+
+    def apply(self, source: Source, rows: Optional[np.ndarray], limit: Optional[int] = None) -> np.ndarray:
+        ...
+
+
+class DateRange:
+    """Дата операции в интервале [start, end] (границы включительно, None — без границы)."""
+
+    rank = _SLICE
+
+    def __init__(self, start: Any = None, end: Any = None) -> None:
+        self.start = pd.Timestamp(start) if start is not None else None
+        self.end = pd.Timestamp(end) if end is not None else None
+
+    def _bounds(self, dates: pd.Series) -> Tuple[int, int]:
+        lo = dates.searchsorted(self.start, side="left") if self.start is not None else 0
+        hi = dates.searchsorted(self.end, side="right") if self.end is not None else len(dates)
+        return lo, hi
+
+    def estimate(self, source: Source) -> float:
+        if source.sorted_by_date:
+            lo, hi = self._bounds(source.column("Дата операции"))
+            return float((hi - lo) / max(source.size, 1))
+        return 1.0
+
+    def apply(self, source: Source, rows: Optional[np.ndarray], limit: Optional[int] = None) -> np.ndarray:
+        if rows is None and source.sorted_by_date:
+            lo, hi = self._bounds(source.column("Дата операции"))
+            return np.arange(lo, hi)
+        dates = _values(source, "Дата операции", rows)
+        if dates is None:
+            return np.empty(0, dtype=np.int64)
+        if not pd.api.types.is_datetime64_any_dtype(dates.dtype):
+            dates = parse_dates(dates).values
+        mask = dates.notna()
+        if self.start is not None:
+            mask &= dates >= self.start
+        if self.end is not None:
+            mask &= dates <= self.end
+        return _rows(rows, mask.to_numpy(dtype=bool))
+
+    def __repr__(self) -> str:
+        return f"DateRange({self.start}, {self.end})"
+
+
+class ValueIn:
+    """Значение колонки — одно из values (для категориальных колонок сравниваются коды)."""
+
+    rank = _CODES
+
+    def __init__(self, column: str, values: Iterable[Any], key: Optional[Callable[[Any], Any]] = None) -> None:
+        self.column = column
+        # key — приведение значений перед сравнением (например, к последним цифрам номера карты)
+        self.key = key
+        # Пропуски не равны ничему, в т.ч. другим пропускам
+        self.values = {key(v) if key else v for v in values if not pd.isna(v)}
+
+    def _lookup(self, categories: pd.Index) -> np.ndarray:
+        matched = [(self.key(c) if self.key else c) in self.values for c in categories]
+        return np.array(matched + [False], dtype=bool)
+
+    def estimate(self, source: Source) -> float:
+        column = source.column(self.column)
+        if not isinstance(source, _FrameSource) or column is None or not isinstance(column.dtype, pd.CategoricalDtype):
+            return 1.0
+        counts = derived_for(
+            source.frame, f"code_counts:{self.column}",
+            lambda df: np.bincount(df[self.column].cat.codes.to_numpy() + 1, minlength=len(column.cat.categories) + 1),
+        )
+        return float(counts[1:][self._lookup(column.cat.categories)[:-1]].sum() / max(source.size, 1))
+
+    def apply(self, source: Source, rows: Optional[np.ndarray], limit: Optional[int] = None) -> np.ndarray:
+        values = _values(source, self.column, rows)
+        if values is None:
+            return np.empty(0, dtype=np.int64)
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            mask = self._lookup(values.cat.categories)[values.cat.codes.to_numpy()]
+        elif self.key:
+            mask = values.map(lambda v: pd.notna(v) and self.key(v) in self.values).to_numpy(dtype=bool)
+        else:
+            mask = values.isin(self.values).to_numpy(dtype=bool)
+        return _rows(rows, mask)
+
+    def __repr__(self) -> str:
+        return f"ValueIn({self.column!r}, {sorted(map(str, self.values))})"
+
+
+class AmountRange:
+    """Сумма операции в рублях между minimum и maximum (None — без границы).
+
+    inclusive — включение границ, как в pandas.Series.between: "both", "left", "right", "neither".
+    """
+
+    rank = _NUMERIC
+
+    def __init__(
+        self, minimum: Optional[float] = None, maximum: Optional[float] = None, inclusive: str = "both"
+    ) -> None:
+        self.minimum = minimum
+        self.maximum = maximum
+        self.inclusive = inclusive
+
+    def estimate(self, source: Source) -> float:
+        return 0.5
+
+    def apply(self, source: Source, rows: Optional[np.ndarray], limit: Optional[int] = None) -> np.ndarray:
+        amounts = source.amounts(rows)
+        mask = ~np.isnan(amounts)
+        if self.minimum is not None:
+            mask &= amounts >= self.minimum if self.inclusive in ("both", "left") else amounts > self.minimum
+        if self.maximum is not None:
+            mask &= amounts <= self.maximum if self.inclusive in ("both", "right") else amounts < self.maximum
+        return _rows(rows, mask)
+
+    def __repr__(self) -> str:
+        return f"AmountRange({self.minimum}, {self.maximum}, {self.inclusive})"
+
+
+class _IndexedPredicate:
+    """Условие по индексу или отметкам строк.
+
+    Для снимка используется структура по всем строкам (кешируется на версию
+    данных), иначе она строится только по строкам-кандидатам.
+    """
+
+    rank = _TEXT
+
+    def estimate(self, source: Source) -> float:
+        return 1.0
+
+    def apply(self, source: Source, rows: Optional[np.ndarray], limit: Optional[int] = None) -> np.ndarray:
+        if source.cached or rows is None:
+            return self.full(source, rows, limit)
+        return rows.take(self.subset(source, rows, limit))
+
+    def full(self, source: Source, rows: Optional[np.ndarray], limit: Optional[int]) -> np.ndarray:
+        """Подходящие строки из rows по структуре всех строк источника."""
+        raise NotImplementedError
+
+    def subset(self, source: Source, rows: np.ndarray, limit: Optional[int]) -> np.ndarray:
+        """Позиции подходящих строк в rows по структуре, построенной только по ним."""
+        raise NotImplementedError
+
+
+class TextMatch:
+    """Категория или описание соответствуют запросу (режимы SearchIndex.search).
+
+    Строки упорядочиваются так же, как в SearchIndex: по дате (для списка
+    записей — в порядке списка) или по сходству для fuzzy. Для снимка
+    используется его индекс; в остальных случаях тексты оставшихся строк
+    проверяются напрямую, по одному разу на уникальный текст.
+    """
+
+    rank = _TEXT
+
+    def __init__(self, query: str, mode: str = "substring") -> None:
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Неизвестный режим поиска: {mode!r}, ожидается один из {SEARCH_MODES}")
+        self.query = query
+        self.mode = mode
+
+    def estimate(self, source: Source) -> float:
+        return 1.0
+
+    def _index(self, source: Source, rows: Optional[np.ndarray]) -> SearchIndex:
+        if isinstance(source, _RecordsSource):
+            return SearchIndex([_values(source, field, rows) for field in SEARCH_FIELDS])
+        return SearchIndex.from_frame(source.frame if rows is None else source.subset(rows))
+
+    def _scan(self, source: Source, rows: Optional[np.ndarray]) -> np.ndarray:
+        query = normalize(self.query)
+        mask = np.zeros(source.size if rows is None else len(rows), dtype=bool)
+        for field in SEARCH_FIELDS:
+            values = _values(source, field, rows)
+            if values is None:
+                continue
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+            else:
+                codes, uniques = pd.factorize(values)
+            # Проверяются только тексты, которые встречаются в строках
+            used = np.zeros(len(uniques) + 1, dtype=bool)
+            used[codes] = True
+            matched = np.zeros(len(uniques) + 1, dtype=bool)
+            for position in np.flatnonzero(used[:-1]):
+                matched[position] = match_text(normalize(str(uniques[position])), query, self.mode)
+            mask |= matched[codes]
+        found = _rows(rows, mask)
+        dates = source.column("Дата операции") if isinstance(source, _FrameSource) else None
+        if dates is not None and not source.sorted_by_date:
+            dates = pd.to_datetime(dates.iloc[found]).to_numpy()
+            found = found[np.argsort(dates, kind="stable")]
+        return found
+
+    def apply(self, source: Source, rows: Optional[np.ndarray], limit: Optional[int] = None) -> np.ndarray:
+        if isinstance(source, _FrameSource) and source.cached:
+            # Порядок задает поиск: кандидаты, найденные поиском, в порядке найденного
+            found = search_index(source.frame).search(self.query, self.mode, limit if rows is None else None)
+            return found if rows is None else found[np.isin(found, rows)]
+        if self.mode == "fuzzy":
+            found = self._index(source, rows).search(self.query, self.mode, limit)
+            return found if rows is None else rows[found]
+        return self._scan(source, rows)
+
+    def __repr__(self) -> str:
+        return f"TextMatch({self.query!r}, {self.mode})"
+
+
+class PhoneMatch(_IndexedPredicate):
+    """В описании есть номер телефона (number — этот номер, prefix — номер на prefix)."""
+
+    def __init__(self, number: Optional[str] = None, prefix: Optional[str] = None) -> None:
+        self.number = number
+        self.prefix = prefix
+
+    def full(self, source: Source, rows: Optional[np.ndarray], limit: Optional[int]) -> np.ndarray:
+        if isinstance(source, _RecordsSource):
+            index = PhoneIndex(extract_phones(source.column("Описание")))
+        else:
+            index = phone_index(source.frame)
+        return _keep(rows, index.search(self.number, self.prefix))
+
+    def subset(self, source: Source, rows: np.ndarray, limit: Optional[int]) -> np.ndarray:
+        return PhoneIndex.from_frame(source.subset(rows)).search(self.number, self.prefix)
+
+    def __repr__(self) -> str:
+        return f"PhoneMatch({self.number!r}, {self.prefix!r})"
+
+
+class PhysicalTransfer(_IndexedPredicate):
+    """Перевод физическому лицу (см. src.transfers)."""
+
+    def __init__(self, workers: Optional[int] = None) -> None:
+        self.workers = workers
+
+    def full(self, source: Source, rows: Optional[np.ndarray], limit: Optional[int]) -> np.ndarray:
+        if isinstance(source, _RecordsSource):
+            flags = physical_transfer_mask(source.column("Категория"), source.column("Описание"), self.workers)
+        else:
+            flags = transfer_flags(source.frame, self.workers)
+        return _rows(rows, flags if rows is None else flags[rows])
+
+    def subset(self, source: Source, rows: np.ndarray, limit: Optional[int]) -> np.ndarray:
+        df = source.subset(rows)
+        return np.flatnonzero(physical_transfer_mask(df["Категория"], df["Описание"], self.workers))
+
+    def __repr__(self) -> str:
+        return "PhysicalTransfer()"
+
+
+def encode_cursor(data_id: Optional[str], offset: int) -> str:
+    """Непрозрачный курсор страницы: идентификатор данных и позиция в результате."""
+    return base64.urlsafe_b64encode(f"{data_id}:{offset}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, data_id: Optional[str]) -> int:
+    """Позиция в результате по курсору; ValueError, если курсор поврежден или данные обновились."""
+    try:
+        cursor_id, position = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().split(":")
+        offset = int(position)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(f"Некорректный курсор: {cursor!r}")
+    if cursor_id != str(data_id):
+        raise ValueError("Курсор устарел: данные обновились, повторите запрос без cursor")
+    return offset
+
+
+class Page(NamedTuple):
+    items: List[Dict[str, Any]]
+    # Курсор следующей страницы (None — страница последняя)
+    next_cursor: Optional[str]
+    # Число найденных строк
+    total: int
+
+
+class ResultSet:
+    """Ленивый результат запроса: условия выполняются при первом обращении к строкам.
+
+    Хранятся только номера найденных строк; записи создаются по мере
+    итерации (для DataFrame — пачками с суммами в рублях, для списка — исходные
+    записи), поэтому память на записи ограничена пачкой или страницей (page).
+    frame() — DataFrame найденного.
+    """
+
+    def __init__(self, query: "Query") -> None:
+        self.query = query
+        self._rows: Optional[np.ndarray] = None
+
+    @property
+    def rows(self) -> np.ndarray:
+        """Номера найденных строк источника в порядке результата."""
+        if self._rows is None:
+            self._rows = self.query.evaluate()
+        return self._rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return self.stream()
+
+    def stream(self, offset: int = 0, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Генератор записей, начиная с позиции offset (не больше limit)."""
+        rows = self.rows[offset:] if limit is None else self.rows[offset:offset + limit]
+        return self.query.source.records(rows)
+
+    def start(self, cursor: Optional[str] = None, offset: int = 0) -> int:
+        """Позиция в результате по курсору (или offset).
+
+        Курсор привязан к содержимому данных (DATA_ID_ATTR снимка), а не к
+        процессу: его принимает любой процесс с теми же данными, а после
+        изменения файла он становится недействительным, а не сдвигает страницы.
+        """
+        start = decode_cursor(cursor, self.query.data_id) if cursor else int(offset)
+        if start < 0:
+            raise ValueError("offset не может быть отрицательным")
+        return start
+
+    def page(self, limit: int, cursor: Optional[str] = None, offset: int = 0) -> Page:
+        """Страница из limit записей с позиции курсора (или offset) и курсор следующей."""
+        start = self.start(cursor, offset)
+        if limit <= 0:
+            raise ValueError("limit должен быть положительным")
+        end = min(start + limit, len(self.rows))
+        next_cursor = encode_cursor(self.query.data_id, end) if end < len(self.rows) else None
+        return Page(list(self.stream(start, limit)), next_cursor, len(self.rows))
+
+    def records(self) -> List[Dict[str, Any]]:
+        return list(self)
+
+    def records_at(self, rows: Iterable[int]) -> Iterator[Dict[str, Any]]:
+        """Записи строк rows источника (номера из rows другого результата над теми же данными)."""
+        return self.query.source.records(np.asarray(rows, dtype=np.int64))
+
+    def frame(self) -> pd.DataFrame:
+        """Найденные строки DataFrame с суммами в рублях."""
+        return self.query.source.take(self.rows)
+
+
+class Query:
+    """Запрос к транзакциям из сочетания условий.
+
+    Условия добавляются цепочкой (каждый вызов возвращает новый запрос):
+
+        Query(df).between("2021-01-01", "2021-12-31").category("Супермаркеты").text("лента").run()
+
+    Условия объединяются через "и". Планировщик (plan) выполняет их от дешевых
+    и селективных к дорогим: срез по дате (бинарный поиск в отсортированных
+    данных), коды категорий, карт и статусов (самые редкие значения первыми),
+    числовые сравнения и только затем текстовые условия, которые проверяют
+    лишь оставшиеся строки или обращаются к индексам снимка. Результат —
+    ленивый ResultSet.
+    """
+
+    def __init__(
+        self, transactions: Union[pd.DataFrame, List[Dict[str, Any]]], predicates: Iterable[Predicate] = (),
+        limit: Optional[int] = None,
+    ) -> None:
+        self.transactions = transactions
+        self.source = (
+            _FrameSource(transactions) if isinstance(transactions, pd.DataFrame) else _RecordsSource(transactions)
+        )
+        self.predicates = tuple(predicates)
+        self._limit = limit
+
+    def where(self, predicate: Predicate) -> "Query":
+        """Запрос с дополнительным условием (DateRange, ValueIn, AmountRange, TextMatch и т.д.)."""
+        return Query(self.transactions, self.predicates + (predicate,), self._limit)
+
+    def between(self, start: Any = None, end: Any = None) -> "Query":
+        return self.where(DateRange(start, end))
+
+    def card(self, *cards: str) -> "Query":
+        """Операции по картам cards (полный номер или последние цифры)."""
+        return self.where(ValueIn("Номер карты", cards, key=_last_digits))
+
+    def category(self, *categories: str) -> "Query":
+        return self.where(ValueIn("Категория", categories))
+
+    def mcc(self, *codes: Union[int, str]) -> "Query":
+        return self.where(ValueIn("MCC", [int(code) for code in codes]))
+
+    def status(self, *statuses: str) -> "Query":
+        return self.where(ValueIn("Статус", statuses))
+
+    def amount(
+        self, minimum: Optional[float] = None, maximum: Optional[float] = None, inclusive: str = "both"
+    ) -> "Query":
+        """Сумма операции в рублях между minimum и maximum."""
+        return self.where(AmountRange(minimum, maximum, inclusive))
+
+    def expenses(self) -> "Query":
+        """Только расходы (отрицательная сумма операции)."""
+        return self.where(AmountRange(maximum=0, inclusive="neither"))
+
+    def text(self, query: str, mode: str = "substring") -> "Query":
+        return self.where(TextMatch(query, mode))
+
+    def phone(self, number: Optional[str] = None, prefix: Optional[str] = None) -> "Query":
+        return self.where(PhoneMatch(number, prefix))
+
+    def physical_transfers(self, workers: Optional[int] = None) -> "Query":
+        return self.where(PhysicalTransfer(workers))
+
+    @property
+    def data_id(self) -> Optional[str]:
+        """Идентификатор содержимого данных источника (для снимка хранилища), иначе None."""
+        return self.transactions.attrs.get(DATA_ID_ATTR) if isinstance(self.transactions, pd.DataFrame) else None
+
+    def limit(self, count: Optional[int]) -> "Query":
+        """Не больше count строк (для нечеткого поиска — самые похожие)."""
+        return Query(self.transactions, self.predicates, count)
+
+    def plan(self) -> List[Predicate]:
+        """Условия в порядке выполнения: по стоимости, при равной — по оценке доли строк."""
+        return sorted(self.predicates, key=lambda p: (p.rank, p.estimate(self.source)))
+
+    def evaluate(self) -> np.ndarray:
+        """Номера строк, удовлетворяющих всем условиям."""
+        rows = None
+        plan = self.plan()
+        for position, predicate in enumerate(plan):
+            if rows is not None and not len(rows):
+                break
+            # limit передается последнему условию, чтобы поиск по сходству отобрал лучшие строки
+            rows = predicate.apply(self.source, rows, self._limit if position == len(plan) - 1 else None)
+        if rows is None:
+            rows = np.arange(self.source.size)
+        return rows[:self._limit]
+
+    def run(self) -> ResultSet:
+        return ResultSet(self)
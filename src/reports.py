@@ -1,11 +1,16 @@
-import json
 import logging
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, Optional
 
 import pandas as pd
 import pytest
 
+from src.dates import slice_by_period
+from src.models import WeekdayReport, WorkdayReport
+from src.query import Query
+from src.rollups import is_indexable, totals_index
+from src.schema import with_rubles
+
 # Настройка логирования
 logging.basicConfig(
     level=logging.INFO,
@@ -13,17 +18,27 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def spending_by_category(df, category, date=None):
+def _to_report(result: pd.DataFrame) -> Dict[str, Dict[str, float]]:
+    """Таблица отчета в виде {строка: {колонка: значение}}."""
+    report: Dict[str, Dict[str, float]] = result.to_dict(orient='index')
+    return report
+
+
+def spending_by_category(df: pd.DataFrame, category: str, date: Optional[str] = None) -> Dict[str, Any]:
     """Расчет расходов по категории."""
-    if date:
-        df = df[df['Дата операции'].dt.strftime('%Y-%m-%d') <= date].copy()
-    df_filtered = df[df['Категория'] == category]
-    df_filtered = df_filtered[df_filtered['Сумма операции'] < 0]  # Только расходы
-    category_spending = abs(df_filtered['Сумма операции'].sum())
+    # Расходы по дату включительно
+    end = pd.Timestamp(date).tz_localize(None).normalize() + pd.Timedelta(days=1) - pd.Timedelta(1) if date else None
+    if is_indexable(df):
+        expenses, _ = totals_index(df).query(pd.Timestamp.min, end or pd.Timestamp.max)
+        return {"category": category, "total": float(expenses.by_key.get(category, 0.0))}
+    query = Query(df).category(category).expenses()
+    if end is not None:
+        query = query.between(end=end)
+    category_spending = abs(query.run().frame()['Сумма операции'].sum())
     return {"category": category, "total": float(category_spending)}
 
 
-def spending_by_weekday(transactions: pd.DataFrame, date: Optional[str] = None) -> str:
+def spending_by_weekday(transactions: pd.DataFrame, date: Optional[str] = None) -> WeekdayReport:
     """Расчет средних трат по дням недели за последние 3 месяца.
     
     Args:
@@ -31,7 +46,7 @@ def spending_by_weekday(transactions: pd.DataFrame, date: Optional[str] = None)
         date: Опциональная дата, если не указана, берется текущая дата
         
     Returns:
-        JSON строка со средними тратами по дням недели
+        Словарь со средними тратами по дням недели
     """
     logger.info("Начало расчета трат по дням недели")
     
@@ -53,18 +68,16 @@ def spending_by_weekday(transactions: pd.DataFrame, date: Optional[str] = None)
     
     if transactions.empty:
         logger.warning("Получен пустой DataFrame с транзакциями")
-        return json.dumps(result.to_dict(orient='index'), ensure_ascii=False)
+        return _to_report(result)
     
     # Преобразуем даты в datetime если они еще не в этом формате
-    transactions = transactions.copy()
-    transactions['Дата операции'] = pd.to_datetime(transactions['Дата операции'])
+    if not pd.api.types.is_datetime64_any_dtype(transactions['Дата операции']):
+        transactions = transactions.copy()
+        transactions['Дата операции'] = pd.to_datetime(transactions['Дата операции'])
     logger.info(f"Всего транзакций в исходном DataFrame: {len(transactions)}")
     
     # Фильтруем транзакции за последние 3 месяца
-    df = transactions[
-        (transactions['Дата операции'] >= start_date) & 
-        (transactions['Дата операции'] <= end_date)
-    ].copy()
+    df = with_rubles(slice_by_period(transactions, start_date, end_date)).copy()
     logger.info(f"Отфильтровано транзакций за указанный период: {len(df)}")
     
     # Фильтруем только расходы
@@ -91,11 +104,10 @@ def spending_by_weekday(transactions: pd.DataFrame, date: Optional[str] = None)
     result['count'] = result['count'].astype(int)
     
     logger.info("Расчет трат по дням недели завершен успешно")
-    # Преобразуем DataFrame в словарь и затем в JSON
-    return json.dumps(result.to_dict(orient='index'), ensure_ascii=False)
+    return _to_report(result)
 
 
-def spending_by_workday(transactions: pd.DataFrame, date: Optional[str] = None) -> str:
+def spending_by_workday(transactions: pd.DataFrame, date: Optional[str] = None) -> WorkdayReport:
     """Расчет средних трат в рабочий и выходной день за последние 3 месяца.
     
     Args:
@@ -103,7 +115,7 @@ def spending_by_workday(transactions: pd.DataFrame, date: Optional[str] = None)
         date: Опциональная дата, если не указана, берется текущая дата
         
     Returns:
-        JSON строка со средними тратами в рабочий и выходной день
+        Словарь со средними тратами в рабочий и выходной день
     """
     logger.info("Начало расчета трат по рабочим/выходным дням")
     
@@ -126,18 +138,16 @@ def spending_by_workday(transactions: pd.DataFrame, date: Optional[str] = None)
     
     if transactions.empty:
         logger.warning("Получен пустой DataFrame с транзакциями")
-        return json.dumps(result.to_dict(orient='index'), ensure_ascii=False)
+        return _to_report(result)
     
     # Преобразуем даты в datetime если они еще не в этом формате
-    transactions = transactions.copy()
-    transactions['Дата операции'] = pd.to_datetime(transactions['Дата операции'])
+    if not pd.api.types.is_datetime64_any_dtype(transactions['Дата операции']):
+        transactions = transactions.copy()
+        transactions['Дата операции'] = pd.to_datetime(transactions['Дата операции'])
     logger.info(f"Всего транзакций в исходном DataFrame: {len(transactions)}")
     
     # Фильтруем транзакции за последние 3 месяца
-    df = transactions[
-        (transactions['Дата операции'] >= start_date) & 
-        (transactions['Дата операции'] <= end_date)
-    ].copy()
+    df = with_rubles(slice_by_period(transactions, start_date, end_date)).copy()
     logger.info(f"Отфильтровано транзакций за указанный период: {len(df)}")
     
     # Фильтруем только расходы
@@ -165,4 +175,4 @@ def spending_by_workday(transactions: pd.DataFrame, date: Optional[str] = None)
     result['mean'] = result['mean'].round(2)
     
     logger.info("Расчет трат по рабочим/выходным дням завершен успешно")
-    return json.dumps(result.to_dict(orient='index'), ensure_ascii=False)
+    return _to_report(result)
@@ -0,0 +1,130 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from src.dates import DateLike
+from src.models import CacheStats, EventsPage, HomePage
+from src.store import DATA_VERSION_ATTR, TransactionStore, get_store
+from src.utils import get_market_data
+from src.views import events_view, home_view
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+# Шаг округления момента запроса вниз; пусто — точное совпадение. Запросы без даты
+# приходят с текущим временем до секунды, без округления повторные почти не совпадают
+RESPONSE_CACHE_GRANULARITY = os.getenv("RESPONSE_CACHE_GRANULARITY", "1min") or None
+
+
+class ResponseCache:
+    """Кеш ответов home_view и events_view для данных из хранилища.
+
+    При неизменной версии данных ответ зависит только от момента запроса
+    и периода, поэтому ключ — (представление, версия данных, момент, аргументы).
+    Момент округляется вниз до granularity, и ответ считается для округленного
+    момента: все запросы внутри шага получают одинаковый результат.
+    Записей не больше maxsize, при переполнении вытесняется давно не
+    использованная. Рыночные данные (курсы, цены акций и их возраст) не
+    зависят от транзакций и в сохраненном ответе заменяются текущими из
+    get_market_data. Когда хранилище перечитывает файл,
+    кеш ответов очищается при первом же обращении.
+
+    Ответы общие для всех вызывающих, изменять их нельзя.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = RESPONSE_CACHE_SIZE,
+        granularity: Optional[str] = RESPONSE_CACHE_GRANULARITY,
+        store: Optional[TransactionStore] = None,
+    ) -> None:
+        self.maxsize = maxsize
+        self.granularity = granularity
+        self._store = store
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        self._version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _moment(self, timestamp: DateLike) -> datetime:
+        moment = pd.Timestamp(timestamp)
+        if self.granularity:
+            moment = moment.floor(self.granularity)
+        result: datetime = moment.to_pydatetime()
+        return result
+
+    def _get(self, view: Callable[..., Any], timestamp: DateLike, *args: Any) -> Any:
+        store = self._store or get_store()
+        transactions = store.snapshot()
+        version = transactions.attrs[DATA_VERSION_ATTR]
+        moment = self._moment(timestamp)
+        key = (view.__name__, version, moment, args)
+
+        with self._lock:
+            if version != self._version:
+                if self._entries:
+                    logger.info(f"Данные обновлены до версии {version}, кеш ответов очищен")
+                self._entries.clear()
+                self._version = version
+            page = self._entries.get(key)
+            if page is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if page is not None:
+            return {**page, **get_market_data()}
+
+        page = view(moment, transactions, *args)
+        with self._lock:
+            self.misses += 1
+            if version == self._version:
+                self._entries[key] = page
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return page
+
+    def home_view(self, timestamp: DateLike) -> HomePage:
+        page: HomePage = self._get(home_view, timestamp)
+        return page
+
+    def events_view(self, timestamp: DateLike, period: str = "M") -> EventsPage:
+        page: EventsPage = self._get(events_view, timestamp, period)
+        return page
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Кеш ответов процесса (создается при первом обращении)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
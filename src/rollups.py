@@ -0,0 +1,284 @@
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.dates import NO_MONTH, DateLike, month_code, month_codes, slice_by_period
+from src.schema import AMOUNT_UNIT_ATTR, amounts_in_kopecks, with_rubles
+from src.store import derived_for
+
+_NS_PER_DAY = 86_400 * 10**9
+
+# Показатели индекса: сумма и число расходов, сумма и число поступлений
+_EXPENSE_SUM, _EXPENSE_COUNT, _INCOME_SUM, _INCOME_COUNT = range(4)
+_MEASURES = 4
+
+
+class PeriodTotals(NamedTuple):
+    # Суммы в рублях (по модулю) по ключам, у которых были операции
+    by_key: pd.Series
+    # Число операций по тем же ключам
+    counts: pd.Series
+    # Итог по всем операциям, включая операции без ключа
+    total: float
+    total_count: int
+
+
+class DailyTotals:
+    """Индекс накопительных итогов по дням для сумм за произвольный период.
+
+    Для каждого ключа (категории, карты) и дня хранятся накопительные суммы
+    расходов и поступлений в копейках и число операций, поэтому итоги за любой
+    набор целых дней — разность двух строк, найденных бинарным поиском.
+    Неполные дни на границах периода досчитываются по компактной копии операций
+    (время, код ключа, сумма), отсортированной по времени.
+
+    Новые операции добавляются через append: пересчитываются только итоги,
+    начиная с самого раннего затронутого дня.
+    """
+
+    def __init__(self) -> None:
+        self.keys = pd.Index([], dtype=object)
+        # Полночь каждого дня с операциями, нс от эпохи
+        self.days = np.empty(0, dtype=np.int64)
+        # Столбец 0 — операции без ключа, столбец i + 1 — ключ self.keys[i]
+        self._daily = np.zeros((_MEASURES, 0, 1), dtype=np.int64)
+        # Строка 0 — нулевая, строка i + 1 — итог по i-й день включительно
+        self._prefix = np.zeros((_MEASURES, 1, 1), dtype=np.int64)
+        self._times = np.empty(0, dtype=np.int64)
+        self._codes = np.empty(0, dtype=np.int64)
+        self._amounts = np.empty(0, dtype=np.int64)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, key_column: str = "Категория") -> "DailyTotals":
+        """Индекс по колонке key_column DataFrame транзакций."""
+        return cls().append(df["Дата операции"], df[key_column], amounts_in_kopecks(df))
+
+    def _bucket(self, rows: np.ndarray, codes: np.ndarray, amounts: np.ndarray) -> np.ndarray:
+        """Показатели по (строка, ключ) для операций: rows — номера строк результата."""
+        n_keys = len(self.keys) + 1
+        size = (int(rows.max()) + 1 if len(rows) else 0) * n_keys
+        flat = rows * n_keys + codes
+        result = np.zeros((_MEASURES, size), dtype=np.int64)
+        for sum_measure, count_measure, mask, values in (
+            (_EXPENSE_SUM, _EXPENSE_COUNT, amounts < 0, -amounts),
+            (_INCOME_SUM, _INCOME_COUNT, amounts > 0, amounts),
+        ):
+            # Суммы копеек меньше 2**53 складываются в float64 без потерь
+            result[sum_measure] = np.bincount(flat[mask], weights=values[mask], minlength=size).round()
+            result[count_measure] = np.bincount(flat[mask], minlength=size)
+        return result.reshape(_MEASURES, -1, n_keys)
+
+    def append(self, dates: pd.Series, keys: pd.Series, amounts: np.ndarray) -> "DailyTotals":
+        """Добавление операций: даты, ключи (пропуск — без ключа) и суммы в копейках."""
+        dates = pd.DatetimeIndex(dates)
+        valid = ~np.asarray(dates.isna())
+        times = dates.asi8[valid]
+        keys = pd.Index(np.asarray(keys, dtype=object)[valid])
+        amounts = np.asarray(amounts, dtype=np.int64)[valid]
+        if not len(times):
+            return self
+
+        new_keys = pd.Index(keys.dropna().unique())
+        self.keys = self.keys.append(new_keys[~new_keys.isin(self.keys)])
+        codes = self.keys.get_indexer(keys) + 1
+
+        day_values = times - times % _NS_PER_DAY
+        days = np.union1d(self.days, day_values)
+        first = int(np.searchsorted(days, day_values.min()))
+        n_keys = len(self.keys) + 1
+        if len(days) != len(self.days) or n_keys != self._daily.shape[2]:
+            # Новые дни и ключи: раскладываем прежние данные по новой сетке.
+            # До дня first вставок нет, поэтому первые first + 1 строк итогов не меняются.
+            daily = np.zeros((_MEASURES, len(days), n_keys), dtype=np.int64)
+            daily[:, np.searchsorted(days, self.days), :self._daily.shape[2]] = self._daily
+            prefix = np.zeros((_MEASURES, len(days) + 1, n_keys), dtype=np.int64)
+            prefix[:, :first + 1, :self._prefix.shape[2]] = self._prefix[:, :first + 1]
+            self.days, self._daily, self._prefix = days, daily, prefix
+
+        day_codes = np.searchsorted(self.days, day_values) - first
+        self._daily[:, first:first + int(day_codes.max()) + 1] += self._bucket(day_codes, codes, amounts)
+        self._prefix[:, first + 1:] = self._prefix[:, first:first + 1] + np.cumsum(self._daily[:, first:], axis=1)
+
+        in_order = len(self._times) == 0 or times.min() >= self._times[-1]
+        self._times = np.concatenate([self._times, times])
+        self._codes = np.concatenate([self._codes, codes])
+        self._amounts = np.concatenate([self._amounts, amounts])
+        if not (in_order and np.all(times[1:] >= times[:-1])):
+            order = np.argsort(self._times, kind="stable")
+            self._times, self._codes, self._amounts = self._times[order], self._codes[order], self._amounts[order]
+        return self
+
+    def _totals(self, sums: np.ndarray, counts: np.ndarray) -> PeriodTotals:
+        present = counts[1:] > 0
+        keys = self.keys[present]
+        by_key = pd.Series(sums[1:][present] / 100, index=keys, dtype=float)
+        key_counts = pd.Series(counts[1:][present], index=keys, dtype=np.int64)
+        order = np.argsort(keys.to_numpy(), kind="stable")
+        return PeriodTotals(by_key.iloc[order], key_counts.iloc[order], float(sums.sum()) / 100, int(counts.sum()))
+
+    def query(self, start_date: DateLike, end_date: DateLike) -> Tuple[PeriodTotals, PeriodTotals]:
+        """Итоги расходов и поступлений за [start_date, end_date] (обе границы включительно)."""
+        start = pd.Timestamp(start_date).value
+        end = pd.Timestamp(end_date).value
+        totals = np.zeros((_MEASURES, len(self.keys) + 1), dtype=np.int64)
+
+        first_full = -(-start // _NS_PER_DAY) * _NS_PER_DAY
+        last_start = end - end % _NS_PER_DAY
+        if first_full <= last_start:
+            lo = np.searchsorted(self.days, first_full, side="left")
+            hi = np.searchsorted(self.days, last_start, side="left")
+            totals += self._prefix[:, hi] - self._prefix[:, lo]
+            edges = [(start, first_full - 1), (last_start, end)]
+        else:
+            edges = [(start, end)]
+
+        for edge_start, edge_end in edges:
+            lo = np.searchsorted(self._times, edge_start, side="left")
+            hi = np.searchsorted(self._times, edge_end, side="right")
+            if lo < hi:
+                rows = np.zeros(hi - lo, dtype=np.int64)
+                totals += self._bucket(rows, self._codes[lo:hi], self._amounts[lo:hi])[:, 0]
+
+        return (
+            self._totals(totals[_EXPENSE_SUM], totals[_EXPENSE_COUNT]),
+            self._totals(totals[_INCOME_SUM], totals[_INCOME_COUNT]),
+        )
+
+
+class MonthlyCube:
+    """Расходы и кешбэк по (месяц, карта, категория) для выборок за календарный месяц.
+
+    Строится одним groupby по всем операциям; из его ячеек сразу складываются
+    плотные матрицы месяц × категория, поэтому итоги по категориям за месяц —
+    одна строка матрицы, O(числа категорий). Категории — все, что встречаются
+    в данных (в т.ч. только с поступлениями). Суммы хранятся в копейках,
+    расходы — по модулю, кешбэк — по всем операциям ячейки.
+    """
+
+    def __init__(self, categories: pd.Index, cards: pd.Index, cells: pd.DataFrame) -> None:
+        self.categories = categories
+        self.cards = cards
+        # Ячейки groupby, по возрастанию месяца: month, card, category (коды, -1 — пропуск), spend, cashback
+        self.cells = cells
+        self.months = np.unique(cells["month"].to_numpy())
+        self._cell_months = cells["month"].to_numpy()
+        # Ячейки без категории в матрицы месяц × категория не входят
+        categorized = cells["category"].to_numpy() >= 0
+        rows = np.searchsorted(self.months, self._cell_months[categorized])
+        columns = cells["category"].to_numpy()[categorized]
+        self._spend, self._cashback = (
+            self._matrix(rows, columns, cells[measure].to_numpy()[categorized]) for measure in ("spend", "cashback")
+        )
+
+    def _matrix(self, rows: np.ndarray, columns: np.ndarray, values: np.ndarray) -> np.ndarray:
+        matrix = np.zeros((len(self.months), len(self.categories)), dtype=np.int64)
+        np.add.at(matrix, (rows, columns), values)
+        return matrix
+
+    @staticmethod
+    def _codes(df: pd.DataFrame, column: str) -> Tuple[np.ndarray, pd.Index]:
+        """Коды колонки (-1 — пропуск) и встречающиеся значения по алфавиту."""
+        if column not in df.columns:
+            return np.full(len(df), -1, dtype=np.int64), pd.Index([], dtype=object)
+        values = df[column].array
+        if not isinstance(values, pd.Categorical):
+            values = pd.Categorical(df[column].to_numpy(dtype=object))
+        # У колонки снимка словарь общий для всех версий: оставляем только встречающиеся значения
+        values = values.remove_unused_categories()
+        values = values.reorder_categories(values.categories.sort_values())
+        return values.codes.astype(np.int64), pd.Index(values.categories, dtype=object)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "MonthlyCube":
+        """Куб по DataFrame транзакций; сам df не меняется."""
+        months = month_codes(df["Дата операции"])
+        amounts = amounts_in_kopecks(df)
+        cashback = amounts_in_kopecks(df, "Кешбэк") if "Кешбэк" in df.columns else np.zeros(len(df), dtype=np.int64)
+        card_codes, cards = cls._codes(df, "Номер карты")
+        category_codes, categories = cls._codes(df, "Категория")
+        valid = months != NO_MONTH
+        cells = pd.DataFrame({
+            "month": months[valid],
+            "card": card_codes[valid],
+            "category": category_codes[valid],
+            "spend": np.where(amounts < 0, -amounts, 0)[valid],
+            "cashback": cashback[valid],
+        }).groupby(["month", "card", "category"], sort=True).sum().reset_index()
+        return cls(categories, cards, cells)
+
+    def _row(self, year: int, month: int) -> Optional[int]:
+        code = month_code(year, month)
+        row = int(np.searchsorted(self.months, code))
+        return row if row < len(self.months) and self.months[row] == code else None
+
+    def month(self, year: int, month: int) -> pd.DataFrame:
+        """Расходы (spend) и кешбэк (cashback) в рублях за месяц по всем категориям."""
+        row = self._row(year, month)
+        spend, cashback = (
+            (self._spend[row], self._cashback[row]) if row is not None else (np.zeros(len(self.categories)),) * 2
+        )
+        return pd.DataFrame({"spend": spend / 100, "cashback": cashback / 100}, index=self.categories)
+
+    def by_card(self, year: int, month: int) -> pd.DataFrame:
+        """Расходы и кешбэк в рублях за месяц по парам (карта, категория), у которых были операции."""
+        code = month_code(year, month)
+        lo, hi = np.searchsorted(self._cell_months, [code, code + 1])
+        cells = self.cells.iloc[lo:hi]
+        index = pd.MultiIndex.from_arrays([
+            self.cards.take(cells["card"], fill_value=np.nan),
+            self.categories.take(cells["category"], fill_value=np.nan),
+        ], names=["Номер карты", "Категория"])
+        return pd.DataFrame(
+            {"spend": cells["spend"].to_numpy() / 100, "cashback": cells["cashback"].to_numpy() / 100}, index=index
+        )
+
+
+def monthly_cube(df: pd.DataFrame) -> MonthlyCube:
+    """MonthlyCube: для снимка хранилища — один на версию данных."""
+    return derived_for(df, "monthly_cube", MonthlyCube.from_frame)
+
+
+def totals_index(df: pd.DataFrame, key_column: str = "Категория") -> DailyTotals:
+    """DailyTotals по колонке key_column: для снимка хранилища — один на версию данных."""
+    return derived_for(df, f"daily_totals:{key_column}", lambda d: DailyTotals.from_frame(d, key_column))
+
+
+def is_indexable(df: pd.DataFrame) -> bool:
+    """Можно ли считать итоги df через DailyTotals без потери точности.
+
+    Индекс хранит целые копейки, поэтому используется для загруженных данных
+    (суммы уже в копейках); для DataFrame с произвольными float-суммами
+    результат считается напрямую.
+    """
+    return bool(
+        df.attrs.get(AMOUNT_UNIT_ATTR) == "kopecks"
+        and pd.api.types.is_datetime64_any_dtype(df["Дата операции"])
+    )
+
+
+def _direct_totals(keys: pd.Series, amounts: pd.Series) -> PeriodTotals:
+    by_key = amounts.groupby(keys, observed=True, sort=True)
+    return PeriodTotals(
+        by_key.sum().astype(float).rename_axis(None).rename(None),
+        by_key.count().astype(np.int64).rename_axis(None).rename(None),
+        float(amounts.sum()),
+        len(amounts),
+    )
+
+
+def period_totals(
+    df: pd.DataFrame, start_date: DateLike, end_date: DateLike, key_column: str = "Категория"
+) -> Tuple[PeriodTotals, PeriodTotals]:
+    """Итоги расходов и поступлений за [start_date, end_date] по колонке key_column.
+
+    Для данных в копейках — через DailyTotals (см. is_indexable), для DataFrame
+    с произвольными float-суммами — напрямую по строкам периода, без округления.
+    """
+    if is_indexable(df):
+        return totals_index(df, key_column).query(start_date, end_date)
+    period = slice_by_period(df, pd.Timestamp(start_date), pd.Timestamp(end_date))
+    amounts = pd.to_numeric(with_rubles(period)["Сумма операции"], errors="coerce")
+    keys = period[key_column].astype(object)
+    expenses, income = amounts < 0, amounts > 0
+    return _direct_totals(keys[expenses], -amounts[expenses]), _direct_totals(keys[income], amounts[income])
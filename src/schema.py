@@ -0,0 +1,107 @@
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+# Колонки из разных выгрузок, которые означают одно и то же
+COLUMN_ALIASES = {
+    "Кэшбэк": "Кешбэк",
+}
+
+# Повторяющиеся строковые значения храним как категории (словарное кодирование)
+CATEGORY_COLUMNS = (
+    "Номер карты",
+    "Статус",
+    "Валюта операции",
+    "Валюта платежа",
+    "Категория",
+    "Описание",
+)
+
+# Сумма операции в исходной валюте после пересчета в валюту отчетности (см. src.fx)
+ORIGINAL_AMOUNT_COLUMN = "Исходная сумма операции"
+
+# Денежные суммы храним в копейках (int64)
+AMOUNT_COLUMNS = (
+    "Сумма операции",
+    "Сумма платежа",
+    "Кешбэк",
+    "Сумма операции с округлением",
+    ORIGINAL_AMOUNT_COLUMN,
+)
+
+# Небольшие целые числа (MCC — четырехзначный код)
+INTEGER_COLUMNS = {
+    "MCC": "Int16",
+    "Бонусы (включая кэшбэк)": "Int32",
+    "Округление на инвесткопилку": "Int32",
+}
+
+# Отметка в DataFrame.attrs о том, в каких единицах хранятся суммы
+AMOUNT_UNIT_ATTR = "amount_unit"
+
+
+def _to_kopecks(values: pd.Series) -> pd.Series:
+    """Перевод сумм в рублях в целые копейки."""
+    kopecks = (pd.to_numeric(values, errors="coerce") * 100).round()
+    if kopecks.isna().any():
+        return kopecks.astype("Int64")
+    return kopecks.astype(np.int64)
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Приведение DataFrame транзакций к компактным типам.
+
+    Строковые колонки становятся категориями, суммы хранятся в копейках,
+    MCC и бонусы — небольшими целыми. Колонки, которых нет в выгрузке, пропускаются.
+    """
+    df = df.rename(columns=COLUMN_ALIASES)
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype("category")
+    for column in AMOUNT_COLUMNS:
+        if column in df.columns:
+            df[column] = _to_kopecks(df[column])
+    for column, dtype in INTEGER_COLUMNS.items():
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors="coerce").round().astype(dtype)
+    df.attrs[AMOUNT_UNIT_ATTR] = "kopecks"
+    return df
+
+
+def with_rubles(df: pd.DataFrame) -> pd.DataFrame:
+    """DataFrame с суммами в рублях (float) вместо копеек.
+
+    Если суммы уже в рублях (например, DataFrame собран вручную), возвращается как есть.
+    """
+    if df.attrs.get(AMOUNT_UNIT_ATTR) != "kopecks":
+        return df
+    converted = {
+        column: df[column].astype("float64") / 100
+        for column in AMOUNT_COLUMNS
+        if column in df.columns
+    }
+    result = df.assign(**converted)
+    result.attrs[AMOUNT_UNIT_ATTR] = "rubles"
+    return result
+
+
+def amounts_in_kopecks(df: pd.DataFrame, column: str = "Сумма операции") -> np.ndarray:
+    """Суммы колонки в целых копейках (int64, пропуски — 0) независимо от способа хранения."""
+    values = df[column]
+    if df.attrs.get(AMOUNT_UNIT_ATTR) != "kopecks":
+        values = (pd.to_numeric(values, errors="coerce") * 100).round()
+    return np.asarray(values.fillna(0), dtype=np.int64)
+
+
+def memory_report(df: pd.DataFrame) -> Dict[str, Any]:
+    """Отчет о потреблении памяти DataFrame по колонкам (в байтах)."""
+    usage = df.memory_usage(deep=True, index=False)
+    return {
+        "rows": len(df),
+        "total_bytes": int(usage.sum()),
+        "columns": {
+            column: {"dtype": str(df[column].dtype), "bytes": int(usage[column])}
+            for column in df.columns
+        },
+    }
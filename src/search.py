@@ -0,0 +1,300 @@
+import re
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.dates import is_sorted_by_date
+from src.store import derived_for
+
+# Поля транзакции, по которым ищет simple_search
+SEARCH_FIELDS = ("Категория", "Описание")
+
+# Режимы поиска: подстрока (как в str.__contains__), целые слова, начала слов
+# и нечеткий поиск по триграммам (разные написания: "OZON", "Ozon.ru", "Озон")
+SEARCH_MODES = ("substring", "word", "prefix", "fuzzy")
+
+# Минимальное сходство для нечеткого поиска: доля триграмм запроса, найденных в тексте
+FUZZY_THRESHOLD = 0.5
+
+# Максимальная длина n-граммы в индексе; более короткие запросы ищутся по одной n-грамме
+_NGRAM = 3
+
+_WORD = re.compile(r"\w+")
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+# Найденные строки собираются срезами, если текстов и строк немного; иначе — маской по всем строкам
+_SLICE_TEXTS = 256
+_SLICE_ROWS = 4096
+
+
+# Транслитерация кириллицы и сведение похожих латинских написаний к одному
+_TRANSLIT = str.maketrans({
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "e", "ж": "zh", "з": "z", "и": "i",
+    "й": "i", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p", "р": "r", "с": "s", "т": "t",
+    "у": "u", "ф": "f", "х": "h", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "sch", "ъ": "", "ы": "y", "ь": "",
+    "э": "e", "ю": "yu", "я": "ya",
+})
+_LATIN_FOLDS = [
+    (re.compile(r"x"), "ks"), (re.compile(r"w"), "v"), (re.compile(r"q"), "k"), (re.compile(r"ph"), "f"),
+    (re.compile(r"c(?!h)"), "k"), (re.compile(r"(\w)\1+"), r"\1"),
+]
+
+
+def normalize(text: str) -> str:
+    return text.lower()
+
+
+def fold(text: str) -> str:
+    """Текст для нечеткого поиска: латиница без повторов букв, только слова ("Ozon.ru" -> "ozon ru")."""
+    text = normalize(text).translate(_TRANSLIT)
+    for pattern, replacement in _LATIN_FOLDS:
+        text = pattern.sub(replacement, text)
+    return " ".join(_words(text))
+
+
+def trigrams(text: str) -> Set[str]:
+    """Триграммы слов текста с границами слов, как в pg_trgm: "ozon" -> "  o", " oz", "ozo", "zon", "on "."""
+    result: Set[str] = set()
+    for word in _words(text):
+        padded = f"  {word} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text)
+
+
+def _ngrams(text: str) -> Set[str]:
+    return {text[i:i + n] for n in range(1, _NGRAM + 1) for i in range(len(text) - n + 1)}
+
+
+def _postings(index: Dict[str, List[int]]) -> Dict[str, np.ndarray]:
+    """Словарь {ключ: список} в {ключ: отсортированный массив номеров}."""
+    return {key: np.array(ids, dtype=np.int64) for key, ids in index.items()}
+
+
+def _intersect(arrays: List[np.ndarray]) -> np.ndarray:
+    arrays = sorted(arrays, key=len)
+    result = arrays[0]
+    for array in arrays[1:]:
+        if not len(result):
+            break
+        result = np.intersect1d(result, array, assume_unique=True)
+    return result
+
+
+def match_text(text: str, query: str, mode: str) -> bool:
+    """Соответствует ли нормализованный текст нормализованному запросу (режимы, кроме fuzzy).
+
+    То же, что SearchIndex.search для одного текста: для разовой проверки
+    небольшого числа текстов без построения индекса.
+    """
+    if mode == "substring":
+        return query in text
+    query_words = _words(query)
+    if not query_words:
+        return False
+    text_words = _words(text)
+    if mode == "word":
+        return set(query_words) <= set(text_words)
+    return all(any(word.startswith(prefix) for word in text_words) for prefix in query_words)
+
+
+class SearchIndex:
+    """Инвертированный индекс по категории и описанию транзакций.
+
+    Категории и описания сильно повторяются, поэтому индексируются уникальные
+    нормализованные тексты: n-граммы длиной до трех символов и слова текста
+    ведут к номерам текстов, а для каждого текста хранится список строк, где
+    он встречается. Запрос подстроки пересекает списки n-грамм запроса и
+    проверяет найденные тексты, поэтому просматриваются только кандидаты, а не
+    все транзакции. Найденные строки возвращаются в порядке дат.
+    """
+
+    def __init__(self, field_values: Iterable[Any], order: Optional[np.ndarray] = None) -> None:
+        # field_values: для каждого поля — значения по строкам (Series или список; None/NaN — пусто)
+        vocabulary: Dict[str, int] = {}
+        text_ids: List[np.ndarray] = []
+        for values in field_values:
+            values = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+                # Индексируются только встречающиеся категории (у фильтра снимка их может быть мало)
+                used = np.zeros(len(uniques) + 1, dtype=bool)
+                used[codes] = True
+                used = used[:-1]
+                if not used.all():
+                    codes = np.append(np.cumsum(used) - 1, -1)[codes]
+                    uniques = uniques[used]
+            else:
+                codes, uniques = pd.factorize(values)
+            mapping = np.array([vocabulary.setdefault(normalize(str(u)), len(vocabulary)) for u in uniques] + [-1],
+                               dtype=np.int64)
+            text_ids.append(mapping[codes])
+        self.texts = list(vocabulary)
+        self.size = len(text_ids[0]) if text_ids else 0
+
+        # Текст -> строки (CSR): строки отсортированы по номеру текста, offsets — границы
+        pairs_text = np.concatenate(text_ids) if text_ids else _EMPTY
+        pairs_row = np.tile(np.arange(self.size, dtype=np.int64), len(text_ids))
+        present = pairs_text >= 0
+        pairs_text, pairs_row = pairs_text[present], pairs_row[present]
+        by_text = np.argsort(pairs_text, kind="stable")
+        self._rows = pairs_row[by_text]
+        self._offsets = np.searchsorted(pairs_text[by_text], np.arange(len(self.texts) + 1))
+        self._present = np.unique(pairs_row)
+
+        grams: Dict[str, List[int]] = {}
+        words: Dict[str, List[int]] = {}
+        fuzzy: Dict[str, List[int]] = {}
+        self._trigram_counts = np.zeros(len(self.texts), dtype=np.int64)
+        for text_id, text in enumerate(self.texts):
+            for gram in _ngrams(text):
+                grams.setdefault(gram, []).append(text_id)
+            for word in set(_words(text)):
+                words.setdefault(word, []).append(text_id)
+            text_trigrams = trigrams(fold(text))
+            self._trigram_counts[text_id] = len(text_trigrams)
+            for gram in text_trigrams:
+                fuzzy.setdefault(gram, []).append(text_id)
+        self._grams = _postings(grams)
+        self._words = _postings(words)
+        self._sorted_words = sorted(self._words)
+        self._trigrams = _postings(fuzzy)
+
+        # Ранг строки в порядке дат (None — строки уже в порядке дат)
+        self._rank: Optional[np.ndarray] = None
+        if order is not None:
+            self._rank = np.empty(self.size, dtype=np.int64)
+            self._rank[order] = np.arange(self.size)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "SearchIndex":
+        order = None
+        if "Дата операции" in df.columns and not is_sorted_by_date(df):
+            order = np.argsort(pd.to_datetime(df["Дата операции"]).to_numpy(), kind="stable")
+        return cls([df[field] for field in SEARCH_FIELDS if field in df.columns], order)
+
+    @classmethod
+    def from_records(cls, transactions: List[Dict[str, Any]]) -> "SearchIndex":
+        """Индекс по списку записей; результаты — в порядке списка."""
+        return cls([[t.get(field) for t in transactions] for field in SEARCH_FIELDS])
+
+    def _substring(self, query: str) -> np.ndarray:
+        if len(query) <= _NGRAM:
+            return self._grams.get(query, _EMPTY)
+        grams = [query[i:i + _NGRAM] for i in range(len(query) - _NGRAM + 1)]
+        if any(gram not in self._grams for gram in grams):
+            return _EMPTY
+        candidates = _intersect([self._grams[gram] for gram in set(grams)])
+        return np.array([i for i in candidates if query in self.texts[i]], dtype=np.int64)
+
+    def _prefix(self, prefix: str) -> np.ndarray:
+        matched = []
+        for position in range(bisect_left(self._sorted_words, prefix), len(self._sorted_words)):
+            word = self._sorted_words[position]
+            if not word.startswith(prefix):
+                break
+            matched.append(self._words[word])
+        return np.unique(np.concatenate(matched)) if matched else _EMPTY
+
+    def _similarity(self, query: str, threshold: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Номера текстов с общими триграммами запроса, доля триграмм запроса в тексте и общее сходство."""
+        query_trigrams = trigrams(fold(query))
+        postings = [self._trigrams[gram] for gram in query_trigrams if gram in self._trigrams]
+        if not postings:
+            return _EMPTY, np.empty(0), np.empty(0)
+        candidates, common = np.unique(np.concatenate(postings), return_counts=True)
+        scores = common / len(query_trigrams)
+        passed = scores >= threshold
+        candidates, common, scores = candidates[passed], common[passed], scores[passed]
+        overall = common / (len(query_trigrams) + self._trigram_counts[candidates] - common)
+        return candidates, scores, overall
+
+    def similar(
+        self, query: str, limit: Optional[int] = None, threshold: float = FUZZY_THRESHOLD
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Тексты, похожие на запрос: (номера текстов, сходство) по убыванию сходства.
+
+        Сходство — доля триграмм запроса (после транслитерации, см. fold), найденных
+        в тексте; при равенстве выше тексты, у которых меньше лишних триграмм.
+        Просматриваются только тексты с общими триграммами.
+        """
+        candidates, scores, overall = self._similarity(query, threshold)
+        order = np.lexsort((-overall, -scores))[:limit]
+        return candidates[order], scores[order]
+
+    def _fuzzy(self, query: str, limit: Optional[int]) -> np.ndarray:
+        """Строки с похожими текстами: по убыванию сходства, при равенстве — в порядке дат."""
+        text_ids, scores, overall = self._similarity(query, FUZZY_THRESHOLD)
+        if not len(text_ids):
+            return _EMPTY
+        if limit is not None:
+            # Нужны только самые похожие тексты: по убыванию сходства, пока в них не
+            # наберется 2 * limit строк (строка может найтись по двум полям), и равные последнему
+            order = np.lexsort((-overall, -scores))
+            counts = np.cumsum(self._offsets[text_ids + 1][order] - self._offsets[text_ids][order])
+            last = order[min(int(np.searchsorted(counts, 2 * limit)), len(order) - 1)]
+            keep = (scores > scores[last]) | ((scores == scores[last]) & (overall >= overall[last]))
+            text_ids, scores, overall = text_ids[keep], scores[keep], overall[keep]
+        starts, ends = self._offsets[text_ids], self._offsets[text_ids + 1]
+        rows = np.concatenate([self._rows[start:end] for start, end in zip(starts, ends)])
+        rank = rows if self._rank is None else self._rank[rows]
+        ordered = rows[np.lexsort((rank, -np.repeat(overall, ends - starts), -np.repeat(scores, ends - starts)))]
+        # Строка могла найтись и по категории, и по описанию: остается лучшее вхождение
+        _, first = np.unique(ordered, return_index=True)
+        return ordered[np.sort(first)][:limit]
+
+    def _text_ids(self, query: str, mode: str) -> np.ndarray:
+        if mode == "substring":
+            return self._substring(query)
+        words = _words(query)
+        if not words:
+            return _EMPTY
+        if mode == "word":
+            return _intersect([self._words.get(word, _EMPTY) for word in words])
+        return _intersect([self._prefix(word) for word in words])
+
+    def _rows_for(self, text_ids: np.ndarray) -> np.ndarray:
+        starts, ends = self._offsets[text_ids], self._offsets[text_ids + 1]
+        if len(text_ids) <= _SLICE_TEXTS and (ends - starts).sum() <= _SLICE_ROWS:
+            return np.unique(np.concatenate([self._rows[start:end] for start, end in zip(starts, ends)]))
+        # Много текстов или строк: отметки в маске строк вместо сортировки найденного
+        hit = np.zeros(len(self.texts), dtype=bool)
+        hit[text_ids] = True
+        found = np.zeros(self.size, dtype=bool)
+        found[self._rows[np.repeat(hit, np.diff(self._offsets))]] = True
+        return np.flatnonzero(found)
+
+    def search(self, query: str, mode: str = "substring", limit: Optional[int] = None) -> np.ndarray:
+        """Номера строк, где категория или описание соответствуют запросу, в порядке дат.
+
+        substring — запрос содержится в тексте (без учета регистра), word — в
+        тексте есть все слова запроса, prefix — все слова запроса начинают слова
+        текста, fuzzy — текст похож на запрос (строки по убыванию сходства).
+        limit — не больше limit строк (для fuzzy — самые похожие).
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Неизвестный режим поиска: {mode!r}, ожидается один из {SEARCH_MODES}")
+        if mode == "fuzzy":
+            return self._fuzzy(query, limit)
+        query = normalize(query)
+        if mode == "substring" and not query:
+            rows = self._present
+        else:
+            text_ids = self._text_ids(query, mode)
+            if not len(text_ids):
+                return _EMPTY
+            rows = self._rows_for(text_ids)
+        if self._rank is not None:
+            rows = rows[np.argsort(self._rank[rows], kind="stable")]
+        return rows[:limit]
+
+
+def search_index(df: pd.DataFrame) -> SearchIndex:
+    """Поисковый индекс транзакций (для снимка хранилища — один раз на версию данных)."""
+    return derived_for(df, "search_index", SearchIndex.from_frame)
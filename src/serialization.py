@@ -0,0 +1,40 @@
+import json
+import math
+from datetime import date, datetime
+from typing import Any, Iterable
+
+import numpy as np
+import pandas as pd
+
+
+def to_native(obj: Any) -> Any:
+    """Приведение результата к встроенным типам Python для сериализации.
+
+    numpy-скаляры становятся int/float, даты — строками, NaN/NaT/NA — None.
+    """
+    if isinstance(obj, dict):
+        return {str(key): to_native(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_native(value) for value in obj]
+    if obj is None or obj is pd.NaT or obj is pd.NA:
+        return None
+    if isinstance(obj, (pd.Timestamp, datetime)):
+        return obj.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(obj, date):
+        return obj.strftime("%Y-%m-%d")
+    if isinstance(obj, np.generic):
+        obj = obj.item()
+    if isinstance(obj, float) and math.isnan(obj):
+        return None
+    return obj
+
+
+def to_json(obj: Any, **kwargs: Any) -> str:
+    """Сериализация ответа в JSON — единственная точка перевода в строку."""
+    kwargs.setdefault("ensure_ascii", False)
+    return json.dumps(to_native(obj), **kwargs)
+
+
+def to_ndjson(items: Iterable[Any]) -> str:
+    """Сериализация записей в NDJSON: по одному JSON-объекту на строку."""
+    return "".join(to_json(item) + "\n" for item in items)
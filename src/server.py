@@ -0,0 +1,507 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from http import HTTPStatus
+from multiprocessing.synchronize import Lock
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+from src.invest import DEFAULT_THRESHOLDS, investment_savings
+from src.market import get_market_refresher
+from src.models import EventsPage, HomePage, WeekdayReport, WorkdayReport
+from src.query import Page, Query
+from src.reports import spending_by_category, spending_by_weekday, spending_by_workday
+from src.response_cache import get_response_cache
+from src.rollups import monthly_cube, totals_index
+from src.serialization import to_json, to_ndjson
+from src.services import investment_bank, profitable_categories
+from src.store import DATA_ID_ATTR, get_store
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8080"))
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "0")) or os.cpu_count()
+
+# Максимальный размер строки запроса и заголовков
+MAX_HEADER_BYTES = 64 * 1024
+
+# Списки транзакций отдаются страницами (limit, cursor/offset): размер страницы
+# по умолчанию и наибольший; при format=ndjson — потоком частями по SERVER_STREAM_CHUNK записей
+SERVER_PAGE_SIZE = int(os.getenv("SERVER_PAGE_SIZE", "500"))
+MAX_PAGE_SIZE = 10_000
+SERVER_STREAM_CHUNK = int(os.getenv("SERVER_STREAM_CHUNK", "1000"))
+
+# Параметры строки запроса и ответ рабочего процесса: (HTTP-статус, тело в JSON)
+Params = Dict[str, str]
+Response = Tuple[HTTPStatus, str]
+
+
+def _param(params: Params, name: str) -> str:
+    value = params.get(name)
+    if not value:
+        raise ValueError(f"Не указан параметр {name}")
+    return value
+
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _home(params: Params) -> HomePage:
+    return get_response_cache().home_view(params.get("date") or _now())
+
+
+def _events(params: Params) -> EventsPage:
+    return get_response_cache().events_view(params.get("date") or _now(), params.get("period", "M"))
+
+
+def _profitable_categories(params: Params) -> Dict[str, float]:
+    return profitable_categories(get_store().snapshot(), int(_param(params, "year")), int(_param(params, "month")))
+
+
+def _investment_bank(params: Params) -> float:
+    return investment_bank(_param(params, "month"), get_store().snapshot(), float(_param(params, "threshold")))
+
+
+def _investment_savings(params: Params) -> Dict[str, Dict[str, float]]:
+    """Инвесткопилка по месяцам [start, end] для шагов thresholds (через запятую)."""
+    thresholds = [float(value) for value in _list(params.get("thresholds", ""))] or DEFAULT_THRESHOLDS
+    savings = investment_savings(
+        get_store().snapshot(), thresholds, params.get("start") or None, params.get("end") or None
+    )
+    return {
+        month: {f"{step:g}": value for step, value in zip(thresholds, row)}
+        for month, row in zip(savings.index, savings.to_numpy().tolist())
+    }
+
+
+def _simple_search(params: Params) -> Query:
+    return Query(get_store().snapshot()).text(_param(params, "query"), params.get("mode", "substring"))
+
+
+def _phone_numbers(params: Params) -> Query:
+    return Query(get_store().snapshot()).phone(params.get("number"), params.get("prefix"))
+
+
+def _physical_transfers(params: Params) -> Query:
+    return Query(get_store().snapshot()).physical_transfers()
+
+
+def _list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _transactions(params: Params) -> Query:
+    """Транзакции по сочетанию условий; несколько значений перечисляются через запятую."""
+    query = Query(get_store().snapshot())
+    if params.get("start") or params.get("end"):
+        query = query.between(params.get("start") or None, params.get("end") or None)
+    for name in ("card", "category", "mcc", "status"):
+        if params.get(name):
+            query = getattr(query, name)(*_list(params[name]))
+    if params.get("min_amount") or params.get("max_amount"):
+        query = query.amount(
+            float(params["min_amount"]) if params.get("min_amount") else None,
+            float(params["max_amount"]) if params.get("max_amount") else None,
+        )
+    if params.get("query"):
+        query = query.text(params["query"], params.get("mode", "substring"))
+    return query
+
+
+def _category_report(params: Params) -> Dict[str, Any]:
+    return spending_by_category(get_store().snapshot(), _param(params, "category"), date=params.get("date"))
+
+
+def _weekday_report(params: Params) -> WeekdayReport:
+    return spending_by_weekday(get_store().snapshot(), date=params.get("date"))
+
+
+def _workday_report(params: Params) -> WorkdayReport:
+    return spending_by_workday(get_store().snapshot(), date=params.get("date"))
+
+
+def _health(params: Params) -> Dict[str, Any]:
+    return {
+        "status": "ok",
+        "data_version": get_store().version,
+        "cache": get_response_cache().stats(),
+        "market": get_market_refresher().status(),
+    }
+
+
+ROUTES: Dict[str, Callable[[Params], Any]] = {
+    "/home": _home,
+    "/events": _events,
+    "/services/profitable-categories": _profitable_categories,
+    "/services/investment-bank": _investment_bank,
+    "/services/investment-savings": _investment_savings,
+    "/services/search": _simple_search,
+    "/services/phone-numbers": _phone_numbers,
+    "/services/physical-transfers": _physical_transfers,
+    "/transactions": _transactions,
+    "/reports/category": _category_report,
+    "/reports/weekday": _weekday_report,
+    "/reports/workday": _workday_report,
+    "/health": _health,
+}
+
+
+def _limit(params: Params) -> Optional[int]:
+    """Параметр limit: целое число не меньше 1 (без параметра — None)."""
+    value = params.get("limit")
+    if not value:
+        return None
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        raise ValueError(f"limit должен быть целым числом не меньше 1, получено {value!r}")
+    return limit
+
+
+def _page(query: Query, params: Params, limit: int) -> Page:
+    return query.run().page(limit, params.get("cursor"), int(params.get("offset") or 0))
+
+
+# Маршруты со списками транзакций: страницы и потоковая выдача (format=ndjson)
+STREAMING_ROUTES = {"/services/search", "/services/phone-numbers", "/services/physical-transfers", "/transactions"}
+
+
+def dispatch(path: str, params: Params) -> Response:
+    """Обработка запроса в рабочем процессе: (HTTP-статус, тело ответа в JSON).
+
+    Маршруты со списками транзакций возвращают Query, ответ — страница
+    {"items", "next_cursor", "total"} из limit записей (по умолчанию SERVER_PAGE_SIZE).
+    """
+    handler = ROUTES.get(path)
+    if handler is None:
+        return HTTPStatus.NOT_FOUND, to_json({"error": f"Неизвестный адрес {path}"})
+    try:
+        result = handler(params)
+        if isinstance(result, Query):
+            limit = min(_limit(params) or SERVER_PAGE_SIZE, MAX_PAGE_SIZE)
+            result = _page(result, params, limit)._asdict()
+        return HTTPStatus.OK, to_json(result)
+    except (KeyError, ValueError, TypeError) as e:
+        return HTTPStatus.BAD_REQUEST, to_json({"error": str(e)})
+    except Exception:
+        logger.exception(f"Ошибка при обработке {path}")
+        return HTTPStatus.INTERNAL_SERVER_ERROR, to_json({"error": "Внутренняя ошибка"})
+
+
+def dispatch_rows(
+    path: str, params: Params, limit: Optional[int]
+) -> Tuple[HTTPStatus, str, Optional[np.ndarray], Optional[str]]:
+    """Начало потокового ответа маршрута из STREAMING_ROUTES: запрос выполняется один раз.
+
+    Возвращает (HTTP-статус, тело ошибки или пустую строку, номера найденных строк,
+    идентификатор данных): не больше limit строк (None — все) с позиции params["cursor"] (или offset).
+    """
+    try:
+        result = ROUTES[path](params).run()
+        start = result.start(params.get("cursor"), int(params.get("offset") or 0))
+        rows = result.rows[start:] if limit is None else result.rows[start:start + limit]
+        return HTTPStatus.OK, "", rows, result.query.data_id
+    except (KeyError, ValueError, TypeError) as e:
+        return HTTPStatus.BAD_REQUEST, to_json({"error": str(e)}), None, None
+    except Exception:
+        logger.exception(f"Ошибка при обработке {path}")
+        return HTTPStatus.INTERNAL_SERVER_ERROR, to_json({"error": "Внутренняя ошибка"}), None, None
+
+
+def _snapshot(data_id: Optional[str]) -> pd.DataFrame:
+    """Снимок с данными data_id; процесс, еще не заметивший изменение файла, перечитывает его."""
+    store = get_store()
+    snapshot = store.snapshot()
+    if snapshot.attrs.get(DATA_ID_ATTR) != data_id:
+        store.reload()
+        snapshot = store.snapshot()
+    if snapshot.attrs.get(DATA_ID_ATTR) != data_id:
+        raise ValueError("Данные обновились во время выдачи, повторите запрос")
+    return snapshot
+
+
+def dispatch_records(data_id: Optional[str], rows: np.ndarray) -> Response:
+    """Очередная часть потокового ответа: (HTTP-статус, записи строк rows в NDJSON или ошибка в JSON)."""
+    try:
+        return HTTPStatus.OK, to_ndjson(Query(_snapshot(data_id)).run().records_at(rows))
+    except ValueError as e:
+        return HTTPStatus.CONFLICT, to_json({"error": str(e)})
+    except Exception:
+        logger.exception("Ошибка при выдаче записей")
+        return HTTPStatus.INTERNAL_SERVER_ERROR, to_json({"error": "Внутренняя ошибка"})
+
+
+def preload() -> None:
+    """Загрузка снимка данных и основных индексов до приема запросов."""
+    snapshot = get_store().snapshot()
+    totals_index(snapshot)
+    monthly_cube(snapshot)
+    logger.info(f"Данные загружены: версия {get_store().version}, {len(snapshot)} строк")
+
+
+def start_worker(refresher_lock: Optional[Lock] = None) -> None:
+    """Подготовка рабочего процесса: данные и фоновое обновление рыночных данных.
+
+    Обновление запускает только процесс, первым захвативший refresher_lock.
+    Кеши курсов и котировок — общие файлы; страницы во всех процессах читают
+    только их (get_market_data), поэтому остальные процессы к провайдерам не
+    обращаются.
+    """
+    preload()
+    if refresher_lock is None or refresher_lock.acquire(False):
+        _start_refresher()
+
+
+def _start_refresher() -> None:
+    """Однократное обновление рыночных данных (до приема запросов) и запуск фонового обновления."""
+    refresher = get_market_refresher()
+    refresher.refresh()
+    refresher.start()
+
+
+def _format_response(status: HTTPStatus, body: str, keep_alive: bool) -> bytes:
+    payload = body.encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(payload)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        "\r\n"
+    )
+    return head.encode("latin-1") + payload
+
+
+def _format_stream_head(keep_alive: bool) -> bytes:
+    head = (
+        "HTTP/1.1 200 OK\r\n"
+        "Content-Type: application/x-ndjson; charset=utf-8\r\n"
+        "Transfer-Encoding: chunked\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        "\r\n"
+    )
+    return head.encode("latin-1")
+
+
+def _unavailable() -> Response:
+    logger.error("Пул рабочих процессов недоступен")
+    return HTTPStatus.SERVICE_UNAVAILABLE, to_json({"error": "Сервис временно недоступен"})
+
+
+def _format_chunk(body: str) -> bytes:
+    payload = body.encode("utf-8")
+    return f"{len(payload):x}\r\n".encode("latin-1") + payload + b"\r\n"
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, str, Dict[str, str]]]:
+    """Строка запроса и заголовки; None, если клиент закрыл соединение."""
+    try:
+        raw = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError:
+        raise ValueError("Слишком большой заголовок запроса")
+    request_line, *header_lines = raw.decode("latin-1").split("\r\n")
+    method, target, version = request_line.split(" ", 2)
+    headers: Dict[str, str] = {}
+    for line in header_lines:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    return method, target, version, headers
+
+
+class TransactionServer:
+    """HTTP-сервер на asyncio для представлений, сервисов и отчетов.
+
+    Цикл событий только разбирает запросы и пишет ответы; расчеты и
+    сериализация выполняются в пуле рабочих процессов (executor), поэтому
+    тяжелый запрос не задерживает остальные. Данные загружаются до запуска
+    пула: при fork рабочие процессы получают уже загруженный снимок.
+    Курсы и котировки обновляет в фоне (MarketDataRefresher) один из рабочих
+    процессов — первый, он создается при запуске и загружает данные до приема
+    запросов. Остальные процессы читают общий файловый кеш и провайдеров не
+    ждут. В самом сервере обновление не запускается, чтобы рабочие процессы
+    создавались fork без фоновых потоков.
+    Если пул сломан (рабочий процесс аварийно завершился), запросы получают 503.
+    Поддерживаются только GET-запросы; параметры передаются в строке запроса,
+    тело запроса (Content-Length) пропускается.
+    """
+
+    def __init__(
+        self,
+        host: str = SERVER_HOST,
+        port: int = SERVER_PORT,
+        workers: Optional[int] = SERVER_WORKERS,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self._executor = executor
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> "TransactionServer":
+        preload()
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=start_worker, initargs=(multiprocessing.Lock(),)
+            )
+            # Первый рабочий процесс создается сразу: он загружает рыночные данные до приема запросов
+            await asyncio.get_running_loop().run_in_executor(self._executor, os.getpid)
+        else:
+            # Представления выполняются в этом процессе (пул потоков)
+            _start_refresher()
+        server = await asyncio.start_server(self._handle_connection, self.host, self.port, limit=MAX_HEADER_BYTES)
+        self._server = server
+        self.port = server.sockets[0].getsockname()[1]
+        logger.info(f"Сервер запущен: http://{self.host}:{self.port}")
+        return self
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            raise RuntimeError("Сервер не запущен")
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        get_market_refresher().stop()
+
+    async def _respond(self, method: str, path: str, params: Params) -> Response:
+        if method != "GET":
+            return HTTPStatus.METHOD_NOT_ALLOWED, to_json({"error": f"Метод {method} не поддерживается"})
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, dispatch, path, params)
+        except BrokenProcessPool:
+            return _unavailable()
+
+    async def _stream(self, writer: asyncio.StreamWriter, path: str, params: Params, keep_alive: bool) -> None:
+        """Потоковый ответ в NDJSON (chunked): части по SERVER_STREAM_CHUNK записей.
+
+        Запрос выполняется один раз (dispatch_rows): цикл событий получает
+        только номера найденных строк и идентификатор данных. Записи каждой
+        части готовит рабочий процесс по номерам ее строк (dispatch_records) —
+        любой, у которого те же данные; следующая часть запрашивается после
+        отправки текущей (writer.drain), поэтому записей в памяти не больше
+        одной части. limit ограничивает общее число записей.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            limit = _limit(params)
+        except ValueError as e:
+            writer.write(_format_response(HTTPStatus.BAD_REQUEST, to_json({"error": str(e)}), keep_alive))
+            return
+        try:
+            status, body, rows, data_id = await loop.run_in_executor(
+                self._executor, dispatch_rows, path, params, limit
+            )
+        except BrokenProcessPool:
+            (status, body), rows = _unavailable(), None
+        if status != HTTPStatus.OK or rows is None:
+            writer.write(_format_response(status, body, keep_alive))
+            return
+        writer.write(_format_stream_head(keep_alive))
+        for start in range(0, len(rows), SERVER_STREAM_CHUNK):
+            try:
+                status, body = await loop.run_in_executor(
+                    self._executor, dispatch_records, data_id, rows[start:start + SERVER_STREAM_CHUNK]
+                )
+            except BrokenProcessPool:
+                status, body = _unavailable()
+            except Exception:
+                logger.exception(f"Ошибка при обработке {path}")
+                status, body = HTTPStatus.INTERNAL_SERVER_ERROR, to_json({"error": "Внутренняя ошибка"})
+            if status != HTTPStatus.OK:
+                # Заголовок уже отправлен: ошибка — последней строкой потока
+                writer.write(_format_chunk(body + "\n"))
+                break
+            writer.write(_format_chunk(body))
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except ValueError as e:
+                    writer.write(_format_response(HTTPStatus.BAD_REQUEST, to_json({"error": str(e)}), False))
+                    break
+                if request is None:
+                    break
+                method, target, version, headers = request
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    body = to_json({"error": "Некорректный заголовок Content-Length"})
+                    writer.write(_format_response(HTTPStatus.BAD_REQUEST, body, False))
+                    break
+                if "transfer-encoding" in headers or length > MAX_HEADER_BYTES:
+                    # Тело не читается: после ответа соединение закрывается
+                    keep_alive = False
+                elif length:
+                    # Тело не используется, но пропускается, иначе его примут за следующий запрос
+                    try:
+                        await reader.readexactly(length)
+                    except asyncio.IncompleteReadError:
+                        break
+                url = urlsplit(target)
+                params = dict(parse_qsl(url.query))
+                try:
+                    if method == "GET" and params.get("format") == "ndjson" and url.path in STREAMING_ROUTES:
+                        await self._stream(writer, url.path, params, keep_alive)
+                    else:
+                        status, body = await self._respond(method, url.path, params)
+                        writer.write(_format_response(status, body, keep_alive))
+                except ConnectionError:
+                    raise
+                except Exception:
+                    # Ответ мог быть начат, поэтому соединение после ошибки закрывается
+                    logger.exception(f"Ошибка при обработке {url.path}")
+                    body = to_json({"error": "Внутренняя ошибка"})
+                    writer.write(_format_response(HTTPStatus.INTERNAL_SERVER_ERROR, body, False))
+                    keep_alive = False
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host: str = SERVER_HOST, port: int = SERVER_PORT, workers: Optional[int] = SERVER_WORKERS) -> None:
+    server = await TransactionServer(host, port, workers).start()
+    try:
+        await server.serve_forever()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
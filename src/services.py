@@ -1,88 +1,72 @@
-import json
-import re
 from datetime import datetime
+from typing import Dict, List, Optional, Union
 
-import numpy as np
 import pandas as pd
 import pytest
 
+from src.invest import investment_savings
+from src.models import Transaction
+from src.query import Query
+from src.rollups import monthly_cube
 
-def profitable_categories(df, year, month):
-    """Расчет расходов по категориям за указанный месяц."""
-    df['Дата операции'] = pd.to_datetime(df['Дата операции'])
-    mask = (df['Дата операции'].dt.year == year) & (df['Дата операции'].dt.month == month)
-    filtered_df = df[mask].copy()
-    filtered_df = filtered_df[filtered_df['Сумма операции'] < 0]  # Только расходы
-    filtered_df['Сумма операции'] = filtered_df['Сумма операции'].abs()
-    
-    # Группируем по категориям и суммируем расходы
-    category_totals = filtered_df.groupby('Категория')['Сумма операции'].sum()
-    
-    # Определяем все возможные категории
-    all_categories = [
-        "Супермаркеты", "Переводы", "Различные товары", "Бонусы",
-        "Пополнение_BANK007", "Проценты_на_остаток", "Кэшбэк"
-    ]
-    
-    # Формируем словарь с суммами по категориям
-    result = {cat: float(category_totals.get(cat, 0.0)) for cat in all_categories}
-    
-    # Сериализуем результат в JSON-строку
-    return json.dumps(result, ensure_ascii=False)
-
-def investment_bank(month, transactions, threshold):
-    """Расчет суммы для Инвесткопилки за указанный месяц."""
-    df = pd.DataFrame(transactions)
-    df['Дата операции'] = pd.to_datetime(df['Дата операции'])
-    mask = df['Дата операции'].dt.strftime('%Y-%m') == month
-    filtered_df = df[mask & (df['Сумма операции'] < 0)].copy()
-    
-    if len(filtered_df) == 0:
-        return json.dumps(0.0)
-    
-    # Берем первую транзакцию и округляем её
-    amount = abs(filtered_df.iloc[0]['Сумма операции'])
-    rounded = np.ceil(amount / threshold) * threshold
-    difference = rounded - amount
-    
-    return json.dumps(round(float(difference), 2))
-
-def simple_search(query, transactions):
-    """Поиск транзакций по категории и описанию."""
-    query = query.lower()
-    matches = [
-        t for t in transactions 
-        if query in t['Категория'].lower() or query in t['Описание'].lower()
-    ]
-    return json.dumps(matches, ensure_ascii=False)
-
-def search_phone_numbers(transactions):
-    """Поиск транзакций с номерами телефонов в описании."""
-    # Паттерн для поиска номеров в форматах:
-    # +7 921 11-22-33
-    # +7 995 555-55-55
-    # +7 981 333-44-55
-    phone_pattern = r'\+7\s+\d{3}\s+\d{2,3}[-\s]\d{2}[-\s]\d{2}'
-    matches = [
-        t for t in transactions 
-        if re.search(phone_pattern, t['Описание'])
-    ]
-    return json.dumps(matches, ensure_ascii=False)
-
-def search_physical_transfers(transactions):
-    """Поиск транзакций в категории 'Переводы'."""
-    # Паттерн для исключения технических переводов (на карту, счет и т.д.)
-    exclude_pattern = re.compile(r'карт|счет|кредитн|перевод|тп', re.IGNORECASE)
-    # Паттерн для имени (1-2 слова, возможно с инициалами)
-    name_pattern = re.compile(r'^[А-ЯA-Z][а-яa-z]+(?:\s+[А-ЯA-Z]\.?)?$|^[А-ЯA-Z][а-яa-z]+\s+[А-ЯA-Z][а-яa-z]+$')
-    
-    matches = [
-        t for t in transactions 
-        if t['Категория'] == 'Переводы' 
-        and not exclude_pattern.search(t['Описание'].lower())
-        and name_pattern.match(t['Описание'])
-    ]
-    return json.dumps(matches, ensure_ascii=False)
+# Транзакции: список записей или DataFrame (например, снимок хранилища)
+Transactions = Union[pd.DataFrame, List[Transaction]]
+
+
+def profitable_categories(df: pd.DataFrame, year: int, month: int) -> Dict[str, float]:
+    """Расчет расходов по категориям за указанный месяц.
+
+    В ответе все категории, которые встречаются в данных (без расходов за месяц —
+    0.0). Итоги берутся из куба категория × месяц (см. src.rollups.MonthlyCube):
+    для снимка хранилища он строится один раз на версию данных, df не меняется.
+    """
+    spend = monthly_cube(df).month(year, month)["spend"]
+    return {category: float(total) for category, total in spend.items()}
+
+def investment_bank(month: str, transactions: Transactions, threshold: float) -> float:
+    """Расчет суммы для Инвесткопилки за указанный месяц.
+
+    Каждый расход месяца округляется вверх до кратного threshold, разница
+    откладывается (см. src.invest.investment_savings — сразу для диапазона
+    месяцев и нескольких шагов).
+    """
+    return round(float(investment_savings(transactions, [threshold], month, month).iloc[0, 0]), 2)
+
+def simple_search(
+    query: str, transactions: Transactions, mode: str = "substring", limit: Optional[int] = None
+) -> List[Transaction]:
+    """Поиск транзакций по категории и описанию.
+
+    transactions — список записей или DataFrame (для снимка хранилища индекс
+    строится один раз на версию данных, см. src.search). Режимы: substring
+    (подстрока без учета регистра), word (целые слова), prefix (начала слов),
+    fuzzy (похожие написания с транслитерацией, самые похожие первыми).
+    limit — не больше limit транзакций.
+    """
+    return Query(transactions).text(query, mode).limit(limit).run().records()
+
+def search_phone_numbers(
+    transactions: Transactions, number: Optional[str] = None, prefix: Optional[str] = None
+) -> List[Transaction]:
+    """Поиск транзакций с номерами телефонов в описании.
+
+    Без аргументов — все транзакции с номером, number — с этим номером,
+    prefix — с номером, начинающимся с prefix; номера в любом формате
+    (+7 921 111-22-33, 8 (921) 1112233) сравниваются в E.164. transactions —
+    список записей или DataFrame (для снимка хранилища номера извлекаются при
+    загрузке, а индекс строится один раз на версию данных, см. src.phones).
+    """
+    return Query(transactions).phone(number, prefix).run().records()
+
+def search_physical_transfers(transactions: Transactions, workers: Optional[int] = None) -> List[Transaction]:
+    """Поиск переводов физическим лицам в категории 'Переводы'.
+
+    transactions — список записей или DataFrame (для снимка хранилища отметки
+    считаются один раз на версию данных). Шаблоны применяются векторно к
+    уникальным описаниям; большие истории делятся на части и обрабатываются в
+    пуле из workers процессов (см. src.transfers), порядок записей сохраняется.
+    """
+    return Query(transactions).physical_transfers(workers).run().records()
 
 @pytest.fixture
 def sample_transactions():
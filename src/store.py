@@ -0,0 +1,189 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+TRANSACTIONS_FILE = os.getenv("TRANSACTIONS_FILE", "data/transactions.json")
+
+# Отметка в DataFrame.attrs: версия данных, из которой получен снимок
+DATA_VERSION_ATTR = "data_version"
+
+# Отметка в DataFrame.attrs: идентификатор содержимого данных. В отличие от
+# версии (счетчика перезагрузок процесса) он одинаков во всех процессах,
+# прочитавших один и тот же файл, поэтому по нему сверяются курсоры страниц
+DATA_ID_ATTR = "data_id"
+
+T = TypeVar("T")
+
+
+def _read_transactions(file_path: str) -> pd.DataFrame:
+    """Чтение транзакций с суммами в валюте отчетности (пересчет один раз на версию данных)."""
+    # Импорт внутри функции: src.utils сам пользуется производными структурами хранилища
+    from src.fx import to_reporting_currency
+    from src.utils import read_transactions
+
+    df = read_transactions(file_path)
+    return to_reporting_currency(df) if not df.empty else df
+
+
+class TransactionStore:
+    """Общее для процесса хранилище транзакций.
+
+    Файл читается один раз; представления, сервисы и отчеты получают снимки
+    без повторного чтения. Изменение файла (размер/mtime) проверяется не чаще
+    одного раза в check_interval секунд, после чего данные перечитываются и
+    подменяются целиком.
+    """
+
+    def __init__(
+        self,
+        file_path: str = TRANSACTIONS_FILE,
+        check_interval: float = 1.0,
+        loader: Callable[[str], pd.DataFrame] = _read_transactions,
+    ) -> None:
+        self.file_path = file_path
+        self.check_interval = check_interval
+        self._loader = loader
+        self._lock = threading.Lock()
+        # Версия и DataFrame меняются одним присваиванием, чтобы читатели не видели их вразнобой
+        self._state: Tuple[int, Optional[pd.DataFrame]] = (0, None)
+        self._signature: Optional[Tuple[int, int]] = None
+        self._checked_at = 0.0
+        # Производные структуры (индексы, агрегаты) текущей версии данных
+        self._derived: Dict[Tuple[str, int], Any] = {}
+
+    @property
+    def version(self) -> int:
+        return self._state[0]
+
+    def _source_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.file_path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def _data_id(self, signature: Optional[Tuple[int, int]], version: int) -> str:
+        """Идентификатор содержимого: путь, размер и mtime файла (без файла — только в пределах процесса)."""
+        source = f"{self.file_path}:{signature}" if signature is not None else f"{os.getpid()}:{id(self)}:{version}"
+        return hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+
+    def reload(self, force: bool = False) -> bool:
+        """Перечитывание файла, если он изменился. Возвращает True, если данные обновлены."""
+        with self._lock:
+            version, current = self._state
+            signature = self._source_signature()
+            if not force and current is not None and signature == self._signature:
+                return False
+
+            df = self._loader(self.file_path)
+            self._signature = signature
+            if df.empty and current is not None and not current.empty:
+                logger.warning(f"Не удалось перечитать {self.file_path}, оставлены предыдущие данные")
+                return False
+
+            df.attrs[DATA_VERSION_ATTR] = version + 1
+            df.attrs[DATA_ID_ATTR] = self._data_id(signature, version + 1)
+            self._state = (version + 1, df)
+            logger.info(f"Транзакции загружены из {self.file_path}: версия {version + 1}, {len(df)} строк")
+            return True
+
+    def snapshot(self) -> pd.DataFrame:
+        """Снимок транзакций только для чтения.
+
+        Возвращается поверхностная копия: замена колонок в снимке не влияет на
+        хранилище, но изменять значения на месте (.loc[...] = ...) нельзя.
+        Снимок разделяет с хранилищем индекс и массивы колонок; по ним, а не по
+        версии в attrs (pandas копирует attrs в sort_values, fillna и т.п.),
+        узнаются снимки для кеша производных структур (см. is_current).
+        """
+        now = time.monotonic()
+        if self._state[1] is None or now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            self.reload()
+        df = self._state[1]
+        return df.copy(deep=False) if df is not None else pd.DataFrame()
+
+    def derived(self, name: str, builder: Callable[[pd.DataFrame], T], snapshot: pd.DataFrame) -> T:
+        """Структура, построенная builder(snapshot) один раз на версию данных.
+
+        snapshot должен быть получен из snapshot(): по его версии выбирается кеш,
+        поэтому результат всегда согласован с переданными данными.
+        """
+        key = (name, snapshot.attrs[DATA_VERSION_ATTR])
+        value = self._derived.get(key)
+        if value is None:
+            value = builder(snapshot)
+            with self._lock:
+                latest = self.version
+                self._derived = {k: v for k, v in self._derived.items() if k[1] == latest}
+                if key[1] == latest:
+                    self._derived[key] = value
+        return value
+
+    def is_current(self, df: pd.DataFrame) -> bool:
+        """Является ли df снимком текущей версии данных (а не его фильтром или другим DataFrame).
+
+        Снимок — DataFrame с теми же объектами индекса и массивов колонок, что и
+        в хранилище: производные DataFrame той же формы (сортировка, fillna,
+        замена колонки) получают новые массивы и снимками не считаются.
+        """
+        version, current = self._state
+        return (
+            current is not None
+            and df.attrs.get(DATA_VERSION_ATTR) == version
+            and df.index is current.index
+            and df.columns.equals(current.columns)
+            and _same_arrays(df, current)
+        )
+
+
+def _same_arrays(df: pd.DataFrame, other: pd.DataFrame) -> bool:
+    """Хранятся ли колонки df и other в одних и тех же массивах (без копирования)."""
+    # Блоки — внутреннее устройство pandas, но это единственный способ сравнить данные без просмотра значений
+    blocks, other_blocks = df._mgr.blocks, other._mgr.blocks
+    return len(blocks) == len(other_blocks) and all(
+        block.values is other_block.values and np.array_equal(block.mgr_locs.as_array, other_block.mgr_locs.as_array)
+        for block, other_block in zip(blocks, other_blocks)
+    )
+
+
+_store: Optional[TransactionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> TransactionStore:
+    """Хранилище транзакций процесса (создается при первом обращении)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = TransactionStore()
+    return _store
+
+
+def is_snapshot(df: pd.DataFrame) -> bool:
+    """Является ли df снимком текущей версии данных хранилища процесса."""
+    store = _store
+    return store is not None and store.is_current(df)
+
+
+def derived_for(df: pd.DataFrame, name: str, builder: Callable[[pd.DataFrame], T]) -> T:
+    """builder(df), закешированный на версию данных, если df — снимок хранилища процесса.
+
+    Для остальных DataFrame (фильтров снимка, данных из запроса) структура строится заново.
+    """
+    store = _store
+    if store is not None and store.is_current(df):
+        return store.derived(name, builder, df)
+    return builder(df)
@@ -0,0 +1,98 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+from src.store import derived_for
+
+load_dotenv()
+
+# Процессы и размер части (уникальных описаний) для параллельной проверки
+# описаний; если описаний меньше PARALLEL_MIN_TEXTS, они проверяются в текущем процессе
+TRANSFER_WORKERS = int(os.getenv("TRANSFER_WORKERS", "0")) or os.cpu_count() or 1
+TRANSFER_CHUNK_SIZE = int(os.getenv("TRANSFER_CHUNK_SIZE", "20000"))
+PARALLEL_MIN_TEXTS = 50_000
+
+# Отметка "перевод физическому лицу" (bool), см. with_physical_transfer_flag
+PHYSICAL_TRANSFER_COLUMN = "Перевод физлицу"
+
+TRANSFER_CATEGORY = "Переводы"
+
+# Технические переводы (на карту, счет и т.д.) и имя получателя (1-2 слова, возможно с инициалом)
+EXCLUDE_PATTERN = re.compile(r"карт|счет|кредитн|перевод|тп", re.IGNORECASE)
+NAME_PATTERN = re.compile(r"^[А-ЯA-Z][а-яa-z]+(?:\s+[А-ЯA-Z]\.?)?$|^[А-ЯA-Z][а-яa-z]+\s+[А-ЯA-Z][а-яa-z]+$")
+
+
+def _is_person_name(descriptions: np.ndarray) -> np.ndarray:
+    """Векторная проверка уникальных описаний: имя получателя и не технический перевод."""
+    texts = pd.Series(descriptions, dtype=object).fillna("")
+    return np.asarray(
+        ~texts.str.lower().str.contains(EXCLUDE_PATTERN, regex=True) & texts.str.match(NAME_PATTERN), dtype=bool
+    )
+
+
+def _is_person_name_parallel(descriptions: np.ndarray, workers: int, chunk_size: int) -> np.ndarray:
+    """_is_person_name по частям в пуле процессов; части объединяются в исходном порядке."""
+    bounds = range(0, len(descriptions), chunk_size)
+    if workers <= 1 or len(bounds) <= 1:
+        return _is_person_name(descriptions)
+    chunks = (descriptions[start:start + chunk_size] for start in bounds)
+    with ProcessPoolExecutor(max_workers=min(workers, len(bounds))) as pool:
+        return np.concatenate(list(pool.map(_is_person_name, chunks)))
+
+
+def physical_transfer_mask(
+    categories: pd.Series,
+    descriptions: pd.Series,
+    workers: Optional[int] = 1,
+    chunk_size: int = TRANSFER_CHUNK_SIZE,
+) -> np.ndarray:
+    """Маска переводов физическим лицам для пар (категория, описание).
+
+    Регулярные выражения применяются векторно и только к уникальным описаниям
+    переводов, результат раскладывается по строкам по кодам. Уникальные
+    описания делятся на части по chunk_size и проверяются в пуле из workers
+    процессов (workers=None — параллельно, если описаний не меньше
+    PARALLEL_MIN_TEXTS): процессам передаются только различающиеся строки, а
+    не вся история.
+    """
+    categories = pd.Series(categories)
+    descriptions = pd.Series(descriptions)
+    transfers = np.asarray(categories == TRANSFER_CATEGORY, dtype=bool)
+    if isinstance(descriptions.dtype, pd.CategoricalDtype):
+        codes, uniques = np.asarray(descriptions.cat.codes), descriptions.cat.categories.to_numpy(dtype=object)
+        # Проверяются только описания, встречающиеся у переводов
+        relevant = np.zeros(len(uniques) + 1, dtype=bool)
+        relevant[codes[transfers]] = True
+        relevant = relevant[:-1]
+    else:
+        codes = np.full(len(descriptions), -1, dtype=np.int64)
+        codes[transfers], uniques = pd.factorize(descriptions[transfers].to_numpy(dtype=object))
+        relevant = np.ones(len(uniques), dtype=bool)
+    checked = np.asarray(uniques, dtype=object)[relevant]
+    if workers is None:
+        workers = TRANSFER_WORKERS if len(checked) >= PARALLEL_MIN_TEXTS else 1
+    # Последний элемент — для строк без описания (код -1)
+    matches = np.zeros(len(uniques) + 1, dtype=bool)
+    matches[:-1][relevant] = _is_person_name_parallel(checked, workers, chunk_size)
+    return transfers & matches.take(codes)
+
+
+def transfer_flags(df: pd.DataFrame, workers: Optional[int] = None) -> np.ndarray:
+    """Маска переводов физическим лицам для DataFrame (для снимка хранилища — один раз на версию данных)."""
+    if PHYSICAL_TRANSFER_COLUMN in df.columns:
+        return np.asarray(df[PHYSICAL_TRANSFER_COLUMN], dtype=bool)
+    return derived_for(
+        df, "physical_transfers", lambda frame: physical_transfer_mask(frame["Категория"], frame["Описание"], workers)
+    )
+
+
+def with_physical_transfer_flag(df: pd.DataFrame, workers: Optional[int] = None) -> pd.DataFrame:
+    """DataFrame с колонкой PHYSICAL_TRANSFER_COLUMN (если ее еще нет)."""
+    if PHYSICAL_TRANSFER_COLUMN in df.columns:
+        return df
+    return df.assign(**{PHYSICAL_TRANSFER_COLUMN: transfer_flags(df, workers)})
@@ -1,44 +1,104 @@
 import json
 import logging
 import os
+import time
 from datetime import datetime, timedelta
+from typing import Any, Iterable, List, Optional, Tuple, Union
 
+import numpy as np
 import pandas as pd
 import requests
 from dotenv import load_dotenv
 
+from src.cache import load_cached
+from src.dates import DateLike, is_sorted_by_date, parse_transaction_dates, slice_by_period, sort_by_date
+from src.market import (
+    get_currency_client,
+    get_market_refresher,
+    get_quotes_client,
+    normalize_tickers,
+    user_currencies,
+    user_stocks,
+)
+from src.models import (
+    CardStats,
+    CategoryAmount,
+    CardSummary,
+    CurrencyRate,
+    DateRange,
+    ExpensesSummary,
+    Greeting,
+    IncomeSummary,
+    MarketData,
+    StockPrice,
+    TopTransaction,
+)
+from src.phones import with_phones
+from src.rollups import period_totals
+from src.schema import apply_schema, memory_report, with_rubles
+
 load_dotenv()
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def read_transactions(file_path="data/transactions.json"):
-    """Чтение транзакций из JSON-файла."""
+def _parse_transactions(file_path: str) -> pd.DataFrame:
+    """Разбор исходного файла с транзакциями (JSON или Excel)."""
+    if file_path.endswith('.json'):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        df = pd.DataFrame(data)
+    else:
+        df = pd.read_excel(file_path)
+
+    parse_transaction_dates(df)
+    df = with_phones(apply_schema(sort_by_date(df)))
+    logging.debug(f"Транзакции загружены: {memory_report(df)['total_bytes']} байт в памяти")
+    return df
+
+def read_transactions(file_path: str = "data/transactions.json", use_cache: bool = True) -> pd.DataFrame:
+    """Чтение транзакций из JSON- или Excel-файла.
+
+    По умолчанию результат разбора сохраняется в колоночный кеш (см. src.cache),
+    и повторные чтения не разбирают исходный файл заново.
+    """
     try:
-        if file_path.endswith('.json'):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            df = pd.DataFrame(data)
-        else:
-            df = pd.read_excel(file_path)
-        
-        df['Дата операции'] = pd.to_datetime(df['Дата операции'])
-        return df
+        if use_cache:
+            return load_cached(file_path, _parse_transactions)
+        return _parse_transactions(file_path)
     except Exception as e:
         logging.error(f"Ошибка чтения файла: {e}")
         return pd.DataFrame()
 
-def get_date_range(input_date):
-    """Получение даты начала и конца периода для анализа."""
+# Периоды: неделя, месяц и год, на которые приходится дата, и все данные до даты
+PERIODS = ("W", "M", "Y", "ALL")
+
+def get_period_bounds(input_date: DateLike, period: str = "M") -> Tuple[datetime, datetime]:
+    """Границы периода для анализа: от начала недели/месяца/года (или всех данных) до самой даты."""
     if isinstance(input_date, str):
         input_date = datetime.strptime(input_date, "%Y-%m-%d %H:%M:%S")
-    start_date = input_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    return json.dumps({
+    midnight = input_date.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == "W":
+        start_date = midnight - timedelta(days=midnight.weekday())
+    elif period == "M":
+        start_date = midnight.replace(day=1)
+    elif period == "Y":
+        start_date = midnight.replace(month=1, day=1)
+    elif period == "ALL":
+        start_date = pd.Timestamp.min
+    else:
+        raise ValueError(f"Неизвестный период: {period!r}, ожидается один из {PERIODS}")
+    return start_date, input_date
+
+def get_date_range(input_date: DateLike) -> DateRange:
+    """Получение даты начала и конца периода для анализа."""
+    start_date, end_date = get_period_bounds(input_date)
+    return {
         "start_date": start_date.strftime("%Y-%m-%d %H:%M:%S"),
-        "end_date": input_date.strftime("%Y-%m-%d %H:%M:%S")
-    })
+        "end_date": end_date.strftime("%Y-%m-%d %H:%M:%S")
+    }
 
-def get_greeting(hour):
+def get_greeting(hour: Union[int, datetime]) -> Greeting:
     """Получение приветствия в зависимости от часа."""
     hour_num = hour.hour if isinstance(hour, datetime) else hour
     if 5 <= hour_num < 12:
@@ -49,107 +109,246 @@ def get_greeting(hour):
         greeting = "Добрый вечер"
     else:
         greeting = "Доброй ночи"
-    return json.dumps({"greeting": greeting})
+    return {"greeting": greeting}
+
+def summarize_cards(transactions: pd.DataFrame, start_date: DateLike, end_date: DateLike) -> List[CardStats]:
+    """Сводка по картам за период: расходы, поступления, кешбэк и число операций.
 
-def get_card_summaries(transactions, start_date, end_date):
+    Все показатели считаются одним groupby по номеру карты. Операции без номера карты
+    не учитываются.
+    """
+    period = with_rubles(slice_by_period(transactions, start_date, end_date))
+    amounts = period['Сумма операции']
+    per_card = pd.DataFrame({
+        'card': period['Номер карты'],
+        'spent': -amounts.where(amounts < 0, 0.0),
+        'income': amounts.where(amounts > 0, 0.0),
+        'cashback': period['Кешбэк'] if 'Кешбэк' in period else 0.0,
+    }).groupby('card', observed=True, sort=False).agg(
+        spent=('spent', 'sum'),
+        income=('income', 'sum'),
+        cashback=('cashback', 'sum'),
+        count=('spent', 'size'),
+    )
+
+    return _card_stats(per_card.index, per_card['spent'], per_card['income'], per_card['cashback'], per_card['count'])
+
+def _card_stats(
+    cards: Iterable[Any],
+    spent: Iterable[float],
+    income: Iterable[float],
+    cashback: Iterable[float],
+    count: Iterable[int],
+) -> List[CardStats]:
+    """Сводка по картам из посчитанных показателей, по убыванию расходов."""
+    card_summaries: List[CardStats] = [
+        {
+            "last_digits": str(card)[-4:],
+            "total_spent": round(float(card_spent), 2),
+            "total_income": round(float(card_income), 2),
+            "cashback": round(float(card_cashback), 2),
+            "count": int(card_count),
+        }
+        for card, card_spent, card_income, card_cashback, card_count in zip(cards, spent, income, cashback, count)
+    ]
+    return sorted(card_summaries, key=lambda x: (-x["total_spent"], x["last_digits"]))
+
+def _card_summaries(card_stats: List[CardStats]) -> List[CardSummary]:
+    """Краткая сводка по картам для главной страницы."""
+    return [
+        {"last_digits": card["last_digits"], "total_spent": card["total_spent"], "cashback": card["cashback"]}
+        for card in card_stats
+    ]
+
+def get_card_summaries(transactions: pd.DataFrame, start_date: DateLike, end_date: DateLike) -> List[CardSummary]:
     """Получение суммарных данных по картам."""
-    filtered_transactions = transactions[
-        (transactions['Дата операции'] >= start_date) &
-        (transactions['Дата операции'] <= end_date)
+    return _card_summaries(summarize_cards(transactions, start_date, end_date))
+
+def get_top_transactions(
+    transactions: pd.DataFrame, start_date: DateLike, end_date: DateLike, n: int = 5
+) -> List[TopTransaction]:
+    """Получение топ-n транзакций по сумме операции.
+
+    Отбираются только n крупнейших расходов (с учетом равных сумм на границе),
+    форматирование выполняется только для них.
+    """
+    period = slice_by_period(transactions, start_date, end_date)
+    return _top_transactions(period[period['Сумма операции'] < 0], n)
+
+def _smallest(positions: np.ndarray, values: np.ndarray, n: int) -> np.ndarray:
+    """Позиции n наименьших значений вместе с равными n-му (как nsmallest(keep='all'))."""
+    if len(positions) <= n:
+        return positions
+    selected = values[positions]
+    smallest: np.ndarray = positions[selected <= np.partition(selected, n - 1)[n - 1]]
+    return smallest
+
+def _top_transactions(expenses: pd.DataFrame, n: int) -> List[TopTransaction]:
+    """Топ-n расходов из переданных операций-расходов.
+
+    Равные суммы идут в хронологическом порядке (по времени операции), поэтому
+    из равных сумм на границе отбора в топ попадают самые ранние.
+    """
+    amounts = expenses['Сумма операции'].to_numpy(dtype=float)
+    top = with_rubles(expenses.iloc[_smallest(np.arange(len(expenses)), amounts, n)])
+    # Суммы — как в ответе (округленные до копеек), при равных — по времени
+    order = np.lexsort((top['Дата операции'].to_numpy(), top['Сумма операции'].to_numpy(dtype=float).round(2)))
+    top = top.iloc[order[:n]]
+
+    top_transactions: List[TopTransaction] = [
+        {
+            "date": date,
+            "amount": round(float(abs(amount)), 2),
+            "category": category,
+            "description": description
+        }
+        for date, amount, category, description in zip(
+            top['Дата операции'].dt.strftime('%d.%m.%Y'),
+            top['Сумма операции'],
+            top['Категория'],
+            top['Описание'],
+        )
     ]
     
-    card_summaries = []
-    for card in filtered_transactions['Номер карты'].unique():
-        card_transactions = filtered_transactions[filtered_transactions['Номер карты'] == card]
-        total_spent = abs(card_transactions[card_transactions['Сумма операции'] < 0]['Сумма операции'].sum())
-        total_cashback = card_transactions['Кешбэк'].sum()
-        card_summaries.append({
-            "last_digits": card[-4:],
-            "total_spent": round(float(total_spent), 2),
-            "cashback": round(float(total_cashback), 2)
-        })
-    
-    return json.dumps(sorted(card_summaries, key=lambda x: (-x["total_spent"], x["last_digits"])))
-
-def get_top_transactions(transactions, start_date, end_date):
-    """Получение топ транзакций по сумме операции."""
-    filtered_transactions = transactions[
-        (transactions['Дата операции'] >= start_date) &
-        (transactions['Дата операции'] <= end_date) &
-        (transactions['Сумма операции'] < 0)
-    ].sort_values('Сумма операции', ascending=True)
-    
-    top_transactions = []
-    for _, row in filtered_transactions.iterrows():
-        top_transactions.append({
-            "date": row['Дата операции'].strftime('%d.%m.%Y'),
-            "amount": round(float(abs(row['Сумма операции'])), 2),
-            "category": row['Категория'],
-            "description": row['Описание']
-        })
-    
-    return json.dumps(sorted(top_transactions, key=lambda x: (-x["amount"], x["date"])))
+    return top_transactions
+
+def month_to_date_summaries(
+    transactions: pd.DataFrame, end_dates: Iterable[DateLike], n: int = 5
+) -> List[Tuple[List[CardSummary], List[TopTransaction]]]:
+    """Сводки по картам и топ-n транзакций с начала месяца по каждую из дат end_dates.
+
+    Даты должны идти по возрастанию. Внутри месяца итоги по картам накапливаются:
+    для очередной даты обрабатываются только операции после предыдущей, а кандидаты
+    в топ — прежний топ и топ новых операций. Результат совпадает с
+    get_card_summaries и get_top_transactions за тот же период.
+    """
+    if not is_sorted_by_date(transactions):
+        transactions = sort_by_date(transactions)
+
+    results: List[Tuple[List[CardSummary], List[TopTransaction]]] = []
+    month_start = None
+    for end_date in end_dates:
+        start_date, _ = get_period_bounds(end_date)
+        if start_date != month_start:
+            month_start = start_date
+            month_end = start_date + pd.offsets.MonthBegin() - pd.Timedelta(1)
+            month = with_rubles(slice_by_period(transactions, start_date, month_end, presorted=True))
+            top_columns = month[['Дата операции', 'Сумма операции', 'Категория', 'Описание']]
+            dates = month['Дата операции']
+            amounts = month['Сумма операции'].to_numpy(dtype=float)
+            cashback = month['Кешбэк'].to_numpy(dtype=float) if 'Кешбэк' in month else np.zeros(len(month))
+            codes, cards = pd.factorize(month['Номер карты'])
+            spent, income, card_cashback = (np.zeros(len(cards)) for _ in range(3))
+            count = np.zeros(len(cards), dtype=np.int64)
+            candidates = np.empty(0, dtype=np.int64)
+            top_transactions = _top_transactions(top_columns.iloc[candidates], n)
+            processed = 0
 
-def get_currency_rates(currencies=None):
-    """Получение курсов валют."""
+        end = dates.searchsorted(pd.Timestamp(end_date), side='right')
+        segment = slice(processed, end)
+        segment_codes = codes[segment]
+        valid = segment_codes >= 0
+        for totals, values in (
+            (spent, np.where(amounts[segment] < 0, -amounts[segment], 0.0)),
+            (income, np.where(amounts[segment] > 0, amounts[segment], 0.0)),
+            (card_cashback, np.nan_to_num(cashback[segment])),
+        ):
+            totals += np.bincount(segment_codes[valid], weights=values[valid], minlength=len(cards))
+        count += np.bincount(segment_codes[valid], minlength=len(cards))
+
+        new_expenses = processed + np.flatnonzero(amounts[segment] < 0)
+        updated = _smallest(np.union1d(candidates, _smallest(new_expenses, amounts, n)), amounts, n)
+        if not np.array_equal(updated, candidates):
+            candidates = updated
+            top_transactions = _top_transactions(top_columns.iloc[candidates], n)
+        processed = end
+
+        present = count > 0
+        card_stats = _card_stats(
+            cards[present], spent[present], income[present], card_cashback[present], count[present]
+        )
+        results.append((_card_summaries(card_stats), list(top_transactions)))
+    return results
+
+def get_currency_rates(currencies: Optional[List[str]] = None) -> List[CurrencyRate]:
+    """Получение курсов валют в рублях за единицу валюты.
+
+    По умолчанию берутся валюты user_currencies из настроек пользователя. Курсы
+    запрашиваются у провайдера CURRENCY_API_URL и кешируются (см. CurrencyRatesClient).
+    Если курсы получить не удалось, возвращается пустой список.
+    """
     if currencies is None:
-        currencies = ["USD", "EUR"]
-    
-    # Фиксированные значения в рублях за единицу валюты
-    test_rates_rub = {
-        "USD": 82.0,
-        "EUR": 94.0
-    }
-    
-    rates = [{"currency": c, "rate": test_rates_rub[c]} for c in currencies]
-    return json.dumps(rates)
+        currencies = user_currencies()
+    try:
+        rates = get_currency_client().rates()
+    except (requests.RequestException, ValueError, KeyError) as e:
+        logging.warning(f"Не удалось получить курсы валют: {e}")
+        return []
+    return [{"currency": c, "rate": rates[c]} for c in currencies if c in rates]
+
+def get_stock_prices(stocks: Optional[List[str]] = None) -> List[StockPrice]:
+    """Получение цен акций.
 
-def get_stock_prices(stocks=None):
-    """Получение цен акций."""
+    По умолчанию берутся бумаги user_stocks из настроек пользователя. Котировки
+    запрашиваются параллельно и кешируются (см. StockQuotesClient); бумаги, по
+    которым цену получить не удалось, пропускаются.
+    """
     if stocks is None:
-        stocks = ["AAPL", "AMZN"]
-    
-    # Фиксированные значения для тестов
-    test_prices = {
-        "AAPL": 150.12,
-        "AMZN": 3173.18,
-        "GOOGL": 2742.39,
-        "MSFT": 296.71,
-        "TSLA": 1007.08
+        stocks = user_stocks()
+    prices = get_quotes_client().quotes(stocks)
+    return [{"stock": s, "price": prices[s]} for s in normalize_tickers(stocks) if s in prices]
+
+def _age(fetched_at: float) -> float:
+    return round(max(time.time() - fetched_at, 0.0), 1)
+
+def get_market_data(currencies: Optional[List[str]] = None, stocks: Optional[List[str]] = None) -> MarketData:
+    """Курсы валют и цены акций для страниц с возрастом данных в секундах.
+
+    Провайдеры здесь не запрашиваются: данные читаются из кеша, который
+    поддерживает свежим фоновое обновление (см. MarketDataRefresher), поэтому
+    возвращается последнее удачно полученное значение, даже если провайдер
+    сейчас недоступен. Возраст None — данных еще нет.
+    """
+    currencies = user_currencies() if currencies is None else currencies
+    stocks = user_stocks() if stocks is None else stocks
+    refresher = get_market_refresher()
+    rates = refresher.currency_client.cached()
+    quotes = refresher.quotes_client.cached(stocks)
+    return {
+        "currency_rates": [{"currency": c, "rate": rates[1][c]} for c in currencies if rates and c in rates[1]],
+        "stock_prices": [{"stock": s, "price": price} for s, (_, price) in quotes.items()],
+        "market_data_age": {
+            "currency_rates": _age(rates[0]) if rates else None,
+            "stock_prices": _age(min(at for at, _ in quotes.values())) if quotes else None,
+        },
     }
-    
-    prices = [{"stock": s, "price": test_prices[s]} for s in stocks]
-    try:
-      return json.dumps(prices)
-    except:
-        return json.dumps([])
 
-def summarize_expenses(df, start_date, end_date):
+def _category_amounts(amounts: pd.Series) -> List[CategoryAmount]:
+    """Перевод сумм по категориям (Series) в список {"category", "amount"}."""
+    return [
+        {"category": category, "amount": round(float(amount), 2)}
+        for category, amount in amounts.items()
+    ]
+
+def summarize_expenses(df: pd.DataFrame, start_date: DateLike, end_date: DateLike) -> ExpensesSummary:
     """Суммирование расходов по категориям."""
-    filtered = df[(df["Дата операции"] >= start_date) & (df["Дата операции"] <= end_date) & (df["Сумма операции"] < 0)]
-    grouped = filtered.groupby("Категория")["Сумма операции"].sum().reset_index()
-    grouped["Сумма операции"] = abs(grouped["Сумма операции"])
-    main_categories = grouped.nlargest(7, "Сумма операции").to_dict("records")
-    other_amount = grouped[~grouped["Категория"].isin([cat["Категория"] for cat in main_categories])]["Сумма операции"].sum()
+    expenses, _ = period_totals(df, start_date, end_date)
+    top = expenses.by_key.nlargest(7)
+    main_categories = _category_amounts(top)
+    other_amount = expenses.by_key.drop(top.index).sum()
     if other_amount > 0:
-        main_categories.append({"Категория": "Остальное", "Сумма операции": round(other_amount, 2)})
-    transfers_and_cash = filtered[filtered["Категория"].isin(["Наличные", "Переводы"])].groupby("Категория")["Сумма операции"].sum().reset_index()
-    transfers_and_cash["Сумма операции"] = -transfers_and_cash["Сумма операции"]
-    transfers_and_cash = transfers_and_cash.to_dict("records")
-    total_expenses = round(abs(filtered["Сумма операции"].sum()), 2)
+        main_categories.append({"category": "Остальное", "amount": round(float(other_amount), 2)})
+    transfers_and_cash = expenses.by_key[expenses.by_key.index.isin(["Наличные", "Переводы"])]
     return {
-        "total_amount": total_expenses,
+        "total_amount": round(expenses.total, 2),
         "main": main_categories,
-        "transfers_and_cash": transfers_and_cash
+        "transfers_and_cash": _category_amounts(transfers_and_cash)
     }
 
-def summarize_income(df, start_date, end_date):
+def summarize_income(df: pd.DataFrame, start_date: DateLike, end_date: DateLike) -> IncomeSummary:
     """Суммирование поступлений по категориям."""
-    filtered = df[(df["Дата операции"] >= start_date) & (df["Дата операции"] <= end_date) & (df["Сумма операции"] > 0)]
-    grouped = filtered.groupby("Категория")["Сумма операции"].sum().reset_index()
-    main_categories = grouped.nlargest(7, "Сумма операции").to_dict("records")
-    total_income = round(filtered["Сумма операции"].sum(), 2)
+    _, income = period_totals(df, start_date, end_date)
     return {
-        "total_amount": total_income,
-        "main": main_categories
+        "total_amount": round(income.total, 2),
+        "main": _category_amounts(income.by_key.nlargest(7))
     }
@@ -1,127 +1,150 @@
 import json
 from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Union
 
 import pandas as pd
 import pytest
 
+from src.dates import DateLike, parse_dates, sort_by_date
+from src.models import CategoryAmount, EventsPage, HomePage, Transaction
+from src.rollups import period_totals
+from src.store import get_store
 from src.utils import (
     get_card_summaries,
-    get_currency_rates,
     get_date_range,
     get_greeting,
-    get_stock_prices,
+    get_market_data,
+    get_period_bounds,
     get_top_transactions,
-    read_transactions,
+    month_to_date_summaries,
 )
 
+# Транзакции, переданные в представление: JSON-строка, список записей или DataFrame
+TransactionsData = Union[str, List[Transaction], pd.DataFrame]
 
-def home_view(timestamp, transactions_data=None):
-    current_time = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S") if isinstance(timestamp, str) else timestamp
-    
+
+def _load_transactions(transactions_data: Optional[TransactionsData] = None) -> pd.DataFrame:
+    """Транзакции из хранилища или из переданных данных.
+
+    transactions_data — JSON-строка, список записей или готовый DataFrame
+    транзакций (например, снимок хранилища).
+    """
     if transactions_data is None:
-        transactions = read_transactions("data/transactions.json")
-    else:
-        # Если transactions_data это строка, парсим её как JSON
-        if isinstance(transactions_data, str):
-            transactions_data = json.loads(transactions_data)
-        transactions = pd.DataFrame(transactions_data)
-        transactions['Дата операции'] = pd.to_datetime(transactions['Дата операции'])
+        return get_store().snapshot()
+    if isinstance(transactions_data, pd.DataFrame):
+        return transactions_data
+    # Если transactions_data это строка, парсим её как JSON
+    if isinstance(transactions_data, str):
+        transactions_data = json.loads(transactions_data)
+    transactions = pd.DataFrame(transactions_data)
+    transactions['Дата операции'] = parse_dates(transactions['Дата операции']).values
+    return sort_by_date(transactions)
+
+def _parse_timestamp(timestamp: DateLike) -> datetime:
+    return datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S") if isinstance(timestamp, str) else timestamp
+
+def home_view(timestamp: DateLike, transactions_data: Optional[TransactionsData] = None) -> HomePage:
+    current_time = _parse_timestamp(timestamp)
     
-    # Получаем даты в формате JSON
-    date_range = json.loads(get_date_range(current_time))
-    start_date = datetime.strptime(date_range["start_date"], "%Y-%m-%d %H:%M:%S")
-    end_date = datetime.strptime(date_range["end_date"], "%Y-%m-%d %H:%M:%S")
+    transactions = _load_transactions(transactions_data)
     
-    # Получаем все данные в формате JSON
-    greeting = json.loads(get_greeting(current_time))
+    start_date, end_date = get_period_bounds(current_time)
+    date_range = get_date_range(current_time)
+    greeting = get_greeting(current_time)
     
     # Получаем данные о картах и транзакциях
-    cards = json.loads(get_card_summaries(transactions, start_date, end_date))
-    top_transactions = json.loads(get_top_transactions(transactions, start_date, end_date))
-    currency_rates = json.loads(get_currency_rates())
-    stock_prices = json.loads(get_stock_prices())
+    cards = get_card_summaries(transactions, start_date, end_date)
+    top_transactions = get_top_transactions(transactions, start_date, end_date, n=5)
+    market = get_market_data()
     
-    # Возвращаем словарь вместо JSON-строки
     return {
         "greeting": greeting["greeting"],
         "date_range": date_range,
         "cards": cards,
         "top_transactions": top_transactions,
-        "currency_rates": currency_rates,
-        "stock_prices": stock_prices
+        "currency_rates": market["currency_rates"],
+        "stock_prices": market["stock_prices"],
+        "market_data_age": market["market_data_age"]
     }
 
-def events_view(timestamp, transactions_data=None):
-    current_time = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S") if isinstance(timestamp, str) else timestamp
-    
-    if transactions_data is None:
-        transactions = read_transactions("data/transactions.json")
-    else:
-        # Если transactions_data это строка, парсим её как JSON
-        if isinstance(transactions_data, str):
-            transactions_data = json.loads(transactions_data)
-        transactions = pd.DataFrame(transactions_data)
-        transactions['Дата операции'] = pd.to_datetime(transactions['Дата операции'])
-    
-    # Получаем даты в формате JSON
-    date_range = json.loads(get_date_range(current_time))
-    start_date = datetime.strptime(date_range["start_date"], "%Y-%m-%d %H:%M:%S")
-    end_date = datetime.strptime(date_range["end_date"], "%Y-%m-%d %H:%M:%S")
-    
-    filtered_transactions = transactions[
-        (transactions['Дата операции'] >= start_date) &
-        (transactions['Дата операции'] <= end_date)
-    ].copy()
+def home_view_batch(
+    timestamps: Iterable[DateLike], transactions_data: Optional[TransactionsData] = None
+) -> List[HomePage]:
+    """Главная страница для каждого момента из timestamps (в том же порядке).
+
+    Результат совпадает с вызовом home_view для каждого момента, но данные
+    загружаются один раз, а итоги с начала месяца накапливаются по
+    отсортированным моментам (см. month_to_date_summaries). Курсы валют и
+    цены акций читаются один раз на весь пакет.
+    """
+    times = [_parse_timestamp(timestamp) for timestamp in timestamps]
+    transactions = _load_transactions(transactions_data)
+    order = sorted(range(len(times)), key=lambda i: times[i])
+    summaries = month_to_date_summaries(transactions, [times[i] for i in order], n=5)
+    market = get_market_data()
+
+    pages: Dict[int, HomePage] = {}
+    for i, (cards, top_transactions) in zip(order, summaries):
+        pages[i] = {
+            "greeting": get_greeting(times[i])["greeting"],
+            "date_range": get_date_range(times[i]),
+            "cards": cards,
+            "top_transactions": top_transactions,
+            "currency_rates": list(market["currency_rates"]),
+            "stock_prices": list(market["stock_prices"]),
+            "market_data_age": market["market_data_age"].copy()
+        }
+    return [pages[i] for i in range(len(times))]
+
+def events_view(
+    timestamp: DateLike, transactions_data: Optional[TransactionsData] = None, period: str = "M"
+) -> EventsPage:
+    current_time = _parse_timestamp(timestamp)
     
-    expenses = filtered_transactions[filtered_transactions['Сумма операции'] < 0]
-    income = filtered_transactions[filtered_transactions['Сумма операции'] > 0]
+    transactions = _load_transactions(transactions_data)
     
-    # Группируем расходы по категориям
-    expenses_by_category = expenses.groupby('Категория')['Сумма операции'].sum().abs()
+    start_date, end_date = get_period_bounds(current_time, period)
+    expenses, income = period_totals(transactions, start_date, end_date)
     
     # Получаем топ-5 категорий расходов
-    top_expenses = expenses_by_category.sort_values(ascending=False)
+    top_expenses = expenses.by_key.sort_values(ascending=False, kind='stable')
     other_expenses = pd.Series({'Остальное': top_expenses[5:].sum()}) if len(top_expenses) > 5 else pd.Series({'Остальное': 0.0})
     main_expenses = pd.concat([top_expenses[:5], other_expenses])
     
-    # Группируем переводы и наличные
-    transfers_and_cash = expenses[expenses['Категория'].isin(['Переводы', 'Наличные'])].groupby('Категория')['Сумма операции'].sum().abs()
-    if 'Остальное' not in transfers_and_cash:
-        transfers_and_cash['Остальное'] = 0.0
-    
-    # Группируем доходы по категориям
-    income_by_category = income.groupby('Категория')['Сумма операции'].sum()
+    # Переводы и наличные
+    transfers_and_cash = top_expenses[top_expenses.index.isin(['Переводы', 'Наличные'])]
+    transfers_and_cash = pd.concat([transfers_and_cash, pd.Series({'Остальное': 0.0})])
     
     # Если нет доходов, добавляем категорию "Остальное" с нулевой суммой
-    income_categories = []
-    if len(income_by_category) > 0:
-        for cat, amt in income_by_category.sort_values(ascending=False).items():
+    income_categories: List[CategoryAmount] = []
+    if len(income.by_key) > 0:
+        for cat, amt in income.by_key.sort_values(ascending=False, kind='stable').items():
             income_categories.append({"category": cat, "amount": round(float(amt), 2)})
     else:
         income_categories = [{"category": "Остальное", "amount": 0}]
     
-    currency_rates = json.loads(get_currency_rates())
-    stock_prices = json.loads(get_stock_prices())
+    market = get_market_data()
     
     # Формируем ответ в соответствии с тестами
     return {
         "expenses": {
-            "total_amount": round(abs(expenses['Сумма операции'].sum()), 2),
+            "total_amount": round(expenses.total, 2),
             "main": [
                 {"category": cat, "amount": round(float(amt), 2)} 
                 for cat, amt in main_expenses.items()
             ],
             "transfers_and_cash": [
                 {"category": cat, "amount": round(float(amt), 2)}
-                for cat, amt in transfers_and_cash.sort_values(ascending=False).items()
+                for cat, amt in transfers_and_cash.items()
             ]
         },
         "income": {
-            "total_amount": round(income['Сумма операции'].sum(), 2),
+            "total_amount": round(income.total, 2),
             "main": income_categories
         },
-        "currency_rates": currency_rates,
-        "stock_prices": stock_prices
+        "currency_rates": market["currency_rates"],
+        "stock_prices": market["stock_prices"],
+        "market_data_age": market["market_data_age"]
     }
 
 @pytest.fixture
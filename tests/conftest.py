@@ -4,6 +4,20 @@ from unittest.mock import MagicMock
 import pandas as pd
 import pytest
 
+import src.market
+from src.market import AlphaVantageProvider, CurrencyRatesClient, StockQuotesClient
+
+
+@pytest.fixture(autouse=True)
+def offline_market_data(monkeypatch, tmp_path):
+    """Тесты не обращаются к настоящим провайдерам рыночных данных и к их кешу на диске."""
+    monkeypatch.setattr(src.market, "_currency_client", CurrencyRatesClient(
+        url=None, cache_path=str(tmp_path / "market" / "currency_rates.json")))
+    monkeypatch.setattr(src.market, "_quotes_client", StockQuotesClient(
+        provider=AlphaVantageProvider(url=None), cache_path=str(tmp_path / "market" / "stock_quotes.json")))
+    monkeypatch.setattr(src.market, "_refresher", None)
+    monkeypatch.setattr(src.market, "_user_settings", None)
+
 
 @pytest.fixture
 def sample_transactions():
@@ -0,0 +1,122 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.cache import load_cached
+from src.utils import _parse_transactions, read_transactions
+
+
+@pytest.fixture
+def transactions_file(tmp_path):
+    data = [
+        {
+            "Дата операции": "2023-10-01",
+            "Номер карты": "1234567890123456",
+            "Сумма операции": -1262.00,
+            "Кешбэк": 12.62,
+            "Категория": "Супермаркеты",
+            "Описание": "Лента"
+        },
+        {
+            "Дата операции": "2023-10-15",
+            "Номер карты": None,
+            "Сумма операции": -1198.23,
+            "Кешбэк": 11.98,
+            "Категория": "Переводы",
+            "Описание": "Перевод"
+        }
+    ]
+    path = tmp_path / "transactions.json"
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def counting_loader():
+    calls = []
+
+    def loader(file_path):
+        calls.append(file_path)
+        return _parse_transactions(file_path)
+
+    loader.calls = calls
+    return loader
+
+
+def test_load_cached_roundtrip(transactions_file, counting_loader, tmp_path):
+    cache_dir = tmp_path / "cache"
+    cold = load_cached(str(transactions_file), counting_loader, cache_dir=str(cache_dir))
+    warm = load_cached(str(transactions_file), counting_loader, cache_dir=str(cache_dir))
+
+    assert len(counting_loader.calls) == 1
+    pd.testing.assert_frame_equal(warm, cold)
+    assert pd.isna(warm.loc[1, "Номер карты"])
+
+
+def test_load_cached_is_memory_mapped(transactions_file, counting_loader, tmp_path):
+    cache_dir = tmp_path / "cache"
+    load_cached(str(transactions_file), counting_loader, cache_dir=str(cache_dir))
+    warm = load_cached(str(transactions_file), counting_loader, cache_dir=str(cache_dir))
+    # Колонки не скопированы в общий блок, а остаются отображенными в память
+    base = warm["Сумма операции"].to_numpy()
+    while base is not None and not isinstance(base, np.memmap):
+        base = base.base
+    assert isinstance(base, np.memmap)
+
+
+def test_load_cached_rebuilds_missing_column(transactions_file, counting_loader, tmp_path):
+    cache_dir = tmp_path / "cache"
+    cold = load_cached(str(transactions_file), counting_loader, cache_dir=str(cache_dir))
+    [data_dir] = [path for path in cache_dir.rglob("*") if path.is_dir() and list(path.glob("*.npy"))]
+    next(data_dir.glob("*.npy")).unlink()
+
+    rebuilt = load_cached(str(transactions_file), counting_loader, cache_dir=str(cache_dir))
+    assert len(counting_loader.calls) == 2
+    pd.testing.assert_frame_equal(rebuilt, cold)
+
+
+def test_load_cached_touch_without_changes(transactions_file, counting_loader, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    load_cached(str(transactions_file), counting_loader, cache_dir=cache_dir)
+    stat = os.stat(transactions_file)
+    os.utime(transactions_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    load_cached(str(transactions_file), counting_loader, cache_dir=cache_dir)
+    assert len(counting_loader.calls) == 1
+
+
+def test_load_cached_rebuilds_on_change(transactions_file, counting_loader, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    load_cached(str(transactions_file), counting_loader, cache_dir=cache_dir)
+
+    data = json.loads(transactions_file.read_text(encoding="utf-8"))
+    data[0]["Сумма операции"] = -100.0
+    transactions_file.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+    df = load_cached(str(transactions_file), counting_loader, cache_dir=cache_dir)
+    assert len(counting_loader.calls) == 2
+    assert df.loc[0, "Сумма операции"] == -10000
+
+
+def test_load_cached_column_types(tmp_path):
+    df = pd.DataFrame({
+        "date": pd.to_datetime(["2023-10-01 12:00:00", "2023-10-02 13:30:00"]),
+        "category": pd.Categorical(["a", "b"]),
+        "mcc": pd.array([5411, None], dtype="Int16"),
+        "amount": np.array([-126200, 100], dtype=np.int64),
+    })
+    source = tmp_path / "source.bin"
+    source.write_bytes(b"source")
+
+    load_cached(str(source), lambda _: df, cache_dir=str(tmp_path / "cache"))
+    result = load_cached(str(source), lambda _: pytest.fail("кеш не использован"), cache_dir=str(tmp_path / "cache"))
+    pd.testing.assert_frame_equal(result, df)
+
+
+def test_read_transactions_without_cache(transactions_file):
+    df = read_transactions(str(transactions_file), use_cache=False)
+    assert len(df) == 2
+    assert pd.api.types.is_datetime64_dtype(df["Дата операции"])
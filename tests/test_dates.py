@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.dates import (
+    detect_formats,
+    is_sorted_by_date,
+    parse_dates,
+    parse_transaction_dates,
+    slice_by_period,
+    sort_by_date,
+)
+
+
+@pytest.mark.parametrize("values,expected", [
+    (["31.12.2021 16:44:00", "01.02.2021 10:00:00"], ["%d.%m.%Y %H:%M:%S"]),
+    (["31.12.2021", "01.02.2021"], ["%d.%m.%Y"]),
+    (["2023-10-01", "2023-10-15"], ["%Y-%m-%d"]),
+    (["2023-10-01 12:00:00", "2023-10-15"], ["%Y-%m-%d %H:%M:%S", "%Y-%m-%d"]),
+])
+def test_detect_formats(values, expected):
+    assert detect_formats(values) == expected
+
+
+def test_parse_dates_day_first():
+    result = parse_dates(pd.Series(["01.02.2021 10:00:00", "12.01.2021 09:30:00"]))
+    assert result.values.tolist() == [pd.Timestamp("2021-02-01 10:00:00"), pd.Timestamp("2021-01-12 09:30:00")]
+    assert len(result.invalid) == 0
+
+
+def test_parse_dates_reports_invalid_rows():
+    result = parse_dates(pd.Series(["31.12.2021 16:44:00", "invalid_date", None, "31.12.2021 16:44:00"]))
+    assert list(result.invalid) == [1]
+    assert result.values.isna().tolist() == [False, True, True, False]
+    assert result.values[0] == result.values[3]
+
+
+def test_parse_dates_keeps_datetime_column():
+    values = pd.to_datetime(pd.Series(["2023-10-01", "2023-10-02"]))
+    result = parse_dates(values)
+    pd.testing.assert_series_equal(result.values, values)
+
+
+def test_parse_transaction_dates():
+    df = pd.DataFrame({
+        "Дата операции": ["31.12.2021 16:44:00", "30.12.2021 10:00:00"],
+        "Дата платежа": ["31.12.2021", "не дата"],
+    })
+    report = parse_transaction_dates(df)
+    assert df["Дата платежа"][0] == pd.Timestamp("2021-12-31")
+    assert list(report) == ["Дата платежа"]
+    assert list(report["Дата платежа"]) == [1]
+
+
+@pytest.fixture
+def unsorted_transactions():
+    return pd.DataFrame({
+        "Дата операции": pd.to_datetime(
+            ["2023-10-15 14:30:00", "2023-09-20 00:00:00", None, "2023-10-01 00:00:00",
+             "2023-10-31 23:59:59", "2023-10-01 00:00:00"]
+        ),
+        "Сумма операции": [-1.0, -2.0, -3.0, -4.0, -5.0, -6.0],
+    })
+
+
+@pytest.mark.parametrize("start_date,end_date", [
+    ("2023-10-01", "2023-10-15 14:30:00"),
+    ("2023-10-02", "2023-10-31"),
+    ("2023-01-01", "2023-12-31"),
+    ("2024-01-01", "2024-12-31"),
+])
+def test_slice_by_period_matches_mask(unsorted_transactions, start_date, end_date):
+    sorted_df = sort_by_date(unsorted_transactions)
+    expected = unsorted_transactions[
+        (unsorted_transactions["Дата операции"] >= start_date) &
+        (unsorted_transactions["Дата операции"] <= end_date)
+    ]
+    result = slice_by_period(sorted_df, start_date, end_date)
+    assert sorted(result["Сумма операции"]) == sorted(expected["Сумма операции"])
+    assert sorted(slice_by_period(unsorted_transactions, start_date, end_date)["Сумма операции"]) == \
+        sorted(expected["Сумма операции"])
+
+
+def test_slice_by_period_returns_view(unsorted_transactions):
+    sorted_df = sort_by_date(unsorted_transactions)
+    result = slice_by_period(sorted_df, "2023-10-01", "2023-10-31")
+    assert np.shares_memory(result["Сумма операции"].to_numpy(), sorted_df["Сумма операции"].to_numpy())
+
+
+def test_slice_by_period_after_concat(unsorted_transactions):
+    sorted_df = sort_by_date(unsorted_transactions)
+    combined = pd.concat([sorted_df, sorted_df.iloc[:1]], ignore_index=True)
+    result = slice_by_period(combined, "2023-09-20", "2023-09-20")
+    assert len(result) == 2
+
+
+def test_slice_by_period_after_reorder(unsorted_transactions):
+    # Перестановка строк той же длины сохраняет attrs, но не порядок дат
+    reordered = sort_by_date(unsorted_transactions).sort_values("Сумма операции")
+    assert not is_sorted_by_date(reordered) and is_sorted_by_date(sort_by_date(reordered))
+    result = slice_by_period(reordered, "2023-10-01", "2023-10-15 14:30:00")
+    assert sorted(result["Сумма операции"]) == [-6.0, -4.0, -1.0]
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.fx import (
+    CURRENCY_ATTR,
+    ORIGINAL_CURRENCY_COLUMN,
+    UNCONVERTED_ATTR,
+    FxTable,
+    fx_table,
+    to_reporting_currency,
+)
+from src.rollups import totals_index
+from src.schema import ORIGINAL_AMOUNT_COLUMN, apply_schema, with_rubles
+
+
+@pytest.fixture
+def export_frame():
+    return apply_schema(pd.DataFrame({
+        "Дата операции": pd.to_datetime([
+            "2021-08-30 21:24:30", "2021-09-01 10:00:00", "2021-09-02 12:00:00", "2021-09-03 09:00:00",
+        ]),
+        "Сумма операции": [-8.61, -500.00, -10.00, -2.00],
+        "Валюта операции": ["USD", "RUB", "CNY", "TRY"],
+        "Сумма платежа": [-648.76, -500.00, -10.00, -2.00],
+        "Валюта платежа": ["RUB", "RUB", "CNY", "TRY"],
+        "Категория": ["Образование", "Супермаркеты", "Рестораны", "Рестораны"],
+    }))
+
+
+@pytest.fixture
+def table():
+    return FxTable(pd.DataFrame({
+        "date": pd.to_datetime(["2021-08-01", "2021-09-02", "2021-08-01"]),
+        "currency": ["CNY", "CNY", "USD"],
+        "rate": [11.0, 11.5, 75.0],
+    }))
+
+
+def test_fx_table_rates(table):
+    dates = pd.to_datetime(["2021-07-01", "2021-08-15", "2021-09-02 23:59:00", "2021-09-10", "2021-09-10"],
+                           format="mixed")
+    rates = table.rates(["CNY", "CNY", "CNY", "CNY", "RUB"], dates)
+    # До первого известного дня — первый курс, дальше — последний известный
+    assert rates.tolist() == [11.0, 11.0, 11.5, 11.5, 1.0]
+    assert np.isnan(table.rates(["TRY"], dates[:1])).all()
+
+
+def test_fx_table_cross_rate(table):
+    converted = table.convert([150.0], ["USD"], pd.to_datetime(["2021-09-05"]), "CNY")
+    assert converted.tolist() == pytest.approx([150.0 * 75.0 / 11.5])
+
+
+def test_fx_table_implied(export_frame):
+    implied = FxTable.implied(with_rubles(export_frame))
+    assert implied.currencies == {"RUB", "USD"}
+    assert implied.rates(["USD"], pd.to_datetime(["2021-08-30"]))[0] == pytest.approx(648.76 / 8.61)
+
+
+def test_fx_table_from_csv(tmp_path, export_frame):
+    path = tmp_path / "fx_rates.csv"
+    path.write_text("date,currency,rate\n2021-08-30,USD,70.0\n2021-01-01,CNY,11.0\n", encoding="utf-8")
+    table = fx_table(export_frame, path=str(path))
+    # Локальная таблица важнее курсов из выгрузки
+    assert table.rates(["USD", "CNY"], pd.to_datetime(["2021-08-30", "2021-09-01"])).tolist() == [70.0, 11.0]
+    assert fx_table(path=str(tmp_path / "missing.csv")).currencies == {"RUB"}
+
+
+def test_to_reporting_currency(export_frame, table):
+    df = to_reporting_currency(export_frame, "RUB", table=table)
+    # USD оплачена в рублях, CNY пересчитана по таблице, для TRY курса нет: суммы нет, валюта исходная
+    assert df["Сумма операции"].tolist()[:3] == [-64876, -50000, -11500] and pd.isna(df["Сумма операции"][3])
+    assert df["Валюта операции"].tolist() == ["RUB", "RUB", "RUB", "TRY"]
+    assert df.attrs[UNCONVERTED_ATTR] == 1
+    assert df[ORIGINAL_AMOUNT_COLUMN].tolist() == [-861, -50000, -1000, -200]
+    assert df[ORIGINAL_CURRENCY_COLUMN].tolist() == ["USD", "RUB", "CNY", "TRY"]
+    assert df.attrs[CURRENCY_ATTR] == "RUB"
+    assert export_frame["Сумма операции"].tolist() == [-861, -50000, -1000, -200]
+
+    expenses, _ = totals_index(df).query(pd.Timestamp("2021-08-01"), pd.Timestamp("2021-09-30"))
+    # Лиры не складываются с рублями
+    assert expenses.by_key.to_dict() == pytest.approx(
+        {"Образование": 648.76, "Рестораны": 115.0, "Супермаркеты": 500.0}
+    )
+    assert with_rubles(df)[ORIGINAL_AMOUNT_COLUMN].tolist() == [-8.61, -500.0, -10.0, -2.0]
+
+
+def test_to_reporting_currency_other_currency(export_frame, table):
+    df = to_reporting_currency(with_rubles(export_frame), "USD", table=table)
+    assert df["Сумма операции"].tolist()[:3] == [-8.61, round(-500 / 75, 2), round(-10 * 11.5 / 75, 2)]
+    assert np.isnan(df["Сумма операции"][3])
+
+
+def test_to_reporting_currency_single_currency(export_frame):
+    rubles = export_frame[export_frame["Валюта операции"] == "RUB"]
+    df = to_reporting_currency(rubles, "RUB")
+    assert df["Сумма операции"].tolist() == [-50000]
+    assert "Валюта операции" not in to_reporting_currency(rubles.drop(columns="Валюта операции")).columns
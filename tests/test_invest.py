@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.dates import sort_by_date
+from src.invest import export_matches, investment_savings, round_ups
+from src.schema import apply_schema
+
+
+@pytest.fixture
+def transactions():
+    return apply_schema(sort_by_date(pd.DataFrame({
+        "Дата операции": pd.to_datetime([
+            "2023-08-31 23:59:59", "2023-10-01 10:00:00", "2023-10-10 12:00:00", "2023-10-15 14:30:00",
+            "2023-10-20 18:00:00", "2023-10-25 09:00:00", None,
+        ]),
+        "Статус": ["OK", "OK", "OK", "FAILED", "OK", "OK", "OK"],
+        "Сумма операции": [-49.99, -1262.00, -7.94, -100.50, 15000.00, -400.00, -1.00],
+    })))
+
+
+def test_round_ups():
+    # Сумма, кратная шагу, не округляется
+    assert round_ups(np.array([126200, 794, 40000]), [10, 50]).tolist() == [[800, 3800], [206, 4206], [0, 0]]
+
+
+def test_investment_savings(transactions):
+    result = investment_savings(transactions, [10, 50, 100])
+    # Месяцы без расходов — нули; неуспешные операции, поступления и операции без даты не округляются
+    assert result.index.tolist() == ["2023-08", "2023-09", "2023-10"]
+    assert result.columns.tolist() == [10, 50, 100]
+    assert result.to_numpy().tolist() == [[0.01, 0.01, 50.01], [0.0, 0.0, 0.0], [10.06, 80.06, 130.06]]
+
+
+def test_investment_savings_range(transactions):
+    result = investment_savings(transactions, [50], "2023-09", "2023-11")
+    assert result[50].to_dict() == {"2023-09": 0.0, "2023-10": 80.06, "2023-11": 0.0}
+    # Записи с датами-строками и суммами в рублях дают то же
+    records = [
+        {"Дата операции": "2023-10-01", "Сумма операции": -1262.0},
+        {"Дата операции": "2023-10-10", "Сумма операции": -7.94},
+    ]
+    assert investment_savings(records, [50], "2023-10", "2023-10").iloc[0, 0] == 80.06
+    with pytest.raises(ValueError):
+        investment_savings(transactions, [0])
+
+
+def test_export_matches():
+    # Операции из выгрузки банка: в июле 2020 копилка округляла до 50 ₽, с августа — до 100 ₽
+    export = apply_schema(pd.DataFrame({
+        "Дата операции": pd.to_datetime([
+            "2020-07-23", "2020-08-11", "2020-08-31", "2020-09-05", "2020-09-11", "2020-09-12",
+        ]),
+        "Сумма операции": [-22.0, -115.0, -50.0, -119.0, -1075.0, -141.0],
+        "Округление на инвесткопилку": [28, 85, 50, 81, 25, 0],
+    }))
+    result = export_matches(export)
+    assert result.index.tolist() == ["2020-07", "2020-08", "2020-09"]
+    assert result.to_numpy().tolist() == [[False, True, False], [False, False, True], [False, False, True]]
@@ -0,0 +1,346 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import pytest
+import requests
+
+import src.market
+from src.market import (
+    AlphaVantageProvider,
+    CircuitBreaker,
+    CurrencyRatesClient,
+    MarketDataRefresher,
+    SingleFlight,
+    StockQuotesClient,
+    load_user_settings,
+    user_currencies,
+    user_stocks,
+)
+from src.utils import get_currency_rates, get_market_data, get_stock_prices
+
+
+class StubProvider:
+    """Локальный HTTP-сервер вместо провайдера рыночных данных."""
+
+    def __init__(self):
+        self.requests = []
+        self.status = 200
+        self.payload = {"base": "RUB", "rates": {"RUB": 1.0, "USD": 0.0125, "EUR": 0.01}}
+        self.delay = 0.0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests.append((self.path, dict(self.headers)))
+                time.sleep(stub.delay)
+                payload = stub.payload
+                if callable(payload):
+                    payload = payload(dict(parse_qsl(urlsplit(self.path).query)))
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(stub.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def provider():
+    stub = StubProvider()
+    yield stub
+    stub.close()
+
+
+@pytest.fixture
+def make_client(provider, tmp_path):
+    def make(**kwargs):
+        kwargs.setdefault("cache_path", str(tmp_path / "currency_rates.json"))
+        return CurrencyRatesClient(url=provider.url + "/latest/RUB", api_key="secret", **kwargs)
+
+    return make
+
+
+def test_currency_rates_in_rubles(provider, make_client):
+    assert make_client().rates() == {"RUB": 1.0, "USD": 80.0, "EUR": 100.0}
+    assert provider.requests[0][0] == "/latest/RUB"
+    assert provider.requests[0][1]["apikey"] == "secret"
+
+
+def test_currency_rates_other_base(provider, make_client):
+    provider.payload = {"base": "USD", "rates": {"USD": 1.0, "RUB": 90.0, "EUR": 0.9}}
+    assert make_client().rates() == {"USD": 90.0, "RUB": 1.0, "EUR": 100.0}
+
+
+def test_currency_rates_persistent_cache(provider, make_client):
+    make_client().rates()
+    # Новый клиент (например, после перезапуска) читает курсы с диска
+    assert make_client().rates()["USD"] == 80.0
+    assert len(provider.requests) == 1
+
+    make_client(ttl=0).rates()
+    assert len(provider.requests) == 2
+
+
+def test_currency_rates_single_flight(provider, make_client):
+    provider.delay = 0.2
+    client = make_client()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(client.rates())) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(provider.requests) == 1
+    assert len(results) == 10
+    assert all(result["USD"] == 80.0 for result in results)
+
+
+def test_currency_rates_stale_on_failure(provider, make_client):
+    make_client().rates()
+    provider.status = 500
+    assert make_client(ttl=0).rates()["USD"] == 80.0
+    assert len(provider.requests) == 2
+
+
+def test_currency_rates_failure_without_cache(provider, make_client):
+    provider.status = 503
+    with pytest.raises(requests.HTTPError):
+        make_client().rates()
+
+
+def test_get_currency_rates(provider, make_client, monkeypatch, tmp_path):
+    monkeypatch.setattr(src.market, "_currency_client", make_client())
+    assert get_currency_rates(["USD", "EUR", "XXX"]) == [
+        {"currency": "USD", "rate": 80.0},
+        {"currency": "EUR", "rate": 100.0},
+    ]
+
+    provider.status = 500
+    monkeypatch.setattr(src.market, "_currency_client", make_client(cache_path=str(tmp_path / "empty.json")))
+    assert get_currency_rates() == []
+
+
+def test_single_flight_propagates_errors():
+    flight = SingleFlight()
+    with pytest.raises(ZeroDivisionError):
+        flight.do("key", lambda: 1 / 0)
+    assert flight.do("key", lambda: 42) == 42
+
+
+def stock_quotes(query):
+    """Ответ Alpha Vantage: цена бумаги — длина тикера * 10."""
+    if query["function"] == "REALTIME_BULK_QUOTES":
+        symbols = query["symbol"].split(",")
+        return {"data": [{"symbol": symbol, "close": str(len(symbol) * 10.0)} for symbol in symbols]}
+    if query["symbol"] == "NONE":
+        return {"Global Quote": {}}
+    return {"Global Quote": {"01. symbol": query["symbol"], "05. price": str(len(query["symbol"]) * 10.0)}}
+
+
+@pytest.fixture
+def make_quotes_client(provider, tmp_path):
+    provider.payload = stock_quotes
+
+    def make(bulk=False, **kwargs):
+        kwargs.setdefault("cache_path", str(tmp_path / "stock_quotes.json"))
+        return StockQuotesClient(provider=AlphaVantageProvider(url=provider.url, api_key="key", bulk=bulk), **kwargs)
+
+    return make
+
+
+def test_stock_quotes_deduplicated(provider, make_quotes_client):
+    quotes = make_quotes_client().quotes(["aapl", "AAPL", " msft ", "NONE"])
+    assert quotes == {"AAPL": 40.0, "MSFT": 40.0}
+    assert len(provider.requests) == 3
+    assert all("apikey=key" in path for path, _ in provider.requests)
+
+
+def test_stock_quotes_bulk_endpoint(provider, make_quotes_client):
+    tickers = [f"T{i:03d}" for i in range(150)]
+    quotes = make_quotes_client(bulk=True).quotes(tickers)
+    assert len(quotes) == 150
+    assert len(provider.requests) == 2
+
+
+def test_stock_quotes_fetched_concurrently(provider, make_quotes_client):
+    provider.delay = 0.2
+    start = time.perf_counter()
+    quotes = make_quotes_client(max_workers=8).quotes(["A", "B", "C", "D", "E", "F", "G", "H"])
+    assert len(quotes) == 8
+    assert time.perf_counter() - start < 0.8
+
+
+def test_stock_quotes_cache(provider, make_quotes_client):
+    make_quotes_client().quotes(["AAPL", "MSFT"])
+    # Котировки с диска; запрашивается только новая бумага
+    assert make_quotes_client().quotes(["AAPL", "MSFT", "TSLA"]) == {"AAPL": 40.0, "MSFT": 40.0, "TSLA": 40.0}
+    assert len(provider.requests) == 3
+
+    make_quotes_client(ttl=0).quotes(["AAPL"])
+    assert len(provider.requests) == 4
+
+
+def test_stock_quotes_shared_between_callers(provider, make_quotes_client):
+    provider.delay = 0.2
+    client = make_quotes_client()
+    portfolios = {"anna": ["AAPL", "MSFT"], "boris": ["msft", "TSLA"]}
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(client.portfolio_quotes(portfolios))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(provider.requests) == 3
+    assert results == [{"anna": {"AAPL": 40.0, "MSFT": 40.0}, "boris": {"MSFT": 40.0, "TSLA": 40.0}}] * 5
+
+
+def test_stock_quotes_stale_on_failure(provider, make_quotes_client):
+    make_quotes_client().quotes(["AAPL"])
+    provider.status = 500
+    assert make_quotes_client(ttl=0).quotes(["AAPL", "MSFT"]) == {"AAPL": 40.0}
+
+
+def test_get_stock_prices(make_quotes_client, monkeypatch):
+    monkeypatch.setattr(src.market, "_quotes_client", make_quotes_client())
+    assert get_stock_prices(["AAPL", "GOOGL"]) == [{"stock": "AAPL", "price": 40.0}, {"stock": "GOOGL", "price": 50.0}]
+
+
+def test_load_user_settings(tmp_path):
+    path = tmp_path / "user_settings.json"
+    path.write_text(json.dumps({"user_currencies": ["USD"], "user_stocks": ["AAPL"]}), encoding="utf-8")
+    assert load_user_settings(str(path)) == {"user_currencies": ["USD"], "user_stocks": ["AAPL"]}
+    assert load_user_settings(str(tmp_path / "missing.json")) == {}
+
+
+def test_user_settings_read_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(src.market, "load_user_settings", lambda: calls.append(1) or {"user_stocks": ["AAPL"]})
+    assert user_stocks() == ["AAPL"] and user_stocks() == ["AAPL"]
+    assert user_currencies() == ["USD", "EUR"]
+    assert calls == [1]
+
+
+def test_stock_quotes_shared_between_processes(provider, make_quotes_client):
+    first, second = make_quotes_client(), make_quotes_client()
+    first.quotes(["AAPL"])
+    # Второй клиент (другой процесс) видит котировку, сохраненную первым
+    assert second.quotes(["AAPL"]) == {"AAPL": 40.0}
+    assert len(provider.requests) == 1
+
+
+def test_circuit_breaker():
+    now = [0.0]
+    breaker = CircuitBreaker(threshold=2, timeout=10, max_timeout=25, clock=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    now[0] = 10.0
+    assert breaker.state == "half-open" and breaker.allow()
+    # Пробное обращение неудачно: пауза удваивается
+    breaker.record_failure()
+    now[0] = 29.0
+    assert not breaker.allow()
+    now[0] = 30.0
+    breaker.record_failure()
+    now[0] = 54.0
+    assert not breaker.allow()
+    now[0] = 55.0
+    assert breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+@pytest.fixture
+def refresher(provider, make_client, make_quotes_client):
+    def route(query):
+        return stock_quotes(query) if "function" in query else {"base": "RUB", "rates": {"USD": 0.0125}}
+
+    refresher = MarketDataRefresher(interval=0.05, stocks=lambda: ["AAPL"], currency_client=make_client(),
+                                    quotes_client=make_quotes_client())
+    provider.payload = route
+    yield refresher
+    refresher.stop()
+
+
+def test_refresher_keeps_data_warm(provider, refresher, monkeypatch):
+    monkeypatch.setattr(src.market, "_refresher", refresher)
+    refresher.start()
+    # Запрос фиксируется провайдером до ответа, поэтому ждем, пока клиенты сохранят значения
+    deadline = time.time() + 2
+    while time.time() < deadline and not (
+        refresher.currency_client.cached() and refresher.quotes_client.cached(["AAPL"])
+    ):
+        time.sleep(0.01)
+
+    market = get_market_data(["USD"], ["AAPL"])
+    assert market["currency_rates"] == [{"currency": "USD", "rate": 80.0}]
+    assert market["stock_prices"] == [{"stock": "AAPL", "price": 40.0}]
+    assert 0 <= market["market_data_age"]["currency_rates"] < 2
+    # Значения свежие: повторных обращений к провайдерам нет
+    time.sleep(0.2)
+    assert len(provider.requests) == 2
+
+
+def test_refresher_serves_stale_data(provider, refresher, monkeypatch):
+    monkeypatch.setattr(src.market, "_refresher", refresher)
+    refresher.refresh()
+    refresher.currency_client.ttl = refresher.quotes_client.ttl = 0
+    provider.status = 500
+    provider.delay = 0.3
+
+    refresher.start()
+    time.sleep(0.1)
+    start = time.perf_counter()
+    market = get_market_data(["USD"], ["AAPL"])
+    # Страница не ждет провайдера и получает последние удачно полученные данные
+    assert time.perf_counter() - start < 0.1
+    assert market["currency_rates"] == [{"currency": "USD", "rate": 80.0}]
+    assert market["stock_prices"] == [{"stock": "AAPL", "price": 40.0}]
+    assert market["market_data_age"]["stock_prices"] >= 0
+
+
+def test_market_data_does_not_call_providers(provider, refresher, monkeypatch):
+    # Фоновое обновление не запущено в этом процессе: страница все равно не ждет провайдеров
+    monkeypatch.setattr(src.market, "_refresher", refresher)
+    provider.delay = 0.3
+    start = time.perf_counter()
+    market = get_market_data(["USD"], ["AAPL"])
+    assert time.perf_counter() - start < 0.1
+    assert provider.requests == []
+    assert market["market_data_age"] == {"currency_rates": None, "stock_prices": None}
+
+
+def test_refresher_backs_off(provider, refresher):
+    provider.status = 500
+    for _ in range(10):
+        refresher.refresh()
+    # После трех ошибок подряд цепь размыкается
+    assert len(provider.requests) == 6
+    assert refresher.status()["currency_rates"] == {"state": "open", "failures": 3}
+
+
+def test_market_data_without_data():
+    assert get_market_data(["USD"], ["AAPL"]) == {
+        "currency_rates": [],
+        "stock_prices": [],
+        "market_data_age": {"currency_rates": None, "stock_prices": None},
+    }
@@ -0,0 +1,70 @@
+import json
+
+import pandas as pd
+import pytest
+
+from src.phones import PHONE_COLUMN, PhoneIndex, extract_phones, normalize_phone, normalize_phone_prefix
+from src.services import search_phone_numbers
+from src.utils import read_transactions
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("МТС Mobile +7 981 333-44-55", "+79813334455"),
+    # Неполный номер из выгрузки — не E.164, хранится в исходном виде
+    ("Я МТС +7 921 11-22-33", "+7 921 11-22-33"),
+    ("Звонок 8 (921) 111-22-33", "+79211112233"),
+    ("+79211112233", "+79211112233"),
+    ("Билайн 8-962-717-08-52", "+79627170852"),
+    ("Лента", None),
+    ("Заказ 1289211112233", None),
+    ("договор 81234567890", None),
+    ("8 921 1112233", "+79211112233"),
+])
+def test_normalize_phone(text, expected):
+    assert normalize_phone(text) == expected
+
+
+def test_normalize_phone_prefix():
+    assert normalize_phone_prefix("8 921") == "+7921"
+    assert normalize_phone_prefix("+7 (921") == "+7921"
+
+
+def test_extract_phones():
+    descriptions = pd.Series(["МТС +7 911 000-09-09", "Лента", None, "МТС +7 911 000-09-09"], dtype="category")
+    phones = extract_phones(descriptions)
+    assert isinstance(phones.dtype, pd.CategoricalDtype)
+    assert phones.tolist()[::3] == ["+79110000909", "+79110000909"]
+    assert phones.isna().tolist() == [False, True, True, False]
+
+
+@pytest.fixture
+def index():
+    return PhoneIndex(extract_phones([
+        "МТС +7 981 555-55-55", "Лента", "МегаФон +7 921 333-33-33", "МТС +7 981 555-55-55", "Билайн +7 962 717-08-52",
+    ]))
+
+
+def test_phone_index(index):
+    assert index.search().tolist() == [0, 2, 3, 4]
+    assert index.search(number="8 981 555 55 55").tolist() == [0, 3]
+    assert index.search(number="+7 981 555-55-56").tolist() == []
+    assert index.search(prefix="+798").tolist() == [0, 3]
+    assert index.search(prefix="89").tolist() == [0, 2, 3, 4]
+    assert index.search(prefix="+7999").tolist() == []
+
+
+def test_phones_extracted_at_ingestion(tmp_path):
+    path = tmp_path / "transactions.json"
+    path.write_text(json.dumps([
+        {"Дата операции": "2023-10-05", "Сумма операции": -100.0, "Категория": "Мобильная связь",
+         "Описание": "Я МТС +7 921 11-22-33"},
+        {"Дата операции": "2023-10-06", "Сумма операции": -200.0, "Категория": "Супермаркеты", "Описание": "Лента"},
+    ], ensure_ascii=False), encoding="utf-8")
+    df = read_transactions(str(path), use_cache=False)
+    assert df[PHONE_COLUMN].tolist()[0] == "+7 921 11-22-33"
+
+    result = search_phone_numbers(df, number="+7 921 11-22-33")
+    assert [(t["Описание"], t["Сумма операции"]) for t in result] == [("Я МТС +7 921 11-22-33", -100.0)]
+    assert len(search_phone_numbers(df)) == 1
+    # Поиск по началу номера идет по полным номерам E.164
+    assert search_phone_numbers(df, prefix="+7921") == []
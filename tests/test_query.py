@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.dates import sort_by_date
+from src.query import AmountRange, DateRange, Query, TextMatch, ValueIn
+from src.schema import apply_schema
+from src.search import SearchIndex
+from src.store import TransactionStore
+
+
+@pytest.fixture
+def transactions():
+    return apply_schema(sort_by_date(pd.DataFrame({
+        "Дата операции": pd.to_datetime([
+            "2023-10-01 10:00:00", "2023-10-05 12:00:00", "2023-10-10 15:00:00", "2023-10-15 14:30:00",
+            "2023-10-20 18:00:00", "2023-11-02 09:00:00", "2023-11-05 11:00:00",
+        ]),
+        "Номер карты": ["*7197", "*5091", "*7197", "*7197", "*5091", "*7197", np.nan],
+        "Статус": ["OK", "OK", "FAILED", "OK", "OK", "OK", "OK"],
+        "MCC": [5411, 5411, 5411, 4829, 5814, 5411, np.nan],
+        "Сумма операции": [-1262.00, -7.94, -100.00, -3000.00, -450.50, 15000.00, -829.00],
+        "Категория": ["Супермаркеты", "Супермаркеты", "Супермаркеты", "Переводы", "Фастфуд", "Пополнения",
+                      "Супермаркеты"],
+        "Описание": ["Лента", "Магнит", "Лента", "Валерий А.", "OZON", "Пополнение", "Озон"],
+    })))
+
+
+def _descriptions(result):
+    return [t["Описание"] for t in result]
+
+
+@pytest.mark.parametrize("build,expected", [
+    (lambda q: q.between("2023-10-05", "2023-10-15 14:30:00"), ["Магнит", "Лента", "Валерий А."]),
+    (lambda q: q.card("7197", "1234567812345091"), ["Лента", "Магнит", "Лента", "Валерий А.", "OZON", "Пополнение"]),
+    (lambda q: q.card("5091").category("Супермаркеты"), ["Магнит"]),
+    (lambda q: q.mcc(5411).status("OK"), ["Лента", "Магнит", "Пополнение"]),
+    (lambda q: q.amount(-1000, -100), ["Лента", "OZON", "Озон"]),
+    (lambda q: q.amount(-1000, -100, inclusive="neither"), ["OZON", "Озон"]),
+    (lambda q: q.expenses().between(start="2023-11-01"), ["Озон"]),
+    (lambda q: q.text("лента").between(end="2023-10-05"), ["Лента"]),
+    (lambda q: q.physical_transfers(), ["Валерий А."]),
+    (lambda q: q.category("Нет такой"), []),
+])
+def test_query(transactions, build, expected):
+    assert _descriptions(build(Query(transactions)).run()) == expected
+
+
+def test_query_after_reorder(transactions):
+    # После пересортировки по сумме отметка в attrs остается, но даты проверяются заново
+    reordered = transactions.sort_values("Сумма операции")
+    found = _descriptions(Query(reordered).between("2023-10-05", "2023-10-15 14:30:00").run())
+    assert sorted(found) == ["Валерий А.", "Лента", "Магнит"]
+    assert _descriptions(Query(reordered).text("лента").run()) == ["Лента", "Лента"]
+
+
+def test_query_records(transactions):
+    records = [
+        {**t, "Дата операции": t["Дата операции"].strftime("%d.%m.%Y %H:%M:%S")}
+        for t in Query(transactions).run()
+    ]
+    result = Query(records).between("2023-10-05", "2023-10-31").category("Супермаркеты").amount(maximum=-50).run()
+    # Для списка возвращаются сами записи
+    assert result.records() == [records[2]]
+
+
+def test_query_fuzzy_order_and_limit(transactions):
+    query = Query(transactions).expenses().text("ozon", mode="fuzzy")
+    assert _descriptions(query.run()) == ["OZON", "Озон"]
+    assert _descriptions(query.limit(1).run()) == ["OZON"]
+
+
+def test_query_plan(transactions):
+    query = Query(transactions).text("лента").amount(maximum=0).category("Переводы").status("OK").between("2023-10-01")
+    plan = query.plan()
+    # Срез по дате, затем самое редкое значение категориальной колонки, числа и текст
+    assert [type(p) for p in plan] == [DateRange, ValueIn, ValueIn, AmountRange, TextMatch]
+    assert plan[1].column == "Категория"
+
+
+def test_result_set_is_lazy(transactions, monkeypatch):
+    calls = []
+    query = Query(transactions).category("Супермаркеты")
+    monkeypatch.setattr(Query, "evaluate", lambda self: calls.append(self) or np.array([0, 2]))
+    result = query.run()
+    assert calls == []
+    assert len(result) == 2 and result.frame()["Сумма операции"].tolist() == [-1262.0, -100.0]
+    assert len(calls) == 1
+
+
+def test_query_snapshot_uses_cached_indexes(transactions, monkeypatch):
+    store = TransactionStore("unused.json", check_interval=float("inf"), loader=lambda _: transactions.copy())
+    monkeypatch.setattr("src.store._store", store)
+    snapshot = store.snapshot()
+    assert _descriptions(Query(snapshot).category("Супермаркеты").text("лента").run()) == ["Лента", "Лента"]
+    assert any(name == "search_index" for name, _ in store._derived)
+
+
+@pytest.mark.parametrize("query,mode", [
+    ("лента", "substring"), ("", "substring"), ("а", "substring"), ("лента магнит", "word"), ("пол", "prefix"),
+    ("ле", "prefix"), ("", "word"),
+])
+def test_query_text_matches_index(transactions, query, mode):
+    # Без снимка тексты проверяются напрямую; результат и порядок — как у индекса
+    shuffled = transactions.iloc[[4, 0, 6, 2, 5, 1, 3]].reset_index(drop=True)
+    expected = SearchIndex.from_frame(shuffled).search(query, mode).tolist()
+    assert Query(shuffled).text(query, mode).run().rows.tolist() == expected
+
+
+def test_result_set_pages(transactions):
+    transactions.attrs["data_id"] = "a"
+    result = Query(transactions).expenses().run()
+    first = result.page(2)
+    assert _descriptions(first.items) == ["Лента", "Магнит"] and first.total == 6
+    second = result.page(4, cursor=first.next_cursor)
+    assert _descriptions(second.items) == ["Лента", "Валерий А.", "OZON", "Озон"] and second.next_cursor is None
+    assert _descriptions(result.stream(offset=5)) == ["Озон"]
+
+    transactions.attrs["data_id"] = "b"
+    with pytest.raises(ValueError, match="устарел"):
+        Query(transactions).expenses().run().page(2, cursor=first.next_cursor)
+    with pytest.raises(ValueError):
+        result.page(2, cursor="не курсор")
@@ -1,5 +1,3 @@
-import json
-
 import pandas as pd
 import pytest
 
@@ -127,7 +125,7 @@ def test_spending_by_weekday(sample_transactions, date, expected):
 ])
 def test_spending_by_workday(sample_transactions, date, expected):
     result = spending_by_workday(sample_transactions, date=date)
-    assert json.loads(result) == expected
+    assert result == expected
 
 @pytest.mark.parametrize("category,expected", [
     ("Супермаркеты", {"category": "Супермаркеты", "total": 2098.94}),
@@ -246,7 +244,7 @@ def test_spending_by_category_with_income(sample_transactions):
 def test_spending_by_weekday(sample_transactions):
     """Тест расчета трат по дням недели."""
     result = spending_by_weekday(sample_transactions, date="2023-10-15")
-    result_dict = json.loads(result)
+    result_dict = result
     assert isinstance(result_dict, dict)
     assert all(day in result_dict for day in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'])
     assert all(isinstance(result_dict[day]['mean'], float) for day in result_dict)
@@ -258,7 +256,7 @@ def test_spending_by_weekday_empty_df():
     """Тест расчета трат по дням недели для пустого DataFrame."""
     empty_df = pd.DataFrame(columns=['Дата операции', 'Сумма операции'])
     result = spending_by_weekday(empty_df)
-    result_dict = json.loads(result)
+    result_dict = result
     assert isinstance(result_dict, dict)
     assert all(day in result_dict for day in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'])
     assert all(result_dict[day]['mean'] == 0.0 for day in result_dict)
@@ -274,7 +272,7 @@ def test_spending_by_weekday_with_income(sample_transactions):
     })
     df = pd.concat([sample_transactions, income])
     result = spending_by_weekday(df, date="2023-10-15")
-    result_dict = json.loads(result)
+    result_dict = result
     assert isinstance(result_dict, dict)
     assert all(day in result_dict for day in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'])
     assert all(isinstance(result_dict[day]['mean'], float) for day in result_dict)
@@ -290,7 +288,7 @@ def test_spending_by_workday_empty_df():
         "Рабочий день": {"mean": 0.0},
         "Выходной день": {"mean": 0.0}
     }
-    assert json.loads(result) == expected
+    assert result == expected
 
 def test_spending_by_workday_with_income(sample_transactions):
     """Тест расчета трат по рабочим/выходным дням с учетом доходов."""
@@ -302,7 +300,7 @@ def test_spending_by_workday_with_income(sample_transactions):
     })
     df = pd.concat([sample_transactions, income])
     result = spending_by_workday(df, date="2023-10-15")
-    result_dict = json.loads(result)
+    result_dict = result
     assert isinstance(result_dict, dict)
     assert all(day in result_dict for day in ['Рабочий день', 'Выходной день'])
     assert all(isinstance(result_dict[day]['mean'], float) for day in result_dict)
@@ -313,7 +311,7 @@ def test_spending_by_workday_different_date_formats(sample_transactions):
     date_formats = ["2023-10-15", "15.10.2023", "2023/10/15"]
     for date in date_formats:
         result = spending_by_workday(sample_transactions, date=date)
-        result_dict = json.loads(result)
+        result_dict = result
         assert isinstance(result_dict, dict)
         assert all(day in result_dict for day in ['Рабочий день', 'Выходной день'])
         assert all(result_dict[day]['mean'] >= 0 for day in result_dict)
@@ -321,7 +319,7 @@ def test_spending_by_workday_different_date_formats(sample_transactions):
 def test_spending_by_workday_current_date(sample_transactions):
     """Тест на использование текущей даты, если дата не указана"""
     result = spending_by_workday(sample_transactions)
-    result_dict = json.loads(result)
+    result_dict = result
     assert isinstance(result_dict, dict)
     assert all(day in result_dict for day in ['Рабочий день', 'Выходной день'])
     assert all(isinstance(result_dict[day]['mean'], float) for day in result_dict)
@@ -483,7 +481,7 @@ def test_spending_by_weekday_different_date_formats(sample_transactions):
     date_formats = ["2023-10-15", "15.10.2023", "2023/10/15"]
     for date in date_formats:
         result = spending_by_weekday(sample_transactions, date=date)
-        result_dict = json.loads(result)
+        result_dict = result
         assert isinstance(result_dict, dict)
         assert all(day in result_dict for day in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'])
         assert all(result_dict[day]['mean'] >= 0 for day in result_dict)
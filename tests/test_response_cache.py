@@ -0,0 +1,109 @@
+import json
+
+import pytest
+
+from src.response_cache import ResponseCache
+from src.store import TransactionStore
+from src.utils import read_transactions
+from src.views import events_view, home_view
+
+
+@pytest.fixture
+def transactions_file(tmp_path):
+    path = tmp_path / "transactions.json"
+    path.write_text(json.dumps([
+        {
+            "Дата операции": "2023-10-01 10:00:00",
+            "Номер карты": "1234567890123456",
+            "Сумма операции": -1262.00,
+            "Кешбэк": 12.62,
+            "Категория": "Супермаркеты",
+            "Описание": "Лента"
+        },
+        {
+            "Дата операции": "2023-10-15 14:30:30",
+            "Номер карты": "6543210987654321",
+            "Сумма операции": -1198.23,
+            "Кешбэк": 11.98,
+            "Категория": "Переводы",
+            "Описание": "Перевод"
+        }
+    ], ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def store(transactions_file):
+    return TransactionStore(str(transactions_file), check_interval=0,
+                            loader=lambda path: read_transactions(path, use_cache=False))
+
+
+def test_cache_hits_and_misses(store):
+    cache = ResponseCache(store=store)
+    first = cache.events_view("2023-10-15 14:30:00")
+    second = cache.events_view("2023-10-15 14:30:00")
+    cache.events_view("2023-10-15 14:30:00", period="Y")
+
+    assert first == second == events_view("2023-10-15 14:30:00", store.snapshot())
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_cache_granularity(store):
+    cache = ResponseCache(store=store, granularity="1min")
+    response = cache.home_view("2023-10-15 14:30:59")
+    assert cache.home_view("2023-10-15 14:30:01") == response
+    # Ответ считается для начала минуты: операция в 14:30:30 не попадает
+    assert response == home_view("2023-10-15 14:30:00", store.snapshot())
+    assert cache.stats()["hits"] == 1
+
+
+def test_cache_default_granularity(store):
+    # Запросы без даты получают текущее время до секунды: по умолчанию они совпадают в пределах минуты
+    cache = ResponseCache(store=store)
+    cache.events_view("2023-10-15 14:30:05")
+    cache.events_view("2023-10-15 14:30:41")
+    assert cache.stats()["hits"] == 1 and cache.stats()["size"] == 1
+
+
+def test_cache_lru_eviction(store):
+    cache = ResponseCache(store=store, maxsize=2)
+    cache.home_view("2023-10-01 12:00:00")
+    cache.home_view("2023-10-02 12:00:00")
+    cache.home_view("2023-10-01 12:00:00")
+    cache.home_view("2023-10-03 12:00:00")
+
+    assert cache.stats()["evictions"] == 1
+    cache.home_view("2023-10-01 12:00:00")
+    assert cache.stats()["hits"] == 2
+    cache.home_view("2023-10-02 12:00:00")
+    assert cache.stats()["misses"] == 4
+
+
+def test_cache_invalidated_on_reload(store, transactions_file):
+    cache = ResponseCache(store=store)
+    before = cache.events_view("2023-10-15 23:00:00")
+
+    data = json.loads(transactions_file.read_text(encoding="utf-8"))
+    transactions_file.write_text(json.dumps(data * 2, ensure_ascii=False), encoding="utf-8")
+
+    after = cache.events_view("2023-10-15 23:00:00")
+    assert after["expenses"]["total_amount"] == pytest.approx(2 * before["expenses"]["total_amount"])
+    assert cache.stats()["misses"] == 2
+    assert cache.stats()["size"] == 1
+
+
+def test_cache_market_data_current(store, monkeypatch):
+    market = {
+        "currency_rates": [{"currency": "USD", "rate": 1.0}],
+        "stock_prices": [],
+        "market_data_age": {"currency_rates": 5.0, "stock_prices": None},
+    }
+    monkeypatch.setattr("src.response_cache.get_market_data", lambda: market)
+
+    cache = ResponseCache(store=store)
+    cache.home_view("2023-10-15 14:30:00")
+    # Сохраненный ответ получает текущие рыночные данные
+    response = cache.home_view("2023-10-15 14:30:00")
+    assert response["currency_rates"] == [{"currency": "USD", "rate": 1.0}]
+    assert response["market_data_age"] == {"currency_rates": 5.0, "stock_prices": None}
@@ -0,0 +1,84 @@
+import pandas as pd
+import pytest
+
+from src.dates import sort_by_date
+from src.schema import apply_schema
+from src.rollups import DailyTotals, MonthlyCube, period_totals
+
+
+@pytest.fixture
+def transactions():
+    return sort_by_date(pd.DataFrame({
+        "Дата операции": pd.to_datetime([
+            "2023-10-01 09:00:00", "2023-10-01 18:00:00", "2023-10-10 12:00:00",
+            "2023-10-15 10:00:00", "2023-10-15 20:00:00", "2023-09-30 23:00:00",
+        ]),
+        "Сумма операции": [-100.0, 50.0, -30.5, -10.0, -999.0, -5.0],
+        "Категория": ["Супермаркеты", "Пополнения", "Супермаркеты", "Переводы", "Переводы", None],
+        "Номер карты": ["*1111", "*1111", "*2222", "*2222", "*1111", "*2222"],
+    }))
+
+
+@pytest.mark.parametrize("start_date,end_date,expenses,expenses_total,income", [
+    ("2023-10-01", "2023-10-15 14:30:00", {"Переводы": 10.0, "Супермаркеты": 130.5}, 140.5, {"Пополнения": 50.0}),
+    (
+        "2023-10-01 12:00:00", "2023-10-15 14:30:00",
+        {"Переводы": 10.0, "Супермаркеты": 30.5}, 40.5, {"Пополнения": 50.0},
+    ),
+    ("2023-10-15", "2023-10-15 23:59:59", {"Переводы": 1009.0}, 1009.0, {}),
+    ("2023-09-01", "2023-09-30 23:59:59", {}, 5.0, {}),
+    ("2024-01-01", "2024-01-31", {}, 0.0, {}),
+    (pd.Timestamp.min, pd.Timestamp.max, {"Переводы": 1009.0, "Супермаркеты": 130.5}, 1144.5, {"Пополнения": 50.0}),
+])
+def test_query(transactions, start_date, end_date, expenses, expenses_total, income):
+    result_expenses, result_income = DailyTotals.from_frame(transactions).query(start_date, end_date)
+    assert result_expenses.by_key.to_dict() == pytest.approx(expenses)
+    assert result_expenses.total == pytest.approx(expenses_total)
+    assert result_income.by_key.to_dict() == pytest.approx(income)
+
+
+def test_query_by_card(transactions):
+    expenses, income = DailyTotals.from_frame(transactions, "Номер карты").query("2023-10-01", "2023-10-31")
+    assert expenses.by_key.to_dict() == pytest.approx({"*1111": 1099.0, "*2222": 40.5})
+    assert expenses.counts.to_dict() == {"*1111": 2, "*2222": 2}
+    assert income.by_key.to_dict() == pytest.approx({"*1111": 50.0})
+
+
+@pytest.mark.parametrize("split", [1, 3, 5])
+def test_append_matches_full_build(transactions, split):
+    # Добавление частями (в т.ч. с более ранними датами) дает те же итоги, что и построение сразу
+    shuffled = transactions.sample(frac=1, random_state=split)
+    index = DailyTotals.from_frame(shuffled.iloc[:split])
+    rest = shuffled.iloc[split:]
+    index.append(rest["Дата операции"], rest["Категория"], (rest["Сумма операции"] * 100).round())
+
+    full = DailyTotals.from_frame(transactions)
+    for start_date, end_date in [("2023-09-30", "2023-10-31"), ("2023-10-01 12:00:00", "2023-10-15 15:00:00")]:
+        for appended, expected in zip(index.query(start_date, end_date), full.query(start_date, end_date)):
+            assert appended.by_key.to_dict() == pytest.approx(expected.by_key.to_dict())
+            assert appended.total == pytest.approx(expected.total)
+            assert appended.total_count == expected.total_count
+
+
+def test_monthly_cube(transactions):
+    transactions = transactions.assign(Кешбэк=[1.0, 0.5, 0.3, 0.0, 9.99, 0.05])
+    cube = MonthlyCube.from_frame(transactions)
+    october = cube.month(2023, 10)
+    assert october.index.tolist() == ["Переводы", "Пополнения", "Супермаркеты"]
+    assert october["spend"].tolist() == pytest.approx([1009.0, 0.0, 130.5])
+    assert october["cashback"].tolist() == pytest.approx([10.04, 0.3, 0.5])
+    assert cube.month(2024, 1)["spend"].tolist() == [0.0, 0.0, 0.0]
+    by_card = cube.by_card(2023, 10)["spend"]
+    assert by_card[("*1111", "Переводы")] == 999.0 and by_card[("*2222", "Супермаркеты")] == 30.5
+    assert cube.by_card(2023, 9)["spend"].tolist() == [5.0]
+
+
+def test_period_totals(transactions):
+    # Данные в копейках — через индекс, float-суммы — напрямую и без округления до копеек
+    indexed, _ = period_totals(apply_schema(transactions), "2023-10-01", "2023-10-31")
+    assert indexed.by_key.to_dict() == pytest.approx({"Переводы": 1009.0, "Супермаркеты": 130.5})
+    fractional = transactions.assign(**{"Сумма операции": transactions["Сумма операции"] - 0.004})
+    expenses, income = period_totals(fractional, "2023-10-01", "2023-10-31")
+    assert expenses.by_key.to_dict() == pytest.approx({"Переводы": 1009.008, "Супермаркеты": 130.508})
+    assert expenses.counts.to_dict() == {"Переводы": 2, "Супермаркеты": 2}
+    assert income.by_key.to_dict() == pytest.approx({"Пополнения": 49.996}) and income.total_count == 1
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.schema import AMOUNT_UNIT_ATTR, apply_schema, memory_report, with_rubles
+
+
+@pytest.fixture
+def export_frame():
+    return pd.DataFrame({
+        "Дата операции": pd.to_datetime(["2021-12-31 16:44:00", "2021-12-31 16:42:04", "2021-12-30 10:00:00"]),
+        "Номер карты": ["*7197", "*7197", None],
+        "Статус": ["OK", "OK", "FAILED"],
+        "Сумма операции": [-160.89, -64.00, 1000.10],
+        "Валюта операции": ["RUB", "RUB", "RUB"],
+        "Кэшбэк": [np.nan, 1.60, np.nan],
+        "Категория": ["Супермаркеты", "Супермаркеты", "Пополнения"],
+        "MCC": [5411.0, 5411.0, np.nan],
+        "Описание": ["Колхоз", "Колхоз", "Пополнение через Сбербанк"],
+    })
+
+
+def test_apply_schema_dtypes(export_frame):
+    df = apply_schema(export_frame)
+    assert isinstance(df["Категория"].dtype, pd.CategoricalDtype)
+    assert isinstance(df["Описание"].dtype, pd.CategoricalDtype)
+    assert df["Сумма операции"].dtype == np.int64
+    assert df["Сумма операции"].tolist() == [-16089, -6400, 100010]
+    assert str(df["Кешбэк"].dtype) == "Int64"
+    assert str(df["MCC"].dtype) == "Int16"
+    assert "Кэшбэк" not in df.columns
+    assert df.attrs[AMOUNT_UNIT_ATTR] == "kopecks"
+
+
+def test_with_rubles(export_frame):
+    df = with_rubles(apply_schema(export_frame))
+    assert df["Сумма операции"].tolist() == [-160.89, -64.0, 1000.1]
+    assert df["Кешбэк"].isna().tolist() == [True, False, True]
+    assert df.attrs[AMOUNT_UNIT_ATTR] == "rubles"
+
+
+def test_with_rubles_keeps_plain_frame(export_frame):
+    assert with_rubles(export_frame) is export_frame
+
+
+def test_memory_report(export_frame):
+    report = memory_report(apply_schema(export_frame))
+    assert report["rows"] == 3
+    assert report["columns"]["MCC"]["dtype"] == "Int16"
+    assert report["total_bytes"] == sum(c["bytes"] for c in report["columns"].values())
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.dates import sort_by_date
+from src.schema import apply_schema
+from src.search import SearchIndex, fold, search_index
+from src.services import simple_search
+from src.store import TransactionStore
+
+
+@pytest.fixture
+def transactions():
+    return apply_schema(pd.DataFrame({
+        "Дата операции": pd.to_datetime([
+            "2023-10-20 10:00:00", "2023-10-01 12:00:00", "2023-10-10 15:00:00",
+            "2023-10-15 14:30:00", "2023-10-25 18:00:00",
+        ]),
+        "Сумма операции": [-829.00, -1262.00, -7.94, -1198.23, -100.00],
+        "Категория": ["Супермаркеты", "Супермаркеты", "Супермаркеты", "Переводы", np.nan],
+        "Описание": ["Лента", "ЛЕНТА", "Магнит у дома", "Перевод Кредитная карта", "Яндекс Такси"],
+    }))
+
+
+@pytest.mark.parametrize("query,mode,expected", [
+    ("лента", "substring", [1, 0]),
+    ("ент", "substring", [1, 0]),
+    ("о", "substring", [2, 3]),
+    ("супермаркеты лента", "substring", []),
+    ("", "substring", [1, 2, 3, 0, 4]),
+    ("у", "word", [2]),
+    ("магнит дома", "word", [2]),
+    ("магн", "word", []),
+    ("пере кред", "prefix", [3]),
+    ("так", "prefix", [4]),
+    ("ента", "prefix", []),
+])
+def test_search_index(transactions, query, mode, expected):
+    # Строки возвращаются в порядке дат; пропущенная категория не мешает поиску
+    assert SearchIndex.from_frame(transactions).search(query, mode).tolist() == expected
+
+
+def test_search_index_limit(transactions):
+    assert SearchIndex.from_frame(transactions).search("", limit=2).tolist() == [1, 2]
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("Ozon.ru", "ozon ru"),
+    ("Озон", "ozon"),
+    ("Yandex Taxi", "yandeks taksi"),
+    ("Яндекс Такси", "yandeks taksi"),
+    ("Coffee House", "kofe house"),
+])
+def test_fold(text, expected):
+    assert fold(text) == expected
+
+
+@pytest.fixture
+def merchants():
+    return SearchIndex([["Ozon.ru", "Лента", "OZON", "Озон Банк", "Yandex Taxi", "Озон", "Магнит"]])
+
+
+def test_search_index_similar(merchants):
+    text_ids, scores = merchants.similar("озон")
+    # Одинаково похожие тексты: сначала точные совпадения, затем более длинные
+    assert [merchants.texts[i] for i in text_ids] == ["ozon", "озон", "ozon.ru", "озон банк"]
+    assert scores.tolist() == [1.0] * 4
+    assert [merchants.texts[i] for i in merchants.similar("озон", limit=1)[0]] == ["ozon"]
+    assert not len(merchants.similar("пятерочка")[0])
+
+
+def test_search_index_fuzzy(merchants):
+    assert merchants.search("яндекс такси", mode="fuzzy").tolist() == [4]
+    assert merchants.search("Ozon", mode="fuzzy").tolist() == [2, 5, 0, 3]
+    assert merchants.search("Ozon", mode="fuzzy", limit=2).tolist() == [2, 5]
+
+
+def test_search_index_fuzzy_date_order(transactions):
+    # Одинаковое сходство — в порядке дат
+    assert SearchIndex.from_frame(transactions).search("lenta", mode="fuzzy").tolist() == [1, 0]
+
+
+def test_search_index_date_order_after_reorder(transactions):
+    reordered = sort_by_date(transactions).sort_values("Сумма операции")
+    # Индекс сам проверяет порядок дат, а не отметку сортировки
+    found = SearchIndex.from_frame(reordered).search("", mode="substring")
+    assert reordered["Дата операции"].iloc[found].is_monotonic_increasing
+
+
+def test_search_index_unknown_mode(transactions):
+    with pytest.raises(ValueError):
+        SearchIndex.from_frame(transactions).search("лента", mode="regex")
+
+
+def test_simple_search_frame(transactions):
+    result = simple_search("Лента", transactions)
+    assert [t["Сумма операции"] for t in result] == [-1262.00, -829.00]
+
+
+def test_simple_search_records_missing_fields():
+    records = [{"Категория": None, "Описание": "Лента"}, {"Описание": "Магнит"}]
+    assert simple_search("магнит", records) == [{"Описание": "Магнит"}]
+
+
+def test_search_index_cached_per_version(transactions, monkeypatch):
+    store = TransactionStore("unused.json", check_interval=float("inf"), loader=lambda _: transactions.copy())
+    monkeypatch.setattr("src.store._store", store)
+    snapshot = store.snapshot()
+    assert search_index(snapshot) is search_index(store.snapshot())
+    # Фильтр снимка индексируется отдельно
+    assert search_index(snapshot.iloc[:2]) is not search_index(snapshot)
@@ -0,0 +1,34 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from src.serialization import to_json, to_native, to_ndjson
+
+
+def test_to_native():
+    data = {
+        "amount": np.float64(12.5),
+        "count": np.int64(3),
+        "date": pd.Timestamp("2023-10-01 12:00:00"),
+        "missing": [np.nan, pd.NaT, None],
+    }
+    assert to_native(data) == {
+        "amount": 12.5,
+        "count": 3,
+        "date": "2023-10-01 12:00:00",
+        "missing": [None, None, None],
+    }
+    assert type(to_native(data)["count"]) is int
+
+
+def test_to_json_keeps_cyrillic():
+    result = to_json({"Категория": "Супермаркеты", "Сумма операции": np.float64(-1262.0)})
+    assert "Супермаркеты" in result
+    assert json.loads(result) == {"Категория": "Супермаркеты", "Сумма операции": -1262.0}
+
+
+def test_to_ndjson():
+    result = to_ndjson([{"Описание": "Лента", "Дата операции": pd.Timestamp("2023-10-01")}, {"Сумма": np.nan}])
+    assert result.splitlines() == ['{"Описание": "Лента", "Дата операции": "2023-10-01 00:00:00"}', '{"Сумма": null}']
+    assert result.endswith("\n") and to_ndjson([]) == ""
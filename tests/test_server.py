@@ -0,0 +1,324 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from types import SimpleNamespace
+from urllib.parse import quote
+
+import pytest
+
+import src.market
+import src.response_cache
+import src.server
+import src.store
+from src.market import CurrencyRatesClient, MarketDataRefresher, StockQuotesClient
+from src.query import Query
+from src.server import TransactionServer
+from src.store import TransactionStore
+from src.utils import get_market_data, read_transactions
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    path = tmp_path / "transactions.json"
+    path.write_text(json.dumps([
+        {
+            "Дата операции": "2023-10-01 10:00:00",
+            "Номер карты": "1234567890123456",
+            "Сумма операции": -1262.00,
+            "Кешбэк": 12.62,
+            "Категория": "Супермаркеты",
+            "Описание": "Лента"
+        },
+        {
+            "Дата операции": "2023-10-15 12:00:00",
+            "Номер карты": "6543210987654321",
+            "Сумма операции": -1198.23,
+            "Кешбэк": 11.98,
+            "Категория": "Переводы",
+            "Описание": "Перевод"
+        }
+    ], ensure_ascii=False), encoding="utf-8")
+    store = TransactionStore(str(path), loader=lambda file_path: read_transactions(file_path, use_cache=False))
+    monkeypatch.setattr(src.store, "_store", store)
+    monkeypatch.setattr(src.response_cache, "_cache", None)
+    return store
+
+
+async def _get(port, paths):
+    """Несколько GET-запросов по одному соединению: [(статус, тело)]."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    responses = []
+    for path in paths:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode("latin-1"))
+        head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+        length = int(head.lower().split("content-length: ")[1].split("\r\n")[0])
+        body = await reader.readexactly(length)
+        responses.append((int(head.split(" ")[1]), json.loads(body)))
+    writer.close()
+    return responses
+
+
+def _request(*paths):
+    async def run():
+        server = await TransactionServer("127.0.0.1", 0, executor=ThreadPoolExecutor(2)).start()
+        try:
+            return await _get(server.port, paths)
+        finally:
+            await server.stop()
+
+    return asyncio.run(run())
+
+
+def test_server_routes(store):
+    date = quote("2023-10-15 14:30:00")
+    events, home, report = _request(
+        f"/events?date={date}&period=M",
+        f"/home?date={date}",
+        f"/reports/category?category={quote('Переводы')}",
+    )
+    assert events[0] == 200
+    assert events[1]["expenses"]["total_amount"] == 2460.23
+    assert home[0] == 200
+    assert [card["last_digits"] for card in home[1]["cards"]] == ["3456", "4321"]
+    assert report == (200, {"category": "Переводы", "total": 1198.23})
+
+
+@pytest.mark.parametrize("path,status", [
+    ("/unknown", 404),
+    ("/services/profitable-categories?year=2023", 400),
+    ("/events?date=2023-10-15%2014:30:00&period=Q", 400),
+    ("/transactions?format=ndjson&limit=abc", 400),
+    ("/transactions?format=ndjson&limit=0", 400),
+    ("/transactions?limit=-5", 400),
+])
+def test_server_errors(store, path, status):
+    [(response_status, body)] = _request(path)
+    assert response_status == status
+    assert "error" in body
+
+
+def test_server_unexpected_error(store, monkeypatch):
+    # Ошибка вне обработчика маршрута — ответ 500, а не оборванное соединение
+    async def broken(self, method, path, params):
+        raise RuntimeError("сбой")
+
+    monkeypatch.setattr(TransactionServer, "_respond", broken)
+    [(status, body)] = _request("/health")
+    assert status == 500 and "error" in body
+
+
+def test_server_broken_pool(store, monkeypatch):
+    # Рабочий процесс аварийно завершился — 503, а не 500
+    def broken(*args):
+        raise BrokenProcessPool("рабочий процесс завершился")
+
+    monkeypatch.setattr(src.server, "dispatch", broken)
+    monkeypatch.setattr(src.server, "dispatch_rows", broken)
+    [(status, body)] = _request("/health")
+    assert status == 503 and "error" in body
+    [(status, body)] = _request("/transactions?format=ndjson")
+    assert status == 503 and "error" in body
+
+
+def test_server_skips_request_body(store):
+    # Тело POST пропускается: следующий запрос по тому же соединению разбирается верно
+    async def run():
+        server = await TransactionServer("127.0.0.1", 0, executor=ThreadPoolExecutor(2)).start()
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            body = b"GET /unknown HTTP/1.1\r\n\r\n"
+            writer.write(b"POST /health HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % len(body) + body)
+            writer.write(b"GET /health HTTP/1.1\r\n\r\n")
+            statuses = []
+            for _ in range(2):
+                head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+                await reader.readexactly(int(head.lower().split("content-length: ")[1].split("\r\n")[0]))
+                statuses.append(int(head.split(" ")[1]))
+            writer.close()
+            return statuses
+        finally:
+            await server.stop()
+
+    assert asyncio.run(run()) == [405, 200]
+
+
+def test_start_worker_single_refresher(monkeypatch):
+    # Рыночные данные обновляет только первый рабочий процесс
+    started = []
+    monkeypatch.setattr(src.server, "preload", lambda: None)
+    refresher = SimpleNamespace(refresh=lambda: None, start=lambda: started.append(1))
+    monkeypatch.setattr(src.server, "get_market_refresher", lambda: refresher)
+    lock = threading.Lock()
+    for _ in range(3):
+        src.server.start_worker(lock)
+    assert started == [1]
+
+
+def test_server_search(store):
+    search, fuzzy, transfers = _request(
+        f"/services/search?query={quote('лен')}&mode=prefix",
+        "/services/search?query=lenta&mode=fuzzy&limit=1",
+        "/services/physical-transfers",
+    )
+    assert search[0] == 200
+    assert [t["Описание"] for t in search[1]["items"]] == ["Лента"]
+    assert [t["Описание"] for t in fuzzy[1]["items"]] == ["Лента"]
+    # "Перевод" — технический перевод, а не перевод физическому лицу
+    assert transfers == (200, {"items": [], "next_cursor": None, "total": 0})
+
+
+def test_server_transactions(store):
+    by_card, combined, empty = _request(
+        "/transactions?card=3456",
+        f"/transactions?category={quote('Супермаркеты,Переводы')}&max_amount=-1200&end=2023-10-31",
+        "/transactions?mcc=5411",
+    )
+    assert [t["Описание"] for t in by_card[1]["items"]] == ["Лента"]
+    assert [t["Сумма операции"] for t in combined[1]["items"]] == [-1262.0]
+    assert empty[1]["items"] == []
+
+
+def test_server_investment(store):
+    bank, savings = _request(
+        "/services/investment-bank?month=2023-10&threshold=50",
+        "/services/investment-savings?start=2023-09&end=2023-10&thresholds=50,100",
+    )
+    assert bank == (200, 39.77)
+    assert savings == (200, {"2023-09": {"50": 0.0, "100": 0.0}, "2023-10": {"50": 39.77, "100": 39.77}})
+
+
+def test_server_pages(store):
+    [(_, first)] = _request("/transactions?limit=1")
+    assert [t["Описание"] for t in first["items"]] == ["Лента"] and first["total"] == 2
+    second, offset, stale = _request(
+        f"/transactions?limit=1&cursor={first['next_cursor']}",
+        "/transactions?limit=5&offset=1",
+        "/transactions?cursor=OTk6MA",
+    )
+    assert [t["Описание"] for t in second[1]["items"]] == ["Перевод"] and second[1]["next_cursor"] is None
+    assert offset[1]["items"] == second[1]["items"]
+    assert stale[0] == 400
+
+
+async def _get_stream(port, path):
+    """GET с ответом Transfer-Encoding: chunked: (заголовок, [части])."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode("latin-1"))
+    head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+    chunks = []
+    while True:
+        size = int((await reader.readuntil(b"\r\n")).strip(), 16)
+        chunk = await reader.readexactly(size + 2)
+        if not size:
+            break
+        chunks.append(chunk[:-2].decode("utf-8"))
+    writer.close()
+    return head, chunks
+
+
+def test_server_ndjson_stream(store, monkeypatch):
+    monkeypatch.setattr(src.server, "SERVER_STREAM_CHUNK", 1)
+
+    async def run():
+        server = await TransactionServer("127.0.0.1", 0, executor=ThreadPoolExecutor(2)).start()
+        try:
+            return await _get_stream(server.port, "/transactions?format=ndjson")
+        finally:
+            await server.stop()
+
+    evaluations = []
+    evaluate = Query.evaluate
+    monkeypatch.setattr(Query, "evaluate", lambda self: evaluations.append(1) or evaluate(self))
+    head, chunks = asyncio.run(run())
+    assert "application/x-ndjson" in head
+    # По одной записи в части, записи — по одной на строку; запрос выполнен один раз на поток
+    descriptions = [[json.loads(line)["Описание"] for line in chunk.splitlines()] for chunk in chunks]
+    assert descriptions == [["Лента"], ["Перевод"]]
+    assert evaluations == [1]
+
+
+def test_server_ndjson_stream_position(store):
+    async def run():
+        server = await TransactionServer("127.0.0.1", 0, executor=ThreadPoolExecutor(2)).start()
+        try:
+            [(_, page)] = await _get(server.port, ["/transactions?limit=1"])
+            streams = [
+                await _get_stream(server.port, path)
+                for path in ("/transactions?format=ndjson&offset=1", "/transactions?format=ndjson&limit=1",
+                             f"/transactions?format=ndjson&cursor={page['next_cursor']}")
+            ]
+            return [[json.loads(line)["Описание"] for line in "".join(chunks).splitlines()] for _, chunks in streams]
+        finally:
+            await server.stop()
+
+    assert asyncio.run(run()) == [["Перевод"], ["Лента"], ["Перевод"]]
+
+
+class RecordingProvider:
+    """Провайдер котировок, записывающий в файл процессы, которые к нему обращались."""
+
+    batch_size = 100
+
+    def __init__(self, log):
+        self.log = log
+
+    def fetch(self, symbols):
+        with open(self.log, "a") as f:
+            f.write(f"{os.getpid()}\n")
+        return {symbol: 40.0 for symbol in symbols}
+
+
+def _pids(path):
+    return [int(line) for line in path.read_text().split()] if path.exists() else []
+
+
+def test_server_pool_single_refresher(store, tmp_path, monkeypatch):
+    # Рабочие процессы создаются fork и наследуют подмененных клиентов и маршрут.
+    # ttl=0: любое обновление на пути запроса обратилось бы к провайдеру
+    fetches, refreshers = tmp_path / "fetches", tmp_path / "refreshers"
+
+    def fetch_rates(client):
+        with open(fetches, "a") as f:
+            f.write(f"{os.getpid()}\n")
+        return {"USD": 80.0}
+
+    def market_pid(params):
+        market = get_market_data()
+        time.sleep(0.3)
+        return {"pid": os.getpid(), "rates": market["currency_rates"]}
+
+    def start_refresher(original=src.server._start_refresher):
+        refreshers.write_text(f"{os.getpid()}\n")
+        original()
+
+    monkeypatch.setattr(CurrencyRatesClient, "_fetch", fetch_rates)
+    monkeypatch.setattr(src.market, "_currency_client", CurrencyRatesClient(
+        url=None, ttl=0, cache_path=str(tmp_path / "market" / "currency_rates.json")))
+    monkeypatch.setattr(src.market, "_quotes_client", StockQuotesClient(
+        provider=RecordingProvider(fetches), ttl=0, cache_path=str(tmp_path / "market" / "stock_quotes.json")))
+    monkeypatch.setattr(src.market, "_refresher", MarketDataRefresher(interval=60, stocks=lambda: ["AAPL"]))
+    monkeypatch.setattr(src.market, "_user_settings", {"user_currencies": ["USD"], "user_stocks": ["AAPL"]})
+    monkeypatch.setattr(src.server, "_start_refresher", start_refresher)
+    monkeypatch.setitem(src.server.ROUTES, "/market-pid", market_pid)
+
+    async def run():
+        server = await TransactionServer("127.0.0.1", 0, workers=2).start()
+        try:
+            # Одновременные запросы: пул создает второй рабочий процесс
+            responses = await asyncio.gather(*(_get(server.port, ["/market-pid"]) for _ in range(4)))
+            return [body for [(_, body)] in responses]
+        finally:
+            await server.stop()
+
+    bodies = asyncio.run(run())
+    [refresher_pid] = _pids(refreshers)
+    served = {body["pid"] for body in bodies}
+    assert len(served) == 2 and refresher_pid in served
+    # Данные загружены до приема запросов и видны всем процессам
+    assert all(body["rates"] == [{"currency": "USD", "rate": 80.0}] for body in bodies)
+    # К провайдерам обращается только процесс с фоновым обновлением
+    assert _pids(fetches) and set(_pids(fetches)) == {refresher_pid}
@@ -1,5 +1,3 @@
-import json
-
 import pandas as pd
 import pytest
 
@@ -107,13 +105,26 @@ def test_profitable_categories(sample_transactions):
         "Проценты_на_остаток": 0.0,
         "Кэшбэк": 0.0
     }
-    assert result == json.dumps(expected, ensure_ascii=False)
+    assert result == expected
+
+
+def test_profitable_categories_all_categories(sample_transactions):
+    df = pd.DataFrame(sample_transactions + [
+        {"Дата операции": "2023-10-30", "Сумма операции": -300.0, "Кешбэк": 3.0, "Категория": "Аптеки",
+         "Описание": "Ригла"},
+    ])
+    before = df.copy()
+    result = profitable_categories(df, 2023, 9)
+    # Категории не из прежнего фиксированного списка тоже учитываются; df не меняется
+    assert result["Аптеки"] == 0.0 and result["Бонусы"] == 453.0 and len(result) == 8
+    assert profitable_categories(df, 2023, 10)["Аптеки"] == 300.0
+    pd.testing.assert_frame_equal(df, before)
 
 
 def test_investment_bank(sample_transactions):
     result = investment_bank("2023-10", sample_transactions, 50)
-    # Проверяем округление первой транзакции: 1262 -> 1300 (разница 38)
-    assert result == "38.0"
+    # Округляются все расходы месяца: 38 + 42.06 + 1.77 + 21 + 29
+    assert result == 131.83
 
 
 def test_simple_search(sample_transactions):
@@ -142,7 +153,7 @@ def test_simple_search(sample_transactions):
             "Описание": "Лента"
         }
     ]
-    assert result == json.dumps(expected, ensure_ascii=False)
+    assert result == expected
 
     # Тест поиска по описанию
     result = simple_search("Лента", sample_transactions)
@@ -162,7 +173,7 @@ def test_simple_search(sample_transactions):
             "Описание": "Лента"
         }
     ]
-    assert result == json.dumps(expected, ensure_ascii=False)
+    assert result == expected
 
 
 def test_search_phone_numbers(sample_transactions):
@@ -215,7 +226,7 @@ def test_search_phone_numbers(sample_transactions):
             "Описание": "МТС Mobile +7 981 333-44-55"
         }
     ]
-    assert result == json.dumps(expected, ensure_ascii=False)
+    assert result == expected
 
 
 def test_search_physical_transfers(sample_transactions):
@@ -261,4 +272,4 @@ def test_search_physical_transfers(sample_transactions):
             "Описание": "Иван Петров"
         }
     ]
-    assert result == json.dumps(expected, ensure_ascii=False)
+    assert result == expected
@@ -0,0 +1,145 @@
+import json
+
+import pandas as pd
+import pytest
+
+import src.store
+from src.dates import slice_by_period
+from src.query import Query, encode_cursor
+from src.store import DATA_ID_ATTR, DATA_VERSION_ATTR, TransactionStore
+from src.utils import read_transactions
+
+
+@pytest.fixture
+def transactions_file(tmp_path):
+    path = tmp_path / "transactions.json"
+    path.write_text(json.dumps([
+        {
+            "Дата операции": "2023-10-01",
+            "Номер карты": "1234567890123456",
+            "Сумма операции": -1262.00,
+            "Кешбэк": 12.62,
+            "Категория": "Супермаркеты",
+            "Описание": "Лента"
+        }
+    ], ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def counting_loader():
+    calls = []
+
+    def loader(file_path):
+        calls.append(file_path)
+        return read_transactions(file_path, use_cache=False)
+
+    loader.calls = calls
+    return loader
+
+
+def test_store_loads_once(transactions_file, counting_loader):
+    store = TransactionStore(str(transactions_file), check_interval=0, loader=counting_loader)
+    first = store.snapshot()
+    second = store.snapshot()
+    assert len(counting_loader.calls) == 1
+    assert store.version == 1
+    assert first.attrs[DATA_VERSION_ATTR] == second.attrs[DATA_VERSION_ATTR] == 1
+
+
+def test_store_snapshot_isolation(transactions_file, counting_loader):
+    store = TransactionStore(str(transactions_file), check_interval=0, loader=counting_loader)
+    snapshot = store.snapshot()
+    snapshot["Категория"] = "Изменено"
+    assert store.snapshot()["Категория"].tolist() == ["Супермаркеты"]
+
+
+def test_store_reloads_changed_file(transactions_file, counting_loader):
+    store = TransactionStore(str(transactions_file), check_interval=0, loader=counting_loader)
+    store.snapshot()
+
+    data = json.loads(transactions_file.read_text(encoding="utf-8"))
+    transactions_file.write_text(json.dumps(data * 2, ensure_ascii=False), encoding="utf-8")
+
+    snapshot = store.snapshot()
+    assert len(snapshot) == 2
+    assert store.version == 2
+    assert snapshot.attrs[DATA_VERSION_ATTR] == 2
+
+
+def test_store_keeps_last_good_snapshot(transactions_file):
+    frames = [read_transactions(str(transactions_file), use_cache=False), pd.DataFrame()]
+    store = TransactionStore(str(transactions_file), check_interval=0, loader=lambda _: frames.pop(0))
+    store.snapshot()
+    assert store.reload(force=True) is False
+    assert len(store.snapshot()) == 1
+    assert store.version == 1
+
+
+def test_store_derived_per_version(transactions_file, counting_loader):
+    store = TransactionStore(str(transactions_file), check_interval=0, loader=counting_loader)
+    builds = []
+
+    def builder(df):
+        builds.append(len(df))
+        return len(df)
+
+    assert store.derived("rows", builder, store.snapshot()) == 1
+    assert store.derived("rows", builder, store.snapshot()) == 1
+    assert builds == [1]
+
+    store.reload(force=True)
+    assert store.derived("rows", builder, store.snapshot()) == 1
+    assert builds == [1, 1]
+
+
+def test_store_is_current(transactions_file, counting_loader):
+    store = TransactionStore(str(transactions_file), check_interval=0, loader=counting_loader)
+    snapshot = store.snapshot()
+    assert store.is_current(snapshot)
+    assert not store.is_current(snapshot.iloc[:0])
+    assert not store.is_current(pd.DataFrame(snapshot))
+
+    # Производные DataFrame той же формы наследуют attrs, но снимками не являются
+    assert store.is_current(snapshot.copy(deep=False))
+    assert not store.is_current(snapshot.fillna({"Сумма операции": 0}))
+    assert not store.is_current(snapshot.sort_values("Сумма операции"))
+    replaced = store.snapshot()
+    replaced["Сумма операции"] = replaced["Сумма операции"] * 2
+    assert not store.is_current(replaced)
+
+    store.reload(force=True)
+    assert not store.is_current(snapshot)
+
+
+def test_store_derived_not_shared_with_reordered_frame(tmp_path, monkeypatch):
+    path = tmp_path / "transactions.json"
+    path.write_text(json.dumps([
+        {"Дата операции": date, "Сумма операции": amount, "Категория": "Супермаркеты", "Описание": "Лента"}
+        for date, amount in [("2021-01-10", -4.0), ("2021-02-10", -1.0), ("2021-03-10", -3.0), ("2021-04-10", -2.0)]
+    ]), encoding="utf-8")
+    store = TransactionStore(str(path), loader=lambda file_path: read_transactions(file_path, use_cache=False))
+    monkeypatch.setattr(src.store, "_store", store)
+    snapshot = store.snapshot()
+    assert len(slice_by_period(snapshot, "2021-02-01", "2021-03-31")) == 2
+    # Отметка «отсортировано по дате» снимка не применяется к перестановке его строк
+    result = slice_by_period(snapshot.sort_values("Сумма операции"), "2021-02-01", "2021-03-31")
+    assert sorted(result["Сумма операции"]) == [-300, -100]
+
+
+def test_store_data_id_shared_between_processes(transactions_file, counting_loader):
+    # Хранилища разных процессов перезагружаются в разное время, но данные одного файла опознают одинаково
+    first = TransactionStore(str(transactions_file), check_interval=0, loader=counting_loader)
+    second = TransactionStore(str(transactions_file), check_interval=0, loader=counting_loader)
+    second.reload(force=True)
+    second.reload(force=True)
+    snapshot = second.snapshot()
+    assert first.snapshot().attrs[DATA_VERSION_ATTR] != snapshot.attrs[DATA_VERSION_ATTR]
+    assert first.snapshot().attrs[DATA_ID_ATTR] == snapshot.attrs[DATA_ID_ATTR]
+    cursor = encode_cursor(first.snapshot().attrs[DATA_ID_ATTR], 0)
+    assert Query(snapshot).run().page(1, cursor=cursor).total == 1
+
+    transactions_file.write_text(json.dumps([
+        {"Дата операции": "2023-10-02", "Сумма операции": -1.0, "Категория": "Супермаркеты", "Описание": "Лента"}
+    ]), encoding="utf-8")
+    assert first.snapshot().attrs[DATA_ID_ATTR] != snapshot.attrs[DATA_ID_ATTR]
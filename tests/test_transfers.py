@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+
+from src.schema import apply_schema
+from src.services import search_physical_transfers
+from src.transfers import PHYSICAL_TRANSFER_COLUMN, physical_transfer_mask, with_physical_transfer_flag
+
+CATEGORIES = ["Переводы", "Переводы", "Переводы", "Супермаркеты", "Переводы", "Переводы", "Переводы"]
+DESCRIPTIONS = ["Валерий А.", "Перевод на карту", "Иван Петров", "Иван Петров", "Тп Сервис", None, "Валерий А."]
+EXPECTED = [True, False, True, False, False, False, True]
+
+
+@pytest.mark.parametrize("dtype", [object, "category"])
+def test_physical_transfer_mask(dtype):
+    mask = physical_transfer_mask(pd.Series(CATEGORIES, dtype=dtype), pd.Series(DESCRIPTIONS, dtype=dtype))
+    assert mask.tolist() == EXPECTED
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_physical_transfer_mask_chunks(workers):
+    # Описания проверяются частями по одному: результат не зависит от деления и числа процессов
+    flags = physical_transfer_mask(CATEGORIES * 3, DESCRIPTIONS * 3, workers=workers, chunk_size=1)
+    assert flags.tolist() == EXPECTED * 3
+
+
+def test_search_physical_transfers_frame():
+    df = apply_schema(pd.DataFrame({
+        "Дата операции": pd.date_range("2023-10-01", periods=len(CATEGORIES)),
+        "Сумма операции": [-100.0] * len(CATEGORIES),
+        "Категория": CATEGORIES,
+        "Описание": DESCRIPTIONS,
+    }))
+    result = search_physical_transfers(df)
+    assert [t["Описание"] for t in result] == ["Валерий А.", "Иван Петров", "Валерий А."]
+    assert result[0]["Сумма операции"] == -100.0
+
+    flagged = with_physical_transfer_flag(df)
+    assert flagged[PHYSICAL_TRANSFER_COLUMN].tolist() == EXPECTED
+    assert PHYSICAL_TRANSFER_COLUMN not in df.columns
+
+
+def test_search_physical_transfers_records_chunks():
+    records = [{"Категория": c, "Описание": d} for c, d in zip(CATEGORIES, DESCRIPTIONS)]
+    assert search_physical_transfers(records, workers=1) == [records[0], records[2], records[6]]
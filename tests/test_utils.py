@@ -1,4 +1,3 @@
-import json
 from datetime import datetime
 from unittest.mock import MagicMock, patch
 
@@ -10,9 +9,11 @@ from src.utils import (
     get_currency_rates,
     get_date_range,
     get_greeting,
+    get_period_bounds,
     get_stock_prices,
     get_top_transactions,
     read_transactions,
+    summarize_cards,
 )
 
 
@@ -23,15 +24,33 @@ from src.utils import (
     (23, "Доброй ночи")
 ])
 def test_get_greeting(hour, expected):
-    result = json.loads(get_greeting(hour))
+    result = get_greeting(hour)
     assert result["greeting"] == expected
 
 def test_get_date_range():
     input_date = "2023-10-15 14:30:00"
-    result = json.loads(get_date_range(input_date))
+    result = get_date_range(input_date)
     assert result["start_date"] == "2023-10-01 00:00:00"
     assert result["end_date"] == "2023-10-15 14:30:00"
 
+
+@pytest.mark.parametrize("period,expected_start", [
+    ("W", datetime(2023, 10, 9)),
+    ("M", datetime(2023, 10, 1)),
+    ("Y", datetime(2023, 1, 1)),
+])
+def test_get_period_bounds(period, expected_start):
+    start_date, end_date = get_period_bounds("2023-10-15 14:30:00", period)
+    assert start_date == expected_start
+    assert end_date == datetime(2023, 10, 15, 14, 30)
+
+
+def test_get_period_bounds_all():
+    start_date, _ = get_period_bounds("2023-10-15 14:30:00", "ALL")
+    assert start_date == pd.Timestamp.min
+    with pytest.raises(ValueError):
+        get_period_bounds("2023-10-15 14:30:00", "Q")
+
 @pytest.mark.parametrize("transactions_data,expected", [
     (
         [
@@ -78,9 +97,23 @@ def test_get_card_summaries(transactions_data, expected):
     df['Дата операции'] = pd.to_datetime(df['Дата операции'])
     start_date = datetime(2023, 10, 1)
     end_date = datetime(2023, 10, 31)
-    result = json.loads(get_card_summaries(df, start_date, end_date))
+    result = get_card_summaries(df, start_date, end_date)
     assert result == expected
 
+
+def test_summarize_cards():
+    df = pd.DataFrame({
+        "Дата операции": pd.to_datetime(["2023-10-01", "2023-10-02", "2023-10-03", "2023-10-04", "2023-09-30"]),
+        "Номер карты": ["*1111", "*1111", "*2222", None, "*2222"],
+        "Сумма операции": [-100.0, 50.0, -30.0, -10.0, -1000.0],
+        "Кешбэк": [1.0, 0.0, 0.3, 0.1, 10.0],
+    })
+    result = summarize_cards(df, datetime(2023, 10, 1), datetime(2023, 10, 31))
+    assert result == [
+        {"last_digits": "1111", "total_spent": 100.0, "total_income": 50.0, "cashback": 1.0, "count": 2},
+        {"last_digits": "2222", "total_spent": 30.0, "total_income": 0.0, "cashback": 0.3, "count": 1},
+    ]
+
 @pytest.mark.parametrize("transactions_data,expected", [
     (
         [
@@ -121,16 +154,43 @@ def test_get_top_transactions(transactions_data, expected):
     df['Дата операции'] = pd.to_datetime(df['Дата операции'])
     start_date = datetime(2023, 10, 1)
     end_date = datetime(2023, 10, 31)
-    result = json.loads(get_top_transactions(df, start_date, end_date))
+    result = get_top_transactions(df, start_date, end_date)
     assert result == expected
 
+
+def test_get_top_transactions_limit():
+    df = pd.DataFrame({
+        "Дата операции": pd.to_datetime(["2023-10-05", "2023-10-01", "2023-10-02", "2023-10-03", "2023-10-04"]),
+        "Сумма операции": [-100.0, -300.0, -100.0, 500.0, -200.0],
+        "Категория": ["A", "B", "C", "D", "E"],
+        "Описание": ["a", "b", "c", "d", "e"],
+    })
+    result = get_top_transactions(df, datetime(2023, 10, 1), datetime(2023, 10, 31), n=3)
+    assert [(t["date"], t["amount"]) for t in result] == [
+        ("01.10.2023", 300.0),
+        ("04.10.2023", 200.0),
+        ("02.10.2023", 100.0),
+    ]
+
+
+def test_get_top_transactions_ties_chronological():
+    # Равные суммы — по времени операции, а не по строке 'ДД.ММ.ГГГГ'
+    df = pd.DataFrame({
+        "Дата операции": pd.to_datetime(["2022-03-01", "2021-01-02", "2021-06-01"]),
+        "Сумма операции": [-100.0, -100.0, -100.0],
+        "Категория": ["A", "B", "C"],
+        "Описание": ["a", "b", "c"],
+    })
+    result = get_top_transactions(df, datetime(2021, 1, 1), datetime(2022, 12, 31), n=2)
+    assert [t["date"] for t in result] == ["02.01.2021", "01.06.2021"]
+
 @patch('src.utils.get_currency_rates')
 def test_get_currency_rates(mock_get_rates):
     mock_get_rates.return_value = [
         {"currency": "USD", "rate": 0.0136},
         {"currency": "EUR", "rate": 0.0115}
     ]
-    result = json.loads(get_currency_rates())
+    result = get_currency_rates()
     assert result == [
         {"currency": "USD", "rate": 0.0136},
         {"currency": "EUR", "rate": 0.0115}
@@ -145,7 +205,7 @@ def test_get_stock_prices(mock_get_prices):
         {"stock": "MSFT", "price": 296.71},
         {"stock": "TSLA", "price": 1007.08}
     ]
-    result = json.loads(get_stock_prices())
+    result = get_stock_prices()
     assert result == [
         {"stock": "AAPL", "price": 150.12},
         {"stock": "AMZN", "price": 3173.18},
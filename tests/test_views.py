@@ -13,8 +13,9 @@ from src.utils import (
     get_stock_prices,
     get_top_transactions,
     read_transactions,
+    summarize_expenses,
 )
-from src.views import events_view, home_view
+from src.views import events_view, home_view, home_view_batch
 
 
 @pytest.mark.parametrize("transactions_data,expected", [
@@ -218,3 +219,83 @@ def test_events_view(transactions_data, expected, monkeypatch, mock_currency_rat
     
     response = events_view("2023-10-15 14:30:00", transactions_json)
     assert response == expected
+
+
+@pytest.mark.parametrize("period,expected_total", [
+    ("W", 1198.23),
+    ("M", 2460.23),
+    ("Y", 3460.23),
+    ("ALL", 3460.23),
+])
+def test_events_view_period(period, expected_total):
+    transactions_data = [
+        {
+            "Дата операции": "2023-10-01",
+            "Номер карты": "1234567890123456",
+            "Сумма операции": -1262.00,
+            "Кешбэк": 12.62,
+            "Категория": "Супермаркеты",
+            "Описание": "Лента"
+        },
+        {
+            "Дата операции": "2023-10-15",
+            "Номер карты": "6543210987654321",
+            "Сумма операции": -1198.23,
+            "Кешбэк": 11.98,
+            "Категория": "Переводы",
+            "Описание": "Перевод"
+        },
+        {
+            "Дата операции": "2023-02-10",
+            "Номер карты": "6543210987654321",
+            "Сумма операции": -1000.00,
+            "Кешбэк": 10.00,
+            "Категория": "Супермаркеты",
+            "Описание": "Лента"
+        }
+    ]
+    response = events_view("2023-10-15 14:30:00", transactions_data, period=period)
+    assert response["expenses"]["total_amount"] == expected_total
+
+
+def test_events_view_float_amounts_match_summary():
+    # Суммы не в копейках не округляются построчно: итог — как у summarize_expenses
+    transactions_data = [
+        {"Дата операции": f"2023-10-0{day}", "Номер карты": "1234567890123456", "Сумма операции": amount,
+         "Кешбэк": 0.0, "Категория": "Супермаркеты", "Описание": "Лента"}
+        for day, amount in [(1, -0.004), (2, -0.004), (3, -10.125)]
+    ]
+    response = events_view("2023-10-15 14:30:00", transactions_data)
+    df = pd.DataFrame(transactions_data)
+    df["Дата операции"] = pd.to_datetime(df["Дата операции"])
+    summary = summarize_expenses(df, datetime(2023, 10, 1), datetime(2023, 10, 15, 14, 30))
+    assert response["expenses"]["total_amount"] == summary["total_amount"] == 10.13
+
+
+def test_home_view_batch_matches_single_calls():
+    transactions_data = [
+        {
+            "Дата операции": f"2023-{month:02d}-{day:02d} {hour:02d}:00:00",
+            "Номер карты": card,
+            "Сумма операции": amount,
+            "Кешбэк": 1.0,
+            "Категория": "Супермаркеты",
+            "Описание": "Лента"
+        }
+        for month, day, hour, card, amount in [
+            (9, 30, 12, "1234567890123456", -300.0),
+            (10, 1, 9, "1234567890123456", -100.0),
+            (10, 1, 18, "6543210987654321", 500.0),
+            (10, 3, 10, "6543210987654321", -100.0),
+            (10, 5, 11, "1234567890123456", -250.0),
+            (10, 5, 20, "6543210987654321", -100.0),
+            (10, 9, 8, "1234567890123456", -40.0),
+            (11, 2, 15, "6543210987654321", -70.0),
+        ]
+    ]
+    timestamps = [
+        "2023-10-05 14:30:00", "2023-10-01 08:00:00", "2023-11-02 16:00:00",
+        "2023-10-31 23:59:59", "2023-10-05 14:30:00", "2023-09-30 13:00:00",
+    ]
+    expected = [home_view(timestamp, transactions_data) for timestamp in timestamps]
+    assert home_view_batch(timestamps, transactions_data) == expected